@@ -1,15 +1,20 @@
 import ccxt
 import os
 import math
-import time
 import pandas as pd
-import requests
 import json
-import sqlite3
 from dotenv import load_dotenv
 load_dotenv()
 from openai import OpenAI
 from datetime import datetime
+from trading_db import (setup_database, save_ai_analysis, link_analysis_to_trade, save_trade,
+                        update_trade_status, get_latest_open_trade, get_trade_summary,
+                        get_historical_trading_data, get_performance_metrics)
+from candle_store import setup_candle_store, get_candles
+from resample import base_candles_needed, resample_candles
+from market_feed import make_feed, EventGate
+from stages import Stage, CALL_TIMEOUT
+from news_cache import NewsCache, fetch_serpapi_news, NEWS_TTL
 
 # Binance Settings
 api_key = os.getenv("BINANCE_API_KEY")
@@ -18,365 +23,23 @@ exchange = ccxt.binance({
     'apiKey': api_key,
     'secret': secret,
     'enableRateLimit': True,
+    'timeout': CALL_TIMEOUT * 1000,  # ms; matches the stage timeout so a given-up request does not linger
     'options': {
         'defaultType': 'future',
         'adjustForTimeDifference': True
     }
 })
 symbol = "BTC/USDT"
-client = OpenAI()
+# Seconds the decision stage waits for the model; the client gives up at the same time (and does not retry)
+DECISION_TIMEOUT = 120
+client = OpenAI(timeout=DECISION_TIMEOUT, max_retries=0)
 
 # SERP API Settings
 serp_api_key = os.getenv("SERP_API_KEY")  # SERP_API_KEY needs to be added to the .env file
-
-# SQLite Database Settings
-DB_FILE = "bitcoin_trading.db"
-
-def setup_database():
-    """Create the database and necessary tables"""
-    conn = sqlite3.connect(DB_FILE)
-    cursor = conn.cursor()
-    
-    # Trades table
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS trades (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        timestamp TEXT NOT NULL,
-        action TEXT NOT NULL,
-        entry_price REAL NOT NULL,
-        amount REAL NOT NULL,
-        leverage INTEGER NOT NULL,
-        sl_price REAL NOT NULL,
-        tp_price REAL NOT NULL,
-        sl_percentage REAL NOT NULL,
-        tp_percentage REAL NOT NULL,
-        position_size_percentage REAL NOT NULL,
-        investment_amount REAL NOT NULL,
-        status TEXT DEFAULT 'OPEN',
-        exit_price REAL,
-        exit_timestamp TEXT,
-        profit_loss REAL,
-        profit_loss_percentage REAL
-    )
-    ''')
-    
-    # AI Analysis results table
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS ai_analysis (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        timestamp TEXT NOT NULL,
-        current_price REAL NOT NULL,
-        direction TEXT NOT NULL,
-        recommended_position_size REAL NOT NULL,
-        recommended_leverage INTEGER NOT NULL,
-        stop_loss_percentage REAL NOT NULL,
-        take_profit_percentage REAL NOT NULL,
-        reasoning TEXT NOT NULL,
-        trade_id INTEGER,
-        FOREIGN KEY (trade_id) REFERENCES trades (id)
-    )
-    ''')
-    
-    conn.commit()
-    conn.close()
-    print("Database setup complete")
-
-def save_ai_analysis(analysis_data, trade_id=None):
-    """Save AI analysis results to the database"""
-    conn = sqlite3.connect(DB_FILE)
-    cursor = conn.cursor()
-    
-    cursor.execute('''
-    INSERT INTO ai_analysis (
-        timestamp, 
-        current_price, 
-        direction, 
-        recommended_position_size, 
-        recommended_leverage, 
-        stop_loss_percentage, 
-        take_profit_percentage, 
-        reasoning,
-        trade_id
-    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-    ''', (
-        datetime.now().isoformat(),
-        analysis_data.get('current_price', 0),
-        analysis_data.get('direction', 'NO_POSITION'),
-        analysis_data.get('recommended_position_size', 0),
-        analysis_data.get('recommended_leverage', 0),
-        analysis_data.get('stop_loss_percentage', 0),
-        analysis_data.get('take_profit_percentage', 0),
-        analysis_data.get('reasoning', ''),
-        trade_id
-    ))
-    
-    analysis_id = cursor.lastrowid
-    conn.commit()
-    conn.close()
-    return analysis_id
-
-def save_trade(trade_data):
-    """Save trade information to the database"""
-    conn = sqlite3.connect(DB_FILE)
-    cursor = conn.cursor()
-    
-    cursor.execute('''
-    INSERT INTO trades (
-        timestamp,
-        action,
-        entry_price,
-        amount,
-        leverage,
-        sl_price,
-        tp_price,
-        sl_percentage,
-        tp_percentage,
-        position_size_percentage,
-        investment_amount
-    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-    ''', (
-        datetime.now().isoformat(),
-        trade_data.get('action', ''),
-        trade_data.get('entry_price', 0),
-        trade_data.get('amount', 0),
-        trade_data.get('leverage', 0),
-        trade_data.get('sl_price', 0),
-        trade_data.get('tp_price', 0),
-        trade_data.get('sl_percentage', 0),
-        trade_data.get('tp_percentage', 0),
-        trade_data.get('position_size_percentage', 0),
-        trade_data.get('investment_amount', 0)
-    ))
-    
-    trade_id = cursor.lastrowid
-    conn.commit()
-    conn.close()
-    return trade_id
-
-def update_trade_status(trade_id, status, exit_price=None, exit_timestamp=None, profit_loss=None, profit_loss_percentage=None):
-    """Update trade status"""
-    conn = sqlite3.connect(DB_FILE)
-    cursor = conn.cursor()
-    
-    update_fields = ["status = ?"]
-    update_values = [status]
-    
-    if exit_price is not None:
-        update_fields.append("exit_price = ?")
-        update_values.append(exit_price)
-    
-    if exit_timestamp is not None:
-        update_fields.append("exit_timestamp = ?")
-        update_values.append(exit_timestamp)
-    
-    if profit_loss is not None:
-        update_fields.append("profit_loss = ?")
-        update_values.append(profit_loss)
-    
-    if profit_loss_percentage is not None:
-        update_fields.append("profit_loss_percentage = ?")
-        update_values.append(profit_loss_percentage)
-    
-    update_sql = f"UPDATE trades SET {', '.join(update_fields)} WHERE id = ?"
-    update_values.append(trade_id)
-    
-    cursor.execute(update_sql, update_values)
-    conn.commit()
-    conn.close()
-
-def get_latest_open_trade():
-    """Get the latest open trade information"""
-    conn = sqlite3.connect(DB_FILE)
-    cursor = conn.cursor()
-    
-    cursor.execute('''
-    SELECT id, action, entry_price, amount, leverage, sl_price, tp_price
-    FROM trades
-    WHERE status = 'OPEN'
-    ORDER BY timestamp DESC
-    LIMIT 1
-    ''')
-    
-    result = cursor.fetchone()
-    conn.close()
-    
-    if result:
-        return {
-            'id': result[0],
-            'action': result[1],
-            'entry_price': result[2],
-            'amount': result[3],
-            'leverage': result[4],
-            'sl_price': result[5],
-            'tp_price': result[6]
-        }
-    return None
-
-def get_trade_summary(days=7):
-    """Get recent trade summary information"""
-    conn = sqlite3.connect(DB_FILE)
-    cursor = conn.cursor()
-    
-    cursor.execute('''
-    SELECT 
-        COUNT(*) as total_trades,
-        SUM(CASE WHEN profit_loss > 0 THEN 1 ELSE 0 END) as winning_trades,
-        SUM(CASE WHEN profit_loss < 0 THEN 1 ELSE 0 END) as losing_trades,
-        SUM(profit_loss) as total_profit_loss,
-        AVG(profit_loss_percentage) as avg_profit_loss_percentage
-    FROM trades
-    WHERE exit_timestamp IS NOT NULL
-    AND timestamp >= datetime('now', ?)
-    ''', (f'-{days} days',))
-    
-    result = cursor.fetchone()
-    conn.close()
-    
-    if result:
-        return {
-            'total_trades': result[0] or 0,
-            'winning_trades': result[1] or 0,
-            'losing_trades': result[2] or 0,
-            'total_profit_loss': result[3] or 0,
-            'avg_profit_loss_percentage': result[4] or 0
-        }
-    return None
-
-# New function: Get historical trading data and AI analysis results
-def get_historical_trading_data(limit=10):
-    """Get historical trading data and related AI analysis results"""
-    conn = sqlite3.connect(DB_FILE)
-    conn.row_factory = sqlite3.Row  # Set row_factory to access by column name
-    cursor = conn.cursor()
-    
-    # Get completed trades along with related AI analysis
-    cursor.execute('''
-    SELECT 
-        t.id as trade_id,
-        t.timestamp as trade_timestamp,
-        t.action,
-        t.entry_price,
-        t.exit_price,
-        t.amount,
-        t.leverage,
-        t.sl_price,
-        t.tp_price,
-        t.sl_percentage,
-        t.tp_percentage,
-        t.position_size_percentage,
-        t.status,
-        t.profit_loss,
-        t.profit_loss_percentage,
-        a.id as analysis_id,
-        a.reasoning,
-        a.direction,
-        a.recommended_leverage,
-        a.recommended_position_size,
-        a.stop_loss_percentage,
-        a.take_profit_percentage
-    FROM 
-        trades t
-    LEFT JOIN 
-        ai_analysis a ON t.id = a.trade_id
-    WHERE 
-        t.status = 'CLOSED'
-    ORDER BY 
-        t.timestamp DESC
-    LIMIT ?
-    ''', (limit,))
-    
-    results = cursor.fetchall()
-    
-    # Convert to a list of dictionaries
-    historical_data = []
-    for row in results:
-        historical_data.append({k: row[k] for k in row.keys()})
-    
-    conn.close()
-    return historical_data
-
-# Added function to calculate trade performance metrics
-def get_performance_metrics():
-    """Calculate trade performance metrics"""
-    conn = sqlite3.connect(DB_FILE)
-    cursor = conn.cursor()
-    
-    # Overall trade performance
-    cursor.execute('''
-    SELECT 
-        COUNT(*) as total_trades,
-        SUM(CASE WHEN profit_loss > 0 THEN 1 ELSE 0 END) as winning_trades,
-        SUM(CASE WHEN profit_loss < 0 THEN 1 ELSE 0 END) as losing_trades,
-        SUM(profit_loss) as total_profit_loss,
-        AVG(profit_loss_percentage) as avg_profit_loss_percentage,
-        MAX(profit_loss_percentage) as max_profit_percentage,
-        MIN(profit_loss_percentage) as max_loss_percentage,
-        AVG(CASE WHEN profit_loss > 0 THEN profit_loss_percentage ELSE NULL END) as avg_win_percentage,
-        AVG(CASE WHEN profit_loss < 0 THEN profit_loss_percentage ELSE NULL END) as avg_loss_percentage
-    FROM trades
-    WHERE status = 'CLOSED'
-    ''')
-    
-    overall_metrics = cursor.fetchone()
-    
-    # Performance by direction (long/short)
-    cursor.execute('''
-    SELECT 
-        action,
-        COUNT(*) as total_trades,
-        SUM(CASE WHEN profit_loss > 0 THEN 1 ELSE 0 END) as winning_trades,
-        SUM(CASE WHEN profit_loss < 0 THEN 1 ELSE 0 END) as losing_trades,
-        SUM(profit_loss) as total_profit_loss,
-        AVG(profit_loss_percentage) as avg_profit_loss_percentage
-    FROM trades
-    WHERE status = 'CLOSED'
-    GROUP BY action
-    ''')
-    
-    directional_metrics = cursor.fetchall()
-    
-    conn.close()
-    
-    # Construct results
-    metrics = {
-        "overall": {
-            "total_trades": overall_metrics[0] or 0,
-            "winning_trades": overall_metrics[1] or 0,
-            "losing_trades": overall_metrics[2] or 0,
-            "total_profit_loss": overall_metrics[3] or 0,
-            "avg_profit_loss_percentage": overall_metrics[4] or 0,
-            "max_profit_percentage": overall_metrics[5] or 0,
-            "max_loss_percentage": overall_metrics[6] or 0,
-            "avg_win_percentage": overall_metrics[7] or 0,
-            "avg_loss_percentage": overall_metrics[8] or 0
-        },
-        "directional": {}
-    }
-    
-    # Calculate win rate
-    if metrics["overall"]["total_trades"] > 0:
-        metrics["overall"]["win_rate"] = (metrics["overall"]["winning_trades"] / metrics["overall"]["total_trades"]) * 100
-    else:
-        metrics["overall"]["win_rate"] = 0
-    
-    # Add directional metrics
-    for row in directional_metrics:
-        action = row[0]
-        total = row[1] or 0
-        winning = row[2] or 0
-        
-        direction_metrics = {
-            "total_trades": total,
-            "winning_trades": winning,
-            "losing_trades": row[3] or 0,
-            "total_profit_loss": row[4] or 0,
-            "avg_profit_loss_percentage": row[5] or 0,
-            "win_rate": (winning / total * 100) if total > 0 else 0
-        }
-        
-        metrics["directional"][action] = direction_metrics
-    
-    return metrics
+# Headlines are cached for NEWS_TTL seconds (default 15 minutes) and persisted across restarts
+news_cache = NewsCache(lambda: fetch_serpapi_news(serp_api_key, timeout=CALL_TIMEOUT),
+                       ttl=int(os.getenv("NEWS_TTL", NEWS_TTL)))
+news_cache.refresh_async()  # warm the cache before the first analysis
 
 print("\n=== Bitcoin Trading Bot Started ===")
 print(f"Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
@@ -391,8 +54,12 @@ print("===================================\n")
 
 # Database setup
 setup_database()
+setup_candle_store()
 
 # Multi-timeframe data collection function
+# Only the base timeframe is downloaded; the others are resampled from it locally
+BASE_TIMEFRAME = "15m"
+
 def fetch_multi_timeframe_data():
     # Collect data by timeframe
     timeframes = {
@@ -401,52 +68,38 @@ def fetch_multi_timeframe_data():
         "4h": {"timeframe": "4h", "limit": 30}    # 5 days (4h * 30)
     }
     multi_tf_data = {}
+    base_limit = max(base_candles_needed(BASE_TIMEFRAME, p["timeframe"], p["limit"]) for p in timeframes.values())
+    try:
+        # Only candles newer than the last stored one are downloaded; the window is served from the local store
+        base_df, calls, stored = get_candles(exchange, symbol, BASE_TIMEFRAME, base_limit)
+        print(f"Collected {BASE_TIMEFRAME} base data: {len(base_df)} candles ({stored} fetched in {calls} calls)")
+    except Exception as e:
+        print(f"Error fetching {BASE_TIMEFRAME} data: {e}")
+        return multi_tf_data
     for tf_name, tf_params in timeframes.items():
         try:
-            ohlcv = exchange.fetch_ohlcv(symbol, timeframe=tf_params["timeframe"], limit=tf_params["limit"])
-            df = pd.DataFrame(ohlcv, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
-            df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
+            df = resample_candles(base_df, BASE_TIMEFRAME, tf_params["timeframe"], tf_params["limit"])
             multi_tf_data[tf_name] = df
             print(f"Collected {tf_name} data: {len(df)} candles")
         except Exception as e:
-            print(f"Error fetching {tf_name} data: {e}")
+            print(f"Error building {tf_name} data: {e}")
     return multi_tf_data
 
 # Function to fetch latest Bitcoin news
+# Served from the news cache: never waits for SerpAPI; stale headlines are refreshed in the background
 def fetch_bitcoin_news():
-    try:
-        # Use SERP API to get latest news related to Bitcoin
-        url = "https://serpapi.com/search.json"
-        params = {
-            "engine": "google_news",
-            "q": "bitcoin",
-            "gl": "us",
-            "hl": "en",
-            "api_key": serp_api_key
-        }
-        
-        response = requests.get(url, params=params)
-        if response.status_code == 200:
-            data = response.json()
-            news_results = data.get("news_results", [])
-            
-            # Extract only the 10 latest news items, including only title and date
-            recent_news = []
-            for i, news in enumerate(news_results[:10]):
-                news_item = {
-                    "title": news.get("title", ""),
-                    "date": news.get("date", "")
-                }
-                recent_news.append(news_item)
-            
-            print(f"Collected {len(recent_news)} recent news articles (title and date only)")
-            return recent_news
-        else:
-            print(f"Error fetching news: Status code {response.status_code}")
-            return []
-    except Exception as e:
-        print(f"Error fetching news: {e}")
-        return []
+    return news_cache.get()
+
+# Function to cancel the SL/TP orders left over after a position closed
+def cancel_open_orders():
+    open_orders = exchange.fetch_open_orders(symbol)
+    if open_orders:
+        for order in open_orders:
+            exchange.cancel_order(order['id'], symbol)
+        print("Cancelled remaining open orders for", symbol)
+    else:
+        print("No remaining open orders to cancel.")
+    return len(open_orders)
 
 # Function to handle position closure
 def handle_position_closure(current_price, side, amount, current_trade_id=None):
@@ -500,17 +153,29 @@ def handle_position_closure(current_price, side, amount, current_trade_id=None):
                 print(f"Avg P/L %: {summary['avg_profit_loss_percentage']:.2f}%")
                 print("=============================")
 
-while True:
+# Market data is streamed over websockets (falling back to polling fetch_ticker if ccxt.pro is missing or the
+# streams fail); set MARKET_FEED=poll to always poll
+feed = make_feed(os.getenv("MARKET_FEED", "websocket"), exchange, symbol)
+# Act on closed 15m candles, 0.2% price moves and at least every 5 minutes instead of a fixed 1-minute sleep
+gate = EventGate(move_threshold=0.002, heartbeat=300)
+
+for event in feed.events():
+    if not gate.ready(event):
+        continue
     try:
         # Check current time and price
         current_time = datetime.now().strftime('%H:%M:%S')
-        current_price = exchange.fetch_ticker(symbol)['last']
+        current_price = event['price']
         print(f"\n[{current_time}] Current BTC Price: ${current_price:,.2f}")
 
-        # Check position
+        # Check position and open trades (independent, so fetched concurrently)
+        state = Stage("state", {
+            "positions": lambda: exchange.fetch_positions([symbol]),
+            "open_trade": get_latest_open_trade,
+        }).results()
         current_side = None
         amount = 0
-        positions = exchange.fetch_positions([symbol])
+        positions = state["positions"]
         for position in positions:
             if position['symbol'] == 'BTC/USDT:USDT':
                 amt = float(position['info']['positionAmt'])
@@ -521,8 +186,7 @@ while True:
                     current_side = 'short'
                     amount = abs(amt)
         
-        # Check for open trades
-        current_trade = get_latest_open_trade()
+        current_trade = state["open_trade"]
         current_trade_id = current_trade['id'] if current_trade else None
         
         if current_side:
@@ -550,32 +214,24 @@ while True:
             if current_trade:
                 handle_position_closure(current_price, current_trade['action'], current_trade['amount'], current_trade_id)
             
-            # If no position, cancel remaining open orders
-            try:
-                open_orders = exchange.fetch_open_orders(symbol)
-                if open_orders:
-                    for order in open_orders:
-                        exchange.cancel_order(order['id'], symbol)
-                    print("Cancelled remaining open orders for", symbol)
-                else:
-                    print("No remaining open orders to cancel.")
-            except Exception as e:
-                print("Error cancelling orders:", e)
-                
-            time.sleep(5)
             print("No position. Analyzing market...")
 
-            # Collect multi-timeframe chart data
-            multi_tf_data = fetch_multi_timeframe_data()
-            
-            # Collect latest Bitcoin news
-            recent_news = fetch_bitcoin_news()
-            
-            # Get historical trading data and AI analysis results
-            historical_trading_data = get_historical_trading_data(limit=10)  # latest 10 trades
-            
-            # Calculate overall performance metrics
-            performance_metrics = get_performance_metrics()
+            # If no position, cancel remaining open orders while collecting the analysis inputs.
+            # The cleanup is its own stage with no default: it must have succeeded before the decision stage,
+            # so a leftover SL/TP order can never be live next to a new position (StageError skips this cycle).
+            cleanup = Stage("order cleanup", {"orders": cancel_open_orders})
+            # Only the chart data is required; the other inputs fall back to empty values if they fail or time out.
+            inputs = Stage("analysis inputs", {
+                "charts": fetch_multi_timeframe_data,  # multi-timeframe chart data
+                "news": fetch_bitcoin_news,  # latest Bitcoin news
+                "history": lambda: get_historical_trading_data(limit=10),  # latest 10 trades and AI analyses
+                "metrics": get_performance_metrics,  # overall performance metrics
+            }).results(defaults={"news": [], "history": [], "metrics": {}})
+            cleanup.results()
+            multi_tf_data = inputs["charts"]
+            recent_news = inputs["news"]
+            historical_trading_data = inputs["history"]
+            performance_metrics = inputs["metrics"]
             
             # Prepare data for AI analysis
             market_analysis = {
@@ -676,13 +332,18 @@ Your response must contain ONLY a valid JSON object with exactly these 6 fields:
 IMPORTANT: Do not format your response as a code block. Do not include ```json, ```, or any other markdown formatting. Return ONLY the raw JSON object.
 """
             
-            response = client.chat.completions.create(
-                model="gpt-4o",
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": str(market_analysis)}
-                ]
-            )
+            # Read the balance while the model thinks; it is only needed if a position is opened
+            decision = Stage("decision", {
+                "response": lambda: client.chat.completions.create(
+                    model="gpt-4o",
+                    messages=[
+                        {"role": "system", "content": system_prompt},
+                        {"role": "user", "content": str(market_analysis)}
+                    ]
+                ),
+                "balance": exchange.fetch_balance,
+            }).results(timeout=DECISION_TIMEOUT, defaults={"balance": None})
+            response = decision["response"]
 
             # Parse AI response
             try:
@@ -727,11 +388,11 @@ IMPORTANT: Do not format your response as a code block. Do not include ```json,
                 if action == "no_position":
                     print("It is best not to open a position in the current market situation.")
                     print(f"Reason: {trading_decision['reasoning']}")
-                    time.sleep(60)  # Wait 1 minute when no position
+                    gate.pause(60)  # Wait 1 minute when no position
                     continue
                     
                 # Calculate investment amount (a percentage of available capital)
-                balance = exchange.fetch_balance()
+                balance = decision["balance"] or exchange.fetch_balance()
                 available_capital = balance['USDT']['free']  # Available USDT balance
                 position_size_percentage = trading_decision['recommended_position_size']
                 investment_amount = available_capital * position_size_percentage
@@ -783,12 +444,7 @@ IMPORTANT: Do not format your response as a code block. Do not include ```json,
                     trade_id = save_trade(trade_data)
                     
                     # Link AI analysis result to the trade
-                    update_analysis_sql = "UPDATE ai_analysis SET trade_id = ? WHERE id = ?"
-                    conn = sqlite3.connect(DB_FILE)
-                    cursor = conn.cursor()
-                    cursor.execute(update_analysis_sql, (trade_id, analysis_id))
-                    conn.commit()
-                    conn.close()
+                    link_analysis_to_trade(analysis_id, trade_id)
                     
                     print(f"\n=== LONG Position Opened ===")
                     print(f"Entry: ${entry_price:,.2f}")
@@ -824,12 +480,7 @@ IMPORTANT: Do not format your response as a code block. Do not include ```json,
                     trade_id = save_trade(trade_data)
                     
                     # Link AI analysis result to the trade
-                    update_analysis_sql = "UPDATE ai_analysis SET trade_id = ? WHERE id = ?"
-                    conn = sqlite3.connect(DB_FILE)
-                    cursor = conn.cursor()
-                    cursor.execute(update_analysis_sql, (trade_id, analysis_id))
-                    conn.commit()
-                    conn.close()
+                    link_analysis_to_trade(analysis_id, trade_id)
                     
                     print(f"\n=== SHORT Position Opened ===")
                     print(f"Entry: ${entry_price:,.2f}")
@@ -844,15 +495,13 @@ IMPORTANT: Do not format your response as a code block. Do not include ```json,
             except json.JSONDecodeError as e:
                 print(f"JSON parsing error: {e}")
                 print(f"AI response: {response.choices[0].message.content}")
-                time.sleep(30)  # Wait and retry
+                gate.pause(30)  # Wait and retry
                 continue
             except Exception as e:
                 print(f"Other error: {e}")
-                time.sleep(10)
+                gate.pause(10)
                 continue
 
-        time.sleep(60)  # Main loop runs every 1 minute
-
     except Exception as e:
         print(f"\n Error: {e}")
-        time.sleep(5)
\ No newline at end of file
+        gate.pause(5)
\ No newline at end of file
@@ -0,0 +1,146 @@
+import pandas as pd
+
+from resample import timeframe_ms
+from trading_db import get_connection, transaction
+
+# Candles live in their own file so the trade journal (and the dashboard reading it) stays small
+CANDLE_DB = "market_data.db"
+
+# Candles requested per fetch_ohlcv call when catching up (Binance futures allows up to 1500)
+PAGE_SIZE = 1000
+# Stop catching up after this many pages in one sync; the rest is fetched on the next cycle
+MAX_PAGES = 20
+
+COLUMNS = ['timestamp', 'open', 'high', 'low', 'close', 'volume']
+
+CREATE_CANDLES = '''
+CREATE TABLE IF NOT EXISTS candles (
+    symbol TEXT NOT NULL,
+    timeframe TEXT NOT NULL,
+    timestamp INTEGER NOT NULL,  -- candle open time, ms since epoch (as returned by ccxt)
+    open REAL NOT NULL,
+    high REAL NOT NULL,
+    low REAL NOT NULL,
+    close REAL NOT NULL,
+    volume REAL NOT NULL,
+    PRIMARY KEY (symbol, timeframe, timestamp)
+) WITHOUT ROWID
+'''
+
+# A re-fetched candle (the one that was still forming last time) replaces the stored one
+UPSERT_CANDLE = '''
+INSERT INTO candles (symbol, timeframe, timestamp, open, high, low, close, volume)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (symbol, timeframe, timestamp) DO UPDATE SET
+    open = excluded.open, high = excluded.high, low = excluded.low,
+    close = excluded.close, volume = excluded.volume
+'''
+
+
+def setup_candle_store(db_file=None):
+    """Create the candles table if it does not exist"""
+    with transaction(db_file or CANDLE_DB) as conn:
+        conn.execute(CREATE_CANDLES)
+
+
+def last_timestamp(symbol, timeframe, db_file=None):
+    """Open time (ms) of the newest stored candle, or None if nothing is stored"""
+    return stored_range(symbol, timeframe, db_file)[2]
+
+
+def stored_range(symbol, timeframe, db_file=None):
+    """(candles stored, oldest open time, newest open time); the times are None if nothing is stored"""
+    conn = get_connection(db_file or CANDLE_DB)
+    return conn.execute('''
+    SELECT COUNT(*), MIN(timestamp), MAX(timestamp) FROM candles
+    WHERE symbol = ? AND timeframe = ?
+    ''', (symbol, timeframe)).fetchone()
+
+
+def store_candles(symbol, timeframe, ohlcv, db_file=None):
+    """Insert or update ccxt OHLCV rows ([timestamp, open, high, low, close, volume])"""
+    rows = [(symbol, timeframe, int(c[0]), c[1], c[2], c[3], c[4], c[5]) for c in ohlcv if None not in c[:6]]
+    with transaction(db_file or CANDLE_DB) as conn:
+        conn.executemany(UPSERT_CANDLE, rows)
+    return len(rows)
+
+
+def sync_candles(exchange, symbol, timeframe, limit, db_file=None):
+    """Fetch the candles newer than the last stored one, and older ones while fewer than `limit` are stored;
+    returns (exchange calls, candles stored)"""
+    count, oldest, since = stored_range(symbol, timeframe, db_file)
+    if since is None:
+        # Empty store: the latest `limit` candles are all the analysis needs
+        ohlcv = exchange.fetch_ohlcv(symbol, timeframe=timeframe, limit=limit)
+        return 1, store_candles(symbol, timeframe, ohlcv, db_file)
+
+    calls = stored = 0
+    if count < limit:
+        # Fewer candles than the analysis asks for (e.g. the window grew): page forward from `limit`
+        # candles before the oldest stored one up to it. A symbol without older history costs one call per sync.
+        start = oldest - limit * timeframe_ms(timeframe)
+        while calls < MAX_PAGES:
+            ohlcv = exchange.fetch_ohlcv(symbol, timeframe=timeframe, since=start, limit=PAGE_SIZE)
+            calls += 1
+            older = [c for c in ohlcv if c[0] < oldest]
+            stored += store_candles(symbol, timeframe, older, db_file)
+            if len(older) < len(ohlcv) or len(ohlcv) < PAGE_SIZE:
+                break
+            start = ohlcv[-1][0] + 1
+
+    # Start from the newest stored candle: it was probably still forming when it was stored
+    while calls < MAX_PAGES:
+        ohlcv = exchange.fetch_ohlcv(symbol, timeframe=timeframe, since=since, limit=PAGE_SIZE)
+        calls += 1
+        stored += store_candles(symbol, timeframe, ohlcv, db_file)
+        if len(ohlcv) < PAGE_SIZE or ohlcv[-1][0] <= since:
+            break
+        since = ohlcv[-1][0]
+    return calls, stored
+
+
+def load_candles(symbol, timeframe, limit, db_file=None):
+    """The latest `limit` stored candles, oldest first, in the DataFrame layout the bot uses"""
+    conn = get_connection(db_file or CANDLE_DB)
+    rows = conn.execute('''
+    SELECT timestamp, open, high, low, close, volume FROM candles
+    WHERE symbol = ? AND timeframe = ?
+    ORDER BY timestamp DESC
+    LIMIT ?
+    ''', (symbol, timeframe, limit)).fetchall()
+    df = pd.DataFrame(rows[::-1], columns=COLUMNS)
+    df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
+    return df
+
+
+def get_candles(exchange, symbol, timeframe, limit, db_file=None):
+    """Bring the store up to date and return the latest `limit` candles.
+    If the exchange call fails, the stored candles are returned (and the error is printed)."""
+    try:
+        calls, stored = sync_candles(exchange, symbol, timeframe, limit, db_file)
+    except Exception as e:
+        print(f"Error syncing {symbol} {timeframe} candles, using stored data: {e}")
+        calls, stored = 0, 0
+    df = load_candles(symbol, timeframe, limit, db_file)
+    return df, calls, stored
+
+
+def summary(db_file=None):
+    """Stored range and candle count per symbol and timeframe"""
+    conn = get_connection(db_file or CANDLE_DB)
+    return conn.execute('''
+    SELECT symbol, timeframe, COUNT(*), MIN(timestamp), MAX(timestamp)
+    FROM candles GROUP BY symbol, timeframe ORDER BY symbol, timeframe
+    ''').fetchall()
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description="Local OHLCV candle store")
+    parser.add_argument('--db', default=CANDLE_DB, help="candle database file")
+    args = parser.parse_args()
+
+    setup_candle_store(args.db)
+    for symbol, timeframe, count, first, last in summary(args.db):
+        first, last = pd.to_datetime(first, unit='ms'), pd.to_datetime(last, unit='ms')
+        print(f"{symbol:<12} {timeframe:>4} {count:>8} candles  {first} .. {last}")
@@ -0,0 +1,378 @@
+import abc
+import asyncio
+import bisect
+import queue
+import threading
+import time
+
+# Every feed yields market events as dicts:
+#   type       'trade', 'kline' or 'heartbeat'
+#   price      last traded price
+#   timestamp  exchange time of the event, ms since epoch
+#   closed     True when a candle has just closed at this price
+#   received   time.perf_counter() when the event reached this process
+
+# Seconds before retrying a failed REST ticker request; doubles on every further failure up to MAX_RETRY_DELAY
+RETRY_DELAY = 5
+MAX_RETRY_DELAY = 60
+
+
+def make_event(kind, price, timestamp, closed=False):
+    return {'type': kind, 'price': price, 'timestamp': timestamp, 'closed': closed,
+            'received': time.perf_counter()}
+
+
+class FeedError(Exception):
+    """A feed stopped delivering events (e.g. its websocket thread died)"""
+
+
+class MarketFeed(abc.ABC):
+    """Base class of the market-data feeds: iterate events() and count the REST requests made"""
+
+    def __init__(self):
+        self.requests = 0
+
+    @abc.abstractmethod
+    def events(self):
+        """Market events (see make_event), until the feed is closed"""
+
+    def close(self):
+        pass
+
+
+class PollingFeed(MarketFeed):
+    """The old behaviour: one fetch_ticker request every `interval` seconds.
+    A failed request is printed and retried after RETRY_DELAY seconds, backing off while it keeps failing."""
+
+    def __init__(self, exchange, symbol, interval=60):
+        super().__init__()
+        self.exchange = exchange
+        self.symbol = symbol
+        self.interval = interval
+
+    def events(self):
+        failures = 0
+        while True:
+            self.requests += 1
+            try:
+                ticker = self.exchange.fetch_ticker(self.symbol)
+            except Exception as e:
+                delay = min(RETRY_DELAY * 2 ** failures, MAX_RETRY_DELAY)
+                failures += 1
+                print(f"Error fetching {self.symbol} ticker (retrying in {delay}s): {e}")
+                time.sleep(delay)
+                continue
+            failures = 0
+            yield make_event('trade', ticker['last'], ticker.get('timestamp') or int(time.time() * 1000))
+            time.sleep(self.interval)
+
+
+class WebsocketFeed(MarketFeed):
+    """Trades and candles pushed by the exchange's websocket streams (ccxt.pro).
+
+    The streams run on an asyncio loop in a background thread. When events arrive faster than the
+    consumer handles them, only the newest price is kept, and a candle close is never lost.
+    If nothing arrives for `heartbeat` seconds, a heartbeat event repeats the last price; before the
+    first streamed price it uses `rest_price()` (a REST ticker request) when given, and a failed
+    request just skips that heartbeat.
+    If the thread dies (ccxt.pro missing, unknown exchange, ...), events() raises FeedError.
+    """
+
+    def __init__(self, exchange_id, symbol, timeframe='15m', config=None, heartbeat=30, rest_price=None):
+        super().__init__()
+        self.exchange_id = exchange_id
+        self.symbol = symbol
+        self.timeframe = timeframe
+        self.config = config or {}
+        self.heartbeat = heartbeat
+        self.rest_price = rest_price
+        self._queue = queue.Queue()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _start(self):
+        self._thread = threading.Thread(target=self._thread_main, daemon=True)
+        self._thread.start()
+
+    def _thread_main(self):
+        # Whatever ends the streams is handed to the consumer, which would otherwise wait forever
+        try:
+            asyncio.run(self._run())
+            error = None if self._stop.is_set() else FeedError("websocket streams ended")
+        except BaseException as e:
+            error = e
+        if error is not None:
+            self._queue.put(error)
+
+    def _next(self, timeout=None):
+        """Next queued event; raises FeedError if the stream thread failed"""
+        item = self._queue.get(timeout=timeout) if timeout is not None else self._queue.get_nowait()
+        if isinstance(item, BaseException):
+            raise FeedError(f"{self.exchange_id} websocket feed stopped: {item!r}") from item
+        return item
+
+    async def _run(self):
+        import ccxt.pro as ccxtpro
+        exchange = getattr(ccxtpro, self.exchange_id)(self.config)
+        try:
+            watchers = [self._watch_trades(exchange)]
+            if exchange.has.get('watchOHLCV'):
+                watchers.append(self._watch_klines(exchange))
+            await asyncio.gather(*watchers)
+        finally:
+            await exchange.close()
+
+    async def _watch_trades(self, exchange):
+        while not self._stop.is_set():
+            try:
+                trades = await exchange.watch_trades(self.symbol)
+                if trades:
+                    self._queue.put(make_event('trade', trades[-1]['price'], trades[-1]['timestamp']))
+            except Exception as e:
+                # ccxt.pro reconnects on the next watch call
+                print(f"Trade stream error: {e}")
+                await asyncio.sleep(1)
+
+    async def _watch_klines(self, exchange):
+        current = None
+        while not self._stop.is_set():
+            try:
+                candles = await exchange.watch_ohlcv(self.symbol, self.timeframe)
+                # A candle with a new open time means the one before it has closed
+                if candles and current is not None and candles[-1][0] > current[0]:
+                    closed = next((c for c in reversed(candles) if c[0] == current[0]), current)
+                    self._queue.put(make_event('kline', closed[4], candles[-1][0], closed=True))
+                if candles:
+                    current = candles[-1]
+            except Exception as e:
+                print(f"Candle stream error: {e}")
+                await asyncio.sleep(1)
+
+    def events(self):
+        if self._thread is None:
+            self._start()
+        last = None
+        while not self._stop.is_set():
+            try:
+                event = self._next(timeout=self.heartbeat)
+            except queue.Empty:
+                if not self._thread.is_alive() and self._queue.empty():
+                    raise FeedError(f"{self.exchange_id} websocket thread is not running")
+                if last is not None:
+                    yield make_event('heartbeat', last['price'], int(time.time() * 1000))
+                elif self.rest_price is not None:
+                    # Nothing streamed yet: keep the strategy running on a REST price
+                    self.requests += 1
+                    try:
+                        price = self.rest_price()
+                    except Exception as e:
+                        print(f"Error fetching the heartbeat price (retrying in {self.heartbeat}s): {e}")
+                        continue
+                    yield make_event('heartbeat', price, int(time.time() * 1000))
+                continue
+            # Coalesce the backlog into its newest event
+            closed = event['closed']
+            while True:
+                try:
+                    event = self._next()
+                except queue.Empty:
+                    break
+                closed = closed or event['closed']
+            event['closed'] = closed
+            last = event
+            yield event
+
+    def close(self):
+        self._stop.set()
+
+
+class ReplayFeed(MarketFeed):
+    """Replays stored ticks [(timestamp ms, price, closed)], for testing strategies without an exchange.
+    speed=0 replays as fast as possible; speed=60 plays one market minute per second."""
+
+    def __init__(self, ticks, speed=0):
+        super().__init__()
+        self.ticks = ticks
+        self.speed = speed
+
+    @classmethod
+    def from_candles(cls, df, timeframe_ms, speed=0):
+        """Four ticks per candle (open, then the nearer extreme, the other extreme and the close), the last one closing it"""
+        ticks = []
+        for row in df.itertuples(index=False):
+            start = int(row.timestamp.timestamp() * 1000)
+            extremes = (row.low, row.high) if row.close >= row.open else (row.high, row.low)
+            path = [row.open, *extremes, row.close]
+            for i, price in enumerate(path):
+                ticks.append((start + timeframe_ms * i // 4 + (timeframe_ms // 4 - 1 if i == 3 else 0),
+                              float(price), i == 3))
+        return cls(ticks, speed)
+
+    def events(self):
+        previous = None
+        for timestamp, price, closed in self.ticks:
+            if self.speed and previous is not None:
+                time.sleep((timestamp - previous) / 1000 / self.speed)
+            previous = timestamp
+            yield make_event('kline' if closed else 'trade', price, timestamp, closed)
+
+
+class FallbackFeed(MarketFeed):
+    """Events from `primary` until it raises FeedError, then from `fallback`"""
+
+    def __init__(self, primary, fallback):
+        super().__init__()
+        self.primary = primary
+        self.fallback = fallback
+
+    def events(self):
+        try:
+            yield from self.primary.events()
+        except FeedError as e:
+            print(f"{e}; continuing with {type(self.fallback).__name__}")
+            self.primary.close()
+        yield from self.fallback.events()
+
+    def close(self):
+        self.primary.close()
+        self.fallback.close()
+
+
+def make_feed(kind, exchange, symbol, interval=60, timeframe='15m'):
+    """Build a feed by name: 'websocket' (default; polling if ccxt.pro is missing or the streams fail) or 'poll'"""
+    if kind == 'poll':
+        return PollingFeed(exchange, symbol, interval)
+    if kind == 'websocket':
+        polling = PollingFeed(exchange, symbol, interval)
+        try:
+            import ccxt.pro  # noqa: F401
+        except ImportError:
+            print("ccxt.pro is not available; polling fetch_ticker instead of streaming")
+            return polling
+        options = {'defaultType': exchange.options.get('defaultType', 'spot')}
+        websocket = WebsocketFeed(exchange.id, symbol, timeframe, {'options': options},
+                                  rest_price=lambda: exchange.fetch_ticker(symbol)['last'])
+        return FallbackFeed(websocket, polling)
+    raise ValueError(f"Unknown market feed {kind!r}")
+
+
+class EventGate:
+    """Decides which market events the strategy acts on, replacing the fixed sleeps of the main loop.
+
+    An event passes when a candle closes, when the price has moved by `move_threshold` since the last
+    event that passed, or when `heartbeat` seconds have gone by. pause() holds everything back for a
+    while (a cooldown after a decision or an error). Times are exchange timestamps, so replays behave
+    the same as live feeds.
+    """
+
+    def __init__(self, move_threshold=0.002, heartbeat=300):
+        self.move_threshold = move_threshold
+        self.heartbeat_ms = heartbeat * 1000
+        self.last_price = None
+        self.last_fired = None
+        self.now = 0
+        self.paused_until = 0
+
+    def ready(self, event):
+        self.now = event['timestamp']
+        if self.now < self.paused_until:
+            return False
+        price = event['price']
+        fire = (self.last_price is None or event['closed']
+                or abs(price / self.last_price - 1) >= self.move_threshold
+                or self.now - self.last_fired >= self.heartbeat_ms)
+        if fire:
+            self.last_price = price
+            self.last_fired = self.now
+        return fire
+
+    def pause(self, seconds):
+        self.paused_until = self.now + seconds * 1000
+
+
+# =============================================================================
+# Replay benchmark: polling every N seconds vs reacting to streamed events
+# =============================================================================
+
+def signal_times(ticks, move_threshold):
+    """Market times the strategy should react to: candle closes and moves of at least move_threshold"""
+    signals, reference = [], None
+    for timestamp, price, closed in ticks:
+        if reference is None or closed or abs(price / reference - 1) >= move_threshold:
+            signals.append(timestamp)
+            reference = price
+    return signals
+
+
+def replay_polling(ticks, interval, move_threshold):
+    """Reaction delay (market seconds) and requests when polling fetch_ticker + fetch_positions every interval"""
+    signals = signal_times(ticks, move_threshold)
+    start, end = ticks[0][0], ticks[-1][0]
+    polls = (end - start) // (interval * 1000) + 1
+    delays = [(-(t - start) % (interval * 1000)) / 1000 for t in signals]
+    return polls * 2, delays
+
+
+def replay_streaming(ticks, move_threshold, heartbeat):
+    """Reaction delay (market seconds) and requests (one fetch_positions per event acted on) with the event gate"""
+    feed, gate = ReplayFeed(ticks), EventGate(move_threshold, heartbeat)
+    decisions = [event['timestamp'] for event in feed.events() if gate.ready(event)]
+    # A signal is acted on at the first decision at or after it; the last decision stands in if none follows
+    delays = [(decisions[min(bisect.bisect_left(decisions, t), len(decisions) - 1)] - t) / 1000
+              for t in signal_times(ticks, move_threshold)]
+    return len(decisions), [max(delay, 0.0) for delay in delays]
+
+
+def synthetic_candles(count, timeframe_ms, seed=1):
+    import numpy as np
+    import pandas as pd
+    rng = np.random.default_rng(seed)
+    close = 60000 * np.exp(np.cumsum(rng.normal(0, 0.003, count)))
+    open_ = np.r_[close[0], close[:-1]]
+    spread = np.abs(rng.normal(0, 0.002, count)) * close
+    start = int(time.time() * 1000) // timeframe_ms * timeframe_ms - count * timeframe_ms
+    return pd.DataFrame({
+        'timestamp': pd.to_datetime(start + np.arange(count) * timeframe_ms, unit='ms'),
+        'open': open_, 'high': np.maximum(open_, close) + spread, 'low': np.minimum(open_, close) - spread,
+        'close': close, 'volume': 1.0,
+    })
+
+
+def replay_benchmark(df, timeframe_ms, poll_interval=60, move_threshold=0.002, heartbeat=300):
+    ticks = ReplayFeed.from_candles(df, timeframe_ms).ticks
+    days = (ticks[-1][0] - ticks[0][0]) / 86_400_000
+    signals = len(signal_times(ticks, move_threshold))
+    print(f"Replaying {len(df)} candles ({len(ticks)} ticks, {days:.1f} days), {signals} signals "
+          f"(candle closes and moves >= {move_threshold:.2%})")
+
+    modes = [(f"poll every {poll_interval}s", *replay_polling(ticks, poll_interval, move_threshold)),
+             ("stream + event gate", *replay_streaming(ticks, move_threshold, heartbeat))]
+    print(f"{'mode':<22} {'requests':>9} {'per day':>8} {'mean reaction':>14} {'p99 reaction':>13}")
+    for name, requests, delays in modes:
+        delays.sort()
+        print(f"{name:<22} {requests:>9} {requests / days:>8.0f} "
+              f"{sum(delays) / len(delays):>13.1f}s {delays[int(len(delays) * 0.99)]:>12.1f}s")
+    print("Reaction is market time from a signal to the next decision that sees it "
+          "(live, network latency comes on top of both: the REST round trip or the websocket delivery)")
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description="Replay stored candles to compare polling with event-driven reaction")
+    parser.add_argument('--db', default=None, help="candle database (defaults to candle_store.CANDLE_DB)")
+    parser.add_argument('--symbol', default="BTC/USDT")
+    parser.add_argument('--timeframe', default="15m")
+    parser.add_argument('--candles', type=int, default=2000, help="candles to replay")
+    parser.add_argument('--poll-interval', type=int, default=60, help="seconds between polls in the polling mode")
+    parser.add_argument('--threshold', type=float, default=0.002, help="price move the strategy reacts to")
+    parser.add_argument("--heartbeat", type=int, default=300, help="seconds between forced checks in streaming mode")
+    args = parser.parse_args()
+
+    from candle_store import load_candles, setup_candle_store
+    from resample import timeframe_ms
+    setup_candle_store(args.db)
+    df = load_candles(args.symbol, args.timeframe, args.candles, args.db)
+    if len(df) < 2:
+        print("No stored candles; replaying a synthetic random walk")
+        df = synthetic_candles(args.candles, timeframe_ms(args.timeframe))
+    replay_benchmark(df, timeframe_ms(args.timeframe), args.poll_interval, args.threshold, args.heartbeat)
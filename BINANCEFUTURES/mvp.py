@@ -7,6 +7,7 @@ import math
 from openai import OpenAI
 import time
 from datetime import datetime
+from market_feed import make_feed, EventGate
 
 api_key = os.getenv("COINBASE_API_KEY")
 secret = os.getenv("COINBASE_SECRET_KEY")
@@ -31,11 +32,18 @@ print("Leverage: 5x")
 print("SL/TP: ±0.5%")
 print("===================================\n")
 
-while True:
+# Stream prices over websockets (MARKET_FEED=poll polls fetch_ticker every second instead)
+feed = make_feed(os.getenv("MARKET_FEED", "websocket"), exchange, symbol, interval=1)
+# React to 0.1% moves (the SL/TP is 0.5%) and check the position at least once a minute
+gate = EventGate(move_threshold=0.001, heartbeat=60)
+
+for event in feed.events():
+    if not gate.ready(event):
+        continue
     try:
         # Get current time and price
         current_time = datetime.now().strftime('%H:%M:%S')
-        current_price = exchange.fetch_ticker(symbol)['last']
+        current_price = event['price']
         print(f"\n[{current_time}] Current BTC Price: ${current_price:,.2f}")
 
         # Check position
@@ -125,8 +133,6 @@ while True:
             else:
                 print("Action is neither 'long' nor 'short', so no orders executed.")
 
-        time.sleep(1)
-
     except Exception as e:
         print(f"\n Error: {e}")
-        time.sleep(5)
\ No newline at end of file
+        gate.pause(5)
\ No newline at end of file
@@ -0,0 +1,141 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import unicodedata
+
+import requests
+
+# Seconds cached headlines are served before a background refresh is started
+NEWS_TTL = 900
+# Seconds between refresh attempts while the news API is failing
+RETRY_INTERVAL = 60
+# Headlines kept (and passed to the model)
+MAX_ITEMS = 10
+# A headline is dropped this many TTLs after it was last returned by the news API
+MAX_AGE_TTLS = 4
+NEWS_CACHE_FILE = "news_cache.json"
+
+
+def fetch_serpapi_news(api_key, query="bitcoin", limit=MAX_ITEMS, timeout=10):
+    """Latest Google News headlines from SerpAPI as [{"title", "date"}]; raises on any error"""
+    params = {
+        "engine": "google_news",
+        "q": query,
+        "gl": "us",
+        "hl": "en",
+        "api_key": api_key
+    }
+    response = requests.get("https://serpapi.com/search.json", params=params, timeout=timeout)
+    response.raise_for_status()
+    news_results = response.json().get("news_results", [])
+    return [{"title": news.get("title", ""), "date": news.get("date", "")} for news in news_results[:limit]]
+
+
+def title_hash(title):
+    """Hash of a headline with case, punctuation and spacing normalized, so reposts of a story compare equal"""
+    text = unicodedata.normalize('NFKC', title).casefold()
+    text = ' '.join(re.sub(r'[^\w\s]', ' ', text).split())
+    return hashlib.sha1(text.encode()).hexdigest()
+
+
+def dedupe(items, limit=MAX_ITEMS):
+    """Drop headlines whose normalized title was already seen (earlier items win) and empty titles"""
+    seen, unique = set(), []
+    for item in items:
+        key = title_hash(item.get("title", ""))
+        if item.get("title") and key not in seen:
+            seen.add(key)
+            unique.append(item)
+    return unique[:limit]
+
+
+class NewsCache:
+    """Headlines cached with a TTL and persisted to a JSON file, served stale-while-revalidate.
+
+    get() never waits for the news API: it returns the cached headlines (possibly stale, or none at all
+    on the very first start) and, if they are older than the TTL, refreshes them on a background thread.
+    A failed refresh keeps the old headlines and is retried after RETRY_INTERVAL seconds.
+    Every headline carries the time it was last fetched, and is dropped MAX_AGE_TTLS TTLs after that.
+    """
+
+    def __init__(self, fetch, ttl=NEWS_TTL, path=NEWS_CACHE_FILE, max_items=MAX_ITEMS):
+        self.fetch = fetch
+        self.ttl = ttl
+        self.path = path
+        self.max_items = max_items
+        self.items = []
+        self.fetched_at = 0.0
+        self.last_attempt = 0.0
+        self._lock = threading.Lock()
+        self._refreshing = False
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+            fetched_at = float(data["fetched_at"])
+            # Files written before headlines had their own fetch time: use the file's
+            items = [{**item, "fetched_at": float(item.get("fetched_at", fetched_at))} for item in data["items"]]
+            self.items = dedupe(self._unexpired(items), self.max_items)
+            self.fetched_at = fetched_at
+        except (OSError, ValueError, KeyError, TypeError):
+            # No cache file yet (or an unreadable one): start empty
+            pass
+
+    def _save(self):
+        tmp = f"{self.path}.tmp"
+        with open(tmp, 'w') as f:
+            json.dump({"fetched_at": self.fetched_at, "items": self.items}, f)
+        os.replace(tmp, self.path)
+
+    def age(self):
+        return time.time() - self.fetched_at
+
+    def _unexpired(self, items):
+        cutoff = time.time() - MAX_AGE_TTLS * self.ttl
+        return [item for item in items if item["fetched_at"] > cutoff]
+
+    def refresh(self):
+        """Fetch now (blocking). New headlines come first; unexpired older ones fill the remaining slots."""
+        try:
+            fresh = self.fetch()
+        except Exception as e:
+            print(f"Error fetching news (keeping {len(self.items)} cached headlines): {e}")
+            return False
+        finally:
+            with self._lock:
+                self.last_attempt = time.time()
+                self._refreshing = False
+        with self._lock:
+            now = time.time()
+            fresh = [{**item, "fetched_at": now} for item in fresh]
+            self.items = dedupe(fresh + self._unexpired(self.items), self.max_items)
+            self.fetched_at = now
+            self._save()
+        print(f"Refreshed news: {len(fresh)} fetched, {len(self.items)} unique headlines cached")
+        return True
+
+    def refresh_async(self):
+        """Start a background refresh unless one is running or the last attempt was too recent"""
+        with self._lock:
+            if self._refreshing or time.time() - self.last_attempt < RETRY_INTERVAL:
+                return False
+            self._refreshing = True
+        threading.Thread(target=self.refresh, name="news-refresh", daemon=True).start()
+        return True
+
+    def get(self):
+        """Cached headlines ({"title", "date"}), immediately; starts a background refresh when they are older
+        than the TTL. Expired headlines are left out even while refreshes keep failing."""
+        with self._lock:
+            items, age = self._unexpired(self.items), self.age()
+        items = [{key: value for key, value in item.items() if key != "fetched_at"} for item in items]
+        if age >= self.ttl:
+            self.refresh_async()
+        print(f"Collected {len(items)} recent news articles from cache "
+              f"({'no news yet' if not items else f'{age / 60:.0f} min old'}{', refreshing' if age >= self.ttl else ''})")
+        return items
@@ -0,0 +1,152 @@
+import json
+
+import numpy as np
+import pandas as pd
+
+# Binance candles open on multiples of the timeframe counted from the Unix epoch (UTC),
+# except weekly candles, which open on Monday 00:00 UTC (the epoch was a Thursday)
+UNITS_MS = {'m': 60_000, 'h': 3_600_000, 'd': 86_400_000, 'w': 604_800_000}
+WEEK_OFFSET_MS = 4 * 86_400_000
+
+COLUMNS = ['timestamp', 'open', 'high', 'low', 'close', 'volume']
+
+
+def timeframe_ms(timeframe):
+    """Length of a ccxt timeframe string ('15m', '4h', '1d', '1w') in milliseconds"""
+    amount, unit = timeframe[:-1], timeframe[-1]
+    if unit not in UNITS_MS or not amount.isdigit() or int(amount) == 0:
+        raise ValueError(f"Unsupported timeframe {timeframe!r}")
+    return int(amount) * UNITS_MS[unit]
+
+
+def base_candles_needed(base_timeframe, timeframe, limit):
+    """Base candles to load so that `limit` complete candles of `timeframe` can be built"""
+    ratio = timeframe_ms(timeframe) // timeframe_ms(base_timeframe)
+    # One extra bucket, because the oldest one is usually cut off partway
+    return (limit + 1) * ratio
+
+
+def resample_ohlcv(df, base_timeframe, timeframe):
+    """Aggregate base candles (oldest first, timestamp as datetime) into `timeframe` candles.
+
+    Buckets that are missing base candles are dropped, because the exchange's candle would differ.
+    The newest bucket may end early: like the exchange's, it is still forming.
+    """
+    base_ms, period_ms = timeframe_ms(base_timeframe), timeframe_ms(timeframe)
+    if period_ms % base_ms:
+        raise ValueError(f"{timeframe} is not a multiple of {base_timeframe}")
+    if df.empty:
+        return pd.DataFrame(columns=COLUMNS)
+
+    ts = df['timestamp'].to_numpy().astype('datetime64[ms]').astype(np.int64)
+    offset = WEEK_OFFSET_MS if timeframe.endswith('w') else 0
+    buckets = (ts - offset) // period_ms * period_ms + offset
+
+    # Index of the first base candle of each bucket (the input is sorted, so buckets are contiguous runs)
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    ends = np.r_[starts[1:], len(ts)] - 1
+
+    open_, high, low, close, volume = (df[c].to_numpy(dtype=float) for c in COLUMNS[1:])
+    out = pd.DataFrame({
+        'timestamp': buckets[starts],
+        'open': open_[starts],
+        'high': np.maximum.reduceat(high, starts),
+        'low': np.minimum.reduceat(low, starts),
+        'close': close[ends],
+        'volume': np.add.reduceat(volume, starts),
+    })
+
+    # Complete: starts on the bucket boundary and has no missing base candles.
+    # Every bucket must be full except the newest, which only has to be contiguous so far.
+    counts = ends - starts + 1
+    expected = np.full(len(starts), period_ms // base_ms)
+    expected[-1] = (ts[-1] - buckets[-1]) // base_ms + 1
+    complete = (ts[starts] == buckets[starts]) & (counts == expected)
+
+    out = out[complete].reset_index(drop=True)
+    out['timestamp'] = pd.to_datetime(out['timestamp'], unit='ms')
+    return out
+
+
+def resample_candles(df, base_timeframe, timeframe, limit):
+    """The latest `limit` candles of `timeframe` built from base candles (the base itself is passed through)"""
+    if timeframe == base_timeframe:
+        return df.tail(limit).reset_index(drop=True)
+    return resample_ohlcv(df, base_timeframe, timeframe).tail(limit).reset_index(drop=True)
+
+
+def compare(derived, fetched):
+    """Mismatch descriptions between derived and exchange candles, over the timestamps both have"""
+    merged = derived.merge(fetched, on='timestamp', suffixes=('_derived', '_exchange'))
+    problems = []
+    for column in COLUMNS[1:]:
+        a, b = merged[f'{column}_derived'], merged[f'{column}_exchange']
+        # Prices are copied as-is and must match exactly; volume is a sum of floats
+        same = np.isclose(a, b, rtol=1e-9, atol=1e-8) if column == 'volume' else (a == b)
+        for _, row in merged[~same].iterrows():
+            problems.append(f"{row['timestamp']} {column}: derived {row[f'{column}_derived']} "
+                            f"exchange {row[f'{column}_exchange']}")
+    return len(merged), problems
+
+
+def verify(exchange, symbol, base_timeframe, timeframes, limit):
+    """Fetch base and higher-timeframe candles from the exchange and check that resampling reproduces them"""
+    base_limit = max(base_candles_needed(base_timeframe, tf, limit) for tf in timeframes)
+    base = exchange.fetch_ohlcv(symbol, timeframe=base_timeframe, limit=base_limit)
+    base = pd.DataFrame(base, columns=COLUMNS)
+    base['timestamp'] = pd.to_datetime(base['timestamp'], unit='ms')
+
+    failures = 0
+    for tf in timeframes:
+        fetched = pd.DataFrame(exchange.fetch_ohlcv(symbol, timeframe=tf, limit=limit), columns=COLUMNS)
+        fetched['timestamp'] = pd.to_datetime(fetched['timestamp'], unit='ms')
+        checked, problems = compare(resample_candles(base, base_timeframe, tf, limit), fetched)
+        failures += len(problems)
+        print(f"{symbol} {base_timeframe} -> {tf}: {checked} candles compared, {len(problems)} mismatches")
+        for problem in problems[:10]:
+            print("   ", problem)
+    return failures
+
+
+def record(exchange, symbol, base_timeframe, timeframes, limit, path):
+    """Save base and higher-timeframe candles from the exchange as the fixture of tests/test_resample.py.
+    One base candle inside a complete bucket of every timeframe is left out, so the fixture covers a gap."""
+    base_limit = max(base_candles_needed(base_timeframe, tf, limit) for tf in timeframes)
+    candles = {base_timeframe: exchange.fetch_ohlcv(symbol, timeframe=base_timeframe, limit=base_limit)}
+    for tf in timeframes:
+        candles[tf] = exchange.fetch_ohlcv(symbol, timeframe=tf, limit=limit)
+    longest = max(timeframe_ms(tf) for tf in timeframes)
+    # Second base candle of the middle bucket of the longest timeframe
+    middle = candles[base_timeframe][len(candles[base_timeframe]) // 2][0] // longest * longest
+    gap = middle + timeframe_ms(base_timeframe)
+    candles[base_timeframe] = [c for c in candles[base_timeframe] if c[0] != gap]
+    with open(path, 'w') as f:
+        json.dump({'symbol': symbol, 'base_timeframe': base_timeframe, 'gap': gap, 'candles': candles}, f, indent=1)
+    print(f"Recorded {', '.join(f'{len(c)} {tf}' for tf, c in candles.items())} candles to {path}")
+
+
+if __name__ == '__main__':
+    import argparse
+    import sys
+    parser = argparse.ArgumentParser(description="Build higher-timeframe candles from a base timeframe")
+    parser.add_argument('--verify', action='store_true', help="compare resampled candles with the exchange's")
+    parser.add_argument('--record', metavar='PATH', help="save the exchange's candles as a test fixture")
+    parser.add_argument('--symbol', default="BTC/USDT")
+    parser.add_argument('--base', default="15m", help="base timeframe")
+    parser.add_argument('--timeframes', default="1h,4h", help="comma-separated timeframes to check")
+    parser.add_argument('--limit', type=int, default=30, help="candles per timeframe")
+    args = parser.parse_args()
+
+    if args.verify or args.record:
+        import ccxt
+        # Public market data only; no API key needed
+        exchange = ccxt.binance({'enableRateLimit': True, 'options': {'defaultType': 'future'}})
+        if args.record:
+            record(exchange, args.symbol, args.base, args.timeframes.split(','), args.limit, args.record)
+            sys.exit(0)
+        # Run twice in case a candle closed between the base and higher-timeframe fetches
+        failures = verify(exchange, args.symbol, args.base, args.timeframes.split(','), args.limit)
+        if failures:
+            failures = verify(exchange, args.symbol, args.base, args.timeframes.split(','), args.limit)
+        sys.exit(1 if failures else 0)
+    parser.print_help()
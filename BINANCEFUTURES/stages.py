@@ -0,0 +1,92 @@
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+
+# Seconds a stage waits for its calls before using their defaults. The clients are given the same timeout
+# (ccxt's `timeout`, the OpenAI client's `timeout`), so a timed-out call stops soon after the stage gives up on it.
+CALL_TIMEOUT = 10
+
+# Threads for the bot's blocking I/O: ccxt REST calls, HTTP requests and SQLite
+# (trading_db gives every thread its own connection)
+executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="io")
+
+# Calls a stage timed out on that are still running, by (stage name, key). A thread cannot be interrupted,
+# so the next stage fails such a call at once instead of tying up another worker with a second copy.
+_abandoned = {}
+_abandoned_lock = threading.Lock()
+
+
+class StageError(Exception):
+    """A call the stage cannot do without failed or timed out"""
+
+
+def _timed(func):
+    started = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - started
+
+
+def abandoned():
+    """Calls that timed out and are still running on the pool"""
+    with _abandoned_lock:
+        for call in [call for call, future in _abandoned.items() if future.done()]:
+            del _abandoned[call]
+        return sorted(_abandoned)
+
+
+class Stage:
+    """Independent I/O calls started together on the thread pool.
+
+    Stage("market data", {"news": fetch_bitcoin_news, ...}) submits every call immediately;
+    results() waits for them and prints how long the stage took next to the sum of its calls.
+    """
+
+    def __init__(self, name, calls):
+        self.name = name
+        self.started = time.perf_counter()
+        still_running = set(abandoned())
+        self.futures = {}
+        for key, func in calls.items():
+            if (name, key) in still_running:
+                self.futures[key] = Future()
+                self.futures[key].set_exception(StageError("the previous call is still running"))
+            else:
+                self.futures[key] = executor.submit(_timed, func)
+
+    def results(self, timeout=CALL_TIMEOUT, defaults=None):
+        """{key: result}. A call that fails or is still running `timeout` seconds after the stage started
+        gets its value from `defaults`; if it has none, StageError is raised."""
+        defaults = defaults or {}
+        wait(self.futures.values(), timeout=max(0, self.started + timeout - time.perf_counter()))
+        wall = time.perf_counter() - self.started
+
+        results, timings, missing, sequential = {}, [], [], 0.0
+        for key, future in self.futures.items():
+            if not future.done():
+                # A queued call is cancelled; a running one finishes in the background and its result is dropped
+                if not future.cancel():
+                    with _abandoned_lock:
+                        _abandoned[(self.name, key)] = future
+                error, elapsed = f"timed out after {timeout}s", timeout
+            elif future.exception() is not None:
+                error, elapsed = f"failed: {future.exception()}", 0.0
+            else:
+                results[key], elapsed = future.result()
+                sequential += elapsed
+                timings.append(f"{key} {elapsed:.2f}s")
+                continue
+            sequential += elapsed
+            timings.append(f"{key} {error}")
+            if key in defaults:
+                results[key] = defaults[key]
+            else:
+                missing.append(f"{key} {error}")
+
+        print(f"[{self.name}] {wall:.2f}s (sequential {sequential:.2f}s): {', '.join(timings)}")
+        running = abandoned()
+        if running:
+            print(f"[{self.name}] {len(running)} timed-out calls still running: "
+                  f"{', '.join(f'{stage}/{key}' for stage, key in running)}")
+        if missing:
+            raise StageError(f"{self.name}: {', '.join(missing)}")
+        return results
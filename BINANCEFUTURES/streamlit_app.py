@@ -1,11 +1,12 @@
 import streamlit as st
-import sqlite3
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 from datetime import datetime, timedelta
 import ccxt  # Cryptocurrency exchange API library
 import numpy as np
+from trading_db import (get_connection, get_daily_performance, get_initial_investment, get_max_drawdown,
+                        setup_database, window_start, TRADES_QUERY, AI_ANALYSIS_QUERY)
 
 # Page configuration
 st.set_page_config(
@@ -74,36 +75,24 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+# Create the database or migrate it to the current schema (performance_rollup, indexes) before
+# the first query; cached so it runs once per dashboard process, not on every rerun
+@st.cache_resource
+def prepare_database():
+    setup_database()
+    return True
+
 # Functions to read data from SQLite database
 def get_trades_data():
-    # Create a new connection for use in the current thread
-    conn = sqlite3.connect("bitcoin_trading.db")
-    query = """
-    SELECT 
-        id, timestamp, action, entry_price, exit_price, amount, leverage, 
-        status, profit_loss, profit_loss_percentage, exit_timestamp
-    FROM trades
-    ORDER BY timestamp DESC
-    """
-    df = pd.read_sql_query(query, conn)
-    conn.close()  # Close connection
+    # Reuse this thread's connection; in WAL mode reading never blocks the bot's writes
+    df = pd.read_sql_query(TRADES_QUERY, get_connection())
     df['timestamp'] = pd.to_datetime(df['timestamp'])
     if 'exit_timestamp' in df.columns:
         df['exit_timestamp'] = pd.to_datetime(df['exit_timestamp'])
     return df
 
 def get_ai_analysis_data():
-    # Create a new connection for use in the current thread
-    conn = sqlite3.connect("bitcoin_trading.db")
-    query = """
-    SELECT 
-        id, timestamp, current_price, direction, 
-        recommended_leverage, reasoning, trade_id
-    FROM ai_analysis
-    ORDER BY timestamp DESC
-    """
-    df = pd.read_sql_query(query, conn)
-    conn.close()  # Close connection
+    df = pd.read_sql_query(AI_ANALYSIS_QUERY, get_connection())
     df['timestamp'] = pd.to_datetime(df['timestamp'])
     return df
 
@@ -116,23 +105,11 @@ def get_bitcoin_price_data(timeframe='1d', limit=90):
     df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
     return df
 
-# Function to calculate trading performance metrics
-def calculate_trading_metrics(trades_df):
-    if trades_df.empty:
-        return {
-            'total_return': 0,
-            'sharpe_ratio': 0,
-            'win_rate': 0,
-            'profit_factor': 0,
-            'max_drawdown': 0,
-            'total_trades': 0,
-            'avg_profit_loss': 0,
-            'avg_holding_time': 0
-        }
-    
-    # Filter only closed trades
-    closed_trades = trades_df[trades_df['status'] == 'CLOSED']
-    if closed_trades.empty:
+# Function to calculate trading performance metrics from the per-day rollup rows
+# (the bot keeps them up to date as trades close, so this does not depend on how many trades there are)
+def calculate_trading_metrics(days=None):
+    daily_df = pd.DataFrame(get_daily_performance(days))
+    if daily_df.empty or daily_df['total_trades'].sum() == 0:
         return {
             'total_return': 0,
             'sharpe_ratio': 0,
@@ -143,57 +120,40 @@ def calculate_trading_metrics(trades_df):
             'avg_profit_loss': 0,
             'avg_holding_time': 0
         }
+    totals = daily_df.sum(numeric_only=True)
     
-    # Total Return (Initial investment is estimated)
-    total_profit_loss = closed_trades['profit_loss'].sum()
-    # Estimate initial investment
-    initial_investment = closed_trades.sort_values('timestamp').head(3)['entry_price'].mean() * \
-                         closed_trades.sort_values('timestamp').head(3)['amount'].mean()
+    # Total Return (Initial investment is estimated from the first trades in the period)
+    total_profit_loss = totals['total_profit_loss']
+    initial_investment = get_initial_investment(days)
     if initial_investment < 100:  # If too small, set to a reasonable value
         initial_investment = 10000
     total_return = (total_profit_loss / initial_investment) * 100
     
     # Win Rate
-    winning_trades = len(closed_trades[closed_trades['profit_loss'] > 0])
-    total_trades = len(closed_trades)
-    win_rate = (winning_trades / total_trades) * 100 if total_trades > 0 else 0
+    total_trades = int(totals['total_trades'])
+    win_rate = (totals['winning_trades'] / total_trades) * 100 if total_trades > 0 else 0
     
     # Profit Factor
-    total_profit = closed_trades[closed_trades['profit_loss'] > 0]['profit_loss'].sum()
-    total_loss = abs(closed_trades[closed_trades['profit_loss'] < 0]['profit_loss'].sum())
-    profit_factor = total_profit / total_loss if total_loss > 0 else 0
+    profit_factor = totals['gross_profit'] / totals['gross_loss'] if totals['gross_loss'] > 0 else 0
     
     # Maximum Drawdown
-    closed_trades_sorted = closed_trades.sort_values('timestamp')
-    if 'profit_loss' in closed_trades_sorted.columns:
-        closed_trades_sorted['cumulative_pl'] = closed_trades_sorted['profit_loss'].cumsum()
-        closed_trades_sorted['peak'] = closed_trades_sorted['cumulative_pl'].cummax()
-        closed_trades_sorted['drawdown'] = (closed_trades_sorted['peak'] - closed_trades_sorted['cumulative_pl']) / closed_trades_sorted['peak'].replace(0, np.nan)
-        max_drawdown = closed_trades_sorted['drawdown'].max() * 100  # Convert to percentage
-    else:
-        max_drawdown = 0
+    max_drawdown = get_max_drawdown(days) * 100  # Convert to percentage
     
-    # Sharpe Ratio (based on daily returns)
-    if 'profit_loss_percentage' in closed_trades.columns and len(closed_trades) > 1:
-        returns = closed_trades['profit_loss_percentage'] / 100  # Convert to ratio
-        sharpe_ratio = (returns.mean() / returns.std()) * np.sqrt(365) if returns.std() > 0 else 0
+    # Sharpe Ratio (per-trade returns; the mean and standard deviation come from the summed returns and squares)
+    n = totals['percentage_count']
+    if n > 1:
+        mean = totals['sum_percentage'] / n
+        variance = max((totals['sum_squared_percentage'] - n * mean * mean) / (n - 1), 0)
+        std = np.sqrt(variance)
+        sharpe_ratio = (mean / std) * np.sqrt(365) if std > 0 else 0
     else:
         sharpe_ratio = 0
     
     # Average Profit/Loss
-    avg_profit_loss = closed_trades['profit_loss'].mean()
+    avg_profit_loss = total_profit_loss / totals['profit_loss_count'] if totals['profit_loss_count'] > 0 else 0
     
-    # Average Holding Time
-    if 'exit_timestamp' in closed_trades.columns and 'timestamp' in closed_trades.columns:
-        # Check if both timestamp and exit_timestamp are datetime
-        valid_timestamps = closed_trades.dropna(subset=['exit_timestamp'])
-        if not valid_timestamps.empty:
-            holding_times = (valid_timestamps['exit_timestamp'] - valid_timestamps['timestamp']).dt.total_seconds() / 3600  # in hours
-            avg_holding_time = holding_times.mean()
-        else:
-            avg_holding_time = 0
-    else:
-        avg_holding_time = 0
+    # Average Holding Time (in hours)
+    avg_holding_time = totals['holding_seconds'] / totals['holding_count'] / 3600 if totals['holding_count'] > 0 else 0
     
     return {
         'total_return': total_return,
@@ -207,6 +167,8 @@ def calculate_trading_metrics(trades_df):
     }
 
 try:
+    prepare_database()
+
     # Load data
     trades_df = get_trades_data()
     ai_analysis_df = get_ai_analysis_data()
@@ -216,33 +178,35 @@ try:
     st.sidebar.title("Bitcoin Trading Bot")
     time_filter = st.sidebar.selectbox(
         "Select Period:", 
-        ["All", "Last 24 Hours", "Last 7 Days", "Last 30 Days", "Last 90 Days"]
+        ["All", "Today", "Last 7 Days", "Last 30 Days", "Last 90 Days"]
     )
+    st.sidebar.caption("Periods start at local midnight, so metrics and the trade list cover the same days")
 
-    # Apply time filter
+    # Apply time filter (metrics come from per-day rollups, so the trade list uses the same whole-day window)
     now = datetime.now()
-    if time_filter == "Last 24 Hours":
-        filter_time = now - timedelta(days=1)
-        filtered_trades = trades_df[trades_df['timestamp'] > filter_time]
+    if time_filter == "Today":
+        filtered_trades = trades_df[trades_df['timestamp'] >= window_start(0)]
         chart_days = 1
+        metric_days = 0
     elif time_filter == "Last 7 Days":
-        filter_time = now - timedelta(days=7)
-        filtered_trades = trades_df[trades_df['timestamp'] > filter_time]
+        filtered_trades = trades_df[trades_df['timestamp'] >= window_start(7)]
         chart_days = 7
+        metric_days = 7
     elif time_filter == "Last 30 Days":
-        filter_time = now - timedelta(days=30)
-        filtered_trades = trades_df[trades_df['timestamp'] > filter_time]
+        filtered_trades = trades_df[trades_df['timestamp'] >= window_start(30)]
         chart_days = 30
+        metric_days = 30
     elif time_filter == "Last 90 Days":
-        filter_time = now - timedelta(days=90)
-        filtered_trades = trades_df[trades_df['timestamp'] > filter_time]
+        filtered_trades = trades_df[trades_df['timestamp'] >= window_start(90)]
         chart_days = 90
+        metric_days = 90
     else:
         filtered_trades = trades_df
         chart_days = 90
+        metric_days = None
 
     # Calculate trading metrics
-    metrics = calculate_trading_metrics(filtered_trades)
+    metrics = calculate_trading_metrics(metric_days)
 
     # Current open positions
     open_trades = trades_df[trades_df['status'] == 'OPEN']
@@ -0,0 +1,64 @@
+import threading
+
+import market_feed
+from market_feed import WebsocketFeed, make_feed
+
+
+class FlakyExchange:
+    """fetch_ticker fails on the calls listed in `failures` (1-based) and returns an increasing price otherwise"""
+    id = 'flaky'
+    options = {'defaultType': 'future'}
+
+    def __init__(self, failures):
+        self.failures = set(failures)
+        self.calls = 0
+
+    def fetch_ticker(self, symbol):
+        self.calls += 1
+        if self.calls in self.failures:
+            raise ConnectionError(f"request {self.calls} failed")
+        return {'last': 100.0 + self.calls, 'timestamp': self.calls * 1000}
+
+
+def first_events(feed, count):
+    events = []
+    for event in feed.events():
+        events.append(event)
+        if len(events) == count:
+            break
+    feed.close()
+    return events
+
+
+def test_polling_feed_retries_failed_requests(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(market_feed.time, 'sleep', sleeps.append)
+    exchange = FlakyExchange(failures={2, 3, 4})
+    events = first_events(make_feed('poll', exchange, 'BTC/USDT', interval=60), 3)
+
+    assert [event['price'] for event in events] == [101.0, 105.0, 106.0]
+    # The poll interval after an event, then a doubling back-off while the requests keep failing
+    assert sleeps == [60, 5, 10, 20, 60]
+
+
+def test_default_feed_survives_exchange_errors(monkeypatch):
+    # Without ccxt.pro (or with an exchange it does not know) the websocket feed falls back to polling
+    monkeypatch.setattr(market_feed.time, 'sleep', lambda seconds: None)
+    exchange = FlakyExchange(failures={1, 3})
+    events = first_events(make_feed('websocket', exchange, 'BTC/USDT', interval=1), 2)
+
+    assert [event['price'] for event in events] == [102.0, 104.0]
+
+
+def test_websocket_heartbeat_skips_a_failed_rest_price():
+    exchange = FlakyExchange(failures={1})
+    feed = WebsocketFeed('flaky', 'BTC/USDT', heartbeat=0.01,
+                         rest_price=lambda: exchange.fetch_ticker('BTC/USDT')['last'])
+    # A stream thread that stays up without delivering anything
+    feed._thread = threading.Thread(target=feed._stop.wait, daemon=True)
+    feed._thread.start()
+    events = first_events(feed, 1)
+
+    assert events[0]['type'] == 'heartbeat'
+    assert events[0]['price'] == 102.0
+    assert feed.requests == 2
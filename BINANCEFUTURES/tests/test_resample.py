@@ -0,0 +1,59 @@
+import json
+import os
+
+import pandas as pd
+
+from resample import COLUMNS, compare, resample_candles
+
+FIXTURE = os.path.join(os.path.dirname(__file__), 'fixtures', 'binance_btcusdt_klines.json')
+
+
+def load_fixture():
+    with open(FIXTURE) as f:
+        fixture = json.load(f)
+    frames = {}
+    for timeframe, rows in fixture['candles'].items():
+        df = pd.DataFrame(rows, columns=COLUMNS)
+        df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
+        frames[timeframe] = df
+    return fixture, frames
+
+
+def check(timeframe):
+    """Resample the stored 15m candles to `timeframe` and compare them with the exchange's candles"""
+    fixture, frames = load_fixture()
+    base, fetched = frames[fixture['base_timeframe']], frames[timeframe]
+    derived = resample_candles(base, fixture['base_timeframe'], timeframe, len(fetched))
+    gap = pd.to_datetime(fixture['gap'], unit='ms').floor(pd.Timedelta(timeframe.replace('m', 'min')))
+    return fetched, derived, gap
+
+
+def test_resampled_candles_match_the_exchange():
+    for timeframe in ('1h', '4h'):
+        fetched, derived, gap = check(timeframe)
+        checked, problems = compare(derived, fetched)
+        assert problems == []
+        # Every exchange candle is reproduced except the one whose bucket has the missing 15m candle
+        assert checked == len(fetched) - 1
+        assert list(derived['timestamp']) == [t for t in fetched['timestamp'] if t != gap]
+
+
+def test_bucket_with_a_missing_base_candle_is_dropped():
+    for timeframe in ('1h', '4h'):
+        _, derived, gap = check(timeframe)
+        assert gap not in set(derived['timestamp'])
+
+
+def test_forming_candle_matches_the_exchange_so_far():
+    for timeframe in ('1h', '4h'):
+        fetched, derived, _ = check(timeframe)
+        # The newest candle is still forming: it is kept and equals the exchange's candle up to now
+        assert derived['timestamp'].iloc[-1] == fetched['timestamp'].iloc[-1]
+        for column in ('open', 'high', 'low', 'close'):
+            assert derived[column].iloc[-1] == fetched[column].iloc[-1]
+
+
+def test_base_timeframe_is_passed_through():
+    fixture, frames = load_fixture()
+    base = frames['15m']
+    pd.testing.assert_frame_equal(resample_candles(base, '15m', '15m', 10), base.tail(10).reset_index(drop=True))
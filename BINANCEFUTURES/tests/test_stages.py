@@ -0,0 +1,37 @@
+import threading
+import time
+
+import pytest
+
+import stages
+from stages import Stage, StageError
+
+
+def test_failed_call_uses_its_default_or_raises():
+    def fail():
+        raise ConnectionError("down")
+
+    assert Stage("defaults", {"a": fail, "b": lambda: 2}).results(defaults={"a": None}) == {"a": None, "b": 2}
+    with pytest.raises(StageError):
+        Stage("required", {"a": fail}).results()
+
+
+def test_timed_out_call_is_not_run_twice():
+    release, calls = threading.Event(), []
+
+    def stuck():
+        calls.append(1)
+        release.wait(5)
+        return "late"
+
+    assert Stage("stuck", {"a": stuck}).results(timeout=0.05, defaults={"a": None}) == {"a": None}
+    assert stages.abandoned() == [("stuck", "a")]
+    # While the first call still runs, the next stage fails it at once instead of starting a copy
+    assert Stage("stuck", {"a": stuck}).results(timeout=0.05, defaults={"a": None}) == {"a": None}
+    assert len(calls) == 1
+
+    release.set()
+    while stages.abandoned():
+        time.sleep(0.01)
+    assert Stage("stuck", {"a": stuck}).results(timeout=5) == {"a": "late"}
+    assert len(calls) == 2
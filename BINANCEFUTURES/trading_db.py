@@ -0,0 +1,862 @@
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+# SQLite Database Settings
+DB_FILE = "bitcoin_trading.db"
+
+# Set to False to open and close a new connection on every call (the old behaviour, used by --bench)
+POOLED = True
+
+# Seconds a connection waits for a lock held by another process before giving up
+BUSY_TIMEOUT = 5.0
+# Prepared statements kept per connection; update_trade_status builds at most 16 distinct statements
+CACHED_STATEMENTS = 128
+
+# Applied once to every pooled connection
+PRAGMAS = [
+    # Readers (the Streamlit dashboard) never block the bot's writes and vice versa
+    "PRAGMA journal_mode = WAL",
+    # With WAL, NORMAL only fsyncs at checkpoints; a power loss can drop the last commits but never corrupts the file
+    "PRAGMA synchronous = NORMAL",
+    # 8 MB page cache and 64 MB memory-mapped reads
+    "PRAGMA cache_size = -8000",
+    "PRAGMA mmap_size = 67108864",
+    "PRAGMA temp_store = MEMORY",
+]
+
+_local = threading.local()
+
+
+def get_connection(db_file=None):
+    """Return this thread's long-lived connection to db_file, opening it on first use"""
+    db_file = db_file or DB_FILE
+    connections = getattr(_local, 'connections', None)
+    if connections is None:
+        connections = _local.connections = {}
+
+    conn = connections.get(db_file)
+    if conn is None:
+        conn = sqlite3.connect(db_file, timeout=BUSY_TIMEOUT, cached_statements=CACHED_STATEMENTS)
+        for pragma in PRAGMAS:
+            conn.execute(pragma)
+        connections[db_file] = conn
+    return conn
+
+
+def close_connections():
+    """Close the connections opened by the current thread"""
+    for conn in getattr(_local, 'connections', {}).values():
+        conn.close()
+    _local.connections = {}
+
+
+@contextmanager
+def transaction(db_file=None):
+    """Yield a connection; commit when the block succeeds and roll back if it raises"""
+    if not POOLED:
+        conn = sqlite3.connect(db_file or DB_FILE)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+        return
+
+    conn = get_connection(db_file)
+    with conn:
+        yield conn
+
+
+# Schema migrations: (version, description, statements), applied in order.
+# PRAGMA user_version records the last version applied to a database file.
+# Never edit a migration that has shipped; append a new one instead.
+MIGRATIONS = [
+    (1, "Create trades and ai_analysis tables", [
+        # IF NOT EXISTS so journals created before migrations existed are adopted as version 1
+        '''
+        CREATE TABLE IF NOT EXISTS trades (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            timestamp TEXT NOT NULL,
+            action TEXT NOT NULL,
+            entry_price REAL NOT NULL,
+            amount REAL NOT NULL,
+            leverage INTEGER NOT NULL,
+            sl_price REAL NOT NULL,
+            tp_price REAL NOT NULL,
+            sl_percentage REAL NOT NULL,
+            tp_percentage REAL NOT NULL,
+            position_size_percentage REAL NOT NULL,
+            investment_amount REAL NOT NULL,
+            status TEXT DEFAULT 'OPEN',
+            exit_price REAL,
+            exit_timestamp TEXT,
+            profit_loss REAL,
+            profit_loss_percentage REAL
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS ai_analysis (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            timestamp TEXT NOT NULL,
+            current_price REAL NOT NULL,
+            direction TEXT NOT NULL,
+            recommended_position_size REAL NOT NULL,
+            recommended_leverage INTEGER NOT NULL,
+            stop_loss_percentage REAL NOT NULL,
+            take_profit_percentage REAL NOT NULL,
+            reasoning TEXT NOT NULL,
+            trade_id INTEGER,
+            FOREIGN KEY (trade_id) REFERENCES trades (id)
+        )
+        ''',
+    ]),
+    (2, "Index the bot's and dashboard's query paths", [
+        # get_latest_open_trade, get_historical_trading_data: filter by status, newest first
+        "CREATE INDEX IF NOT EXISTS idx_trades_status_timestamp ON trades (status, timestamp)",
+        # get_performance_metrics: covering index, aggregates grouped by action without touching the table
+        "CREATE INDEX IF NOT EXISTS idx_trades_status_action_pnl"
+        " ON trades (status, action, profit_loss, profit_loss_percentage)",
+        # get_trade_summary (covering, timestamp range) and the dashboard's trade list (ORDER BY timestamp)
+        "CREATE INDEX IF NOT EXISTS idx_trades_timestamp_pnl"
+        " ON trades (timestamp, exit_timestamp, profit_loss, profit_loss_percentage)",
+        # Join from trades to their analysis in get_historical_trading_data
+        "CREATE INDEX IF NOT EXISTS idx_ai_analysis_trade_id ON ai_analysis (trade_id)",
+        # The dashboard's analysis list (ORDER BY timestamp)
+        "CREATE INDEX IF NOT EXISTS idx_ai_analysis_timestamp ON ai_analysis (timestamp)",
+        # Give the query planner statistics for the new indexes
+        "ANALYZE",
+    ]),
+]
+
+
+# Adds the closed trades matching {where} to performance_rollup: one 'overall' row, one row per
+# direction and one row per day (the trade's opening date, like the 7-day summary filter).
+# Counts and sums add up, so closing a trade only touches three rows.
+ROLLUP_SQL = """
+WITH closed AS (
+    SELECT action, timestamp, profit_loss, profit_loss_percentage,
+           (julianday(exit_timestamp) - julianday(timestamp)) * 86400 AS holding_seconds
+    FROM trades
+    WHERE {where}
+)
+INSERT INTO performance_rollup (
+    scope, key, total_trades, winning_trades, losing_trades,
+    profit_loss_count, total_profit_loss, gross_profit, gross_loss,
+    percentage_count, sum_percentage, sum_squared_percentage, max_percentage, min_percentage,
+    win_percentage_count, sum_win_percentage, loss_percentage_count, sum_loss_percentage,
+    holding_count, holding_seconds
+)
+SELECT
+    scope, key,
+    COUNT(*),
+    TOTAL(profit_loss > 0),
+    TOTAL(profit_loss < 0),
+    COUNT(profit_loss),
+    TOTAL(profit_loss),
+    TOTAL(CASE WHEN profit_loss > 0 THEN profit_loss END),
+    -TOTAL(CASE WHEN profit_loss < 0 THEN profit_loss END),
+    COUNT(profit_loss_percentage),
+    TOTAL(profit_loss_percentage),
+    TOTAL(profit_loss_percentage * profit_loss_percentage),
+    MAX(profit_loss_percentage),
+    MIN(profit_loss_percentage),
+    COUNT(CASE WHEN profit_loss > 0 THEN profit_loss_percentage END),
+    TOTAL(CASE WHEN profit_loss > 0 THEN profit_loss_percentage END),
+    COUNT(CASE WHEN profit_loss < 0 THEN profit_loss_percentage END),
+    TOTAL(CASE WHEN profit_loss < 0 THEN profit_loss_percentage END),
+    COUNT(holding_seconds),
+    TOTAL(holding_seconds)
+FROM (
+    SELECT 'overall' AS scope, '' AS key, * FROM closed
+    UNION ALL SELECT 'direction', action, * FROM closed
+    UNION ALL SELECT 'day', substr(timestamp, 1, 10), * FROM closed
+)
+GROUP BY scope, key
+ON CONFLICT (scope, key) DO UPDATE SET
+    total_trades = total_trades + excluded.total_trades,
+    winning_trades = winning_trades + excluded.winning_trades,
+    losing_trades = losing_trades + excluded.losing_trades,
+    profit_loss_count = profit_loss_count + excluded.profit_loss_count,
+    total_profit_loss = total_profit_loss + excluded.total_profit_loss,
+    gross_profit = gross_profit + excluded.gross_profit,
+    gross_loss = gross_loss + excluded.gross_loss,
+    percentage_count = percentage_count + excluded.percentage_count,
+    sum_percentage = sum_percentage + excluded.sum_percentage,
+    sum_squared_percentage = sum_squared_percentage + excluded.sum_squared_percentage,
+    max_percentage = coalesce(max(max_percentage, excluded.max_percentage), max_percentage, excluded.max_percentage),
+    min_percentage = coalesce(min(min_percentage, excluded.min_percentage), min_percentage, excluded.min_percentage),
+    win_percentage_count = win_percentage_count + excluded.win_percentage_count,
+    sum_win_percentage = sum_win_percentage + excluded.sum_win_percentage,
+    loss_percentage_count = loss_percentage_count + excluded.loss_percentage_count,
+    sum_loss_percentage = sum_loss_percentage + excluded.sum_loss_percentage,
+    holding_count = holding_count + excluded.holding_count,
+    holding_seconds = holding_seconds + excluded.holding_seconds
+"""
+
+# Cumulative P/L after each closed trade matching {where}, in trade order, and its running peak
+DRAWDOWN_SERIES_SQL = """
+SELECT cum, MAX(cum) OVER w AS peak FROM (
+    SELECT timestamp, id, SUM(profit_loss) OVER w AS cum
+    FROM trades
+    WHERE {where}
+    WINDOW w AS (ORDER BY timestamp, id ROWS UNBOUNDED PRECEDING)
+)
+WINDOW w AS (ORDER BY timestamp, id ROWS UNBOUNDED PRECEDING)
+"""
+
+# Max drawdown ((peak - cumulative P/L) / peak, as the dashboard defines it) over all closed trades
+REBUILD_DRAWDOWN_SQL = """
+UPDATE performance_rollup
+SET (peak_profit_loss, max_drawdown) = (
+    SELECT MAX(peak), MAX((peak - cum) / nullif(peak, 0)) FROM ({series})
+)
+WHERE scope = 'overall'
+""".format(series=DRAWDOWN_SERIES_SQL.format(where="status = 'CLOSED'"))
+
+# Extend the overall drawdown by one closed trade (run after ROLLUP_SQL has added its P/L).
+# Exact as long as trades close in the order they were opened, which holds for one position at a time.
+_PEAK = "max(coalesce(peak_profit_loss, total_profit_loss), total_profit_loss)"
+_DRAWDOWN = f"({_PEAK} - total_profit_loss) / nullif({_PEAK}, 0)"
+ADD_DRAWDOWN_SQL = f"""
+UPDATE performance_rollup
+SET peak_profit_loss = {_PEAK},
+    max_drawdown = coalesce(max(max_drawdown, {_DRAWDOWN}), max_drawdown, {_DRAWDOWN})
+WHERE scope = 'overall'
+"""
+
+MIGRATIONS.append(
+    (3, "Add the performance_rollup table", [
+        '''
+        CREATE TABLE IF NOT EXISTS performance_rollup (
+            scope TEXT NOT NULL,
+            key TEXT NOT NULL,
+            total_trades INTEGER NOT NULL,
+            winning_trades INTEGER NOT NULL,
+            losing_trades INTEGER NOT NULL,
+            profit_loss_count INTEGER NOT NULL,
+            total_profit_loss REAL NOT NULL,
+            gross_profit REAL NOT NULL,
+            gross_loss REAL NOT NULL,
+            percentage_count INTEGER NOT NULL,
+            sum_percentage REAL NOT NULL,
+            sum_squared_percentage REAL NOT NULL,
+            max_percentage REAL,
+            min_percentage REAL,
+            win_percentage_count INTEGER NOT NULL,
+            sum_win_percentage REAL NOT NULL,
+            loss_percentage_count INTEGER NOT NULL,
+            sum_loss_percentage REAL NOT NULL,
+            holding_count INTEGER NOT NULL,
+            holding_seconds REAL NOT NULL,
+            peak_profit_loss REAL,
+            max_drawdown REAL,
+            PRIMARY KEY (scope, key)
+        ) WITHOUT ROWID
+        ''',
+        # Backfill from the trades already closed
+        ROLLUP_SQL.format(where="status = 'CLOSED'"),
+        REBUILD_DRAWDOWN_SQL,
+    ])
+)
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def schema_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn, target=SCHEMA_VERSION):
+    """Apply pending migrations up to target, each in its own transaction"""
+    current = schema_version(conn)
+    if current > SCHEMA_VERSION:
+        raise RuntimeError(f"Database schema version {current} is newer than this code ({SCHEMA_VERSION})")
+
+    for version, description, statements in MIGRATIONS:
+        if version <= current or version > target:
+            continue
+        # Take the write lock first so two processes starting together cannot both apply a migration
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if schema_version(conn) >= version:
+                conn.rollback()
+                continue
+            for statement in statements:
+                conn.execute(statement)
+            conn.execute(f"PRAGMA user_version = {version}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        print(f"Applied migration {version}: {description}")
+
+
+def setup_database():
+    """Create the database or bring an existing one up to the current schema"""
+    conn = get_connection() if POOLED else sqlite3.connect(DB_FILE)
+    try:
+        migrate(conn)
+    finally:
+        if not POOLED:
+            conn.close()
+    print("Database setup complete")
+
+
+def save_ai_analysis(analysis_data, trade_id=None):
+    """Save AI analysis results to the database"""
+    with transaction() as conn:
+        cursor = conn.execute('''
+        INSERT INTO ai_analysis (
+            timestamp,
+            current_price,
+            direction,
+            recommended_position_size,
+            recommended_leverage,
+            stop_loss_percentage,
+            take_profit_percentage,
+            reasoning,
+            trade_id
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (
+            datetime.now().isoformat(),
+            analysis_data.get('current_price', 0),
+            analysis_data.get('direction', 'NO_POSITION'),
+            analysis_data.get('recommended_position_size', 0),
+            analysis_data.get('recommended_leverage', 0),
+            analysis_data.get('stop_loss_percentage', 0),
+            analysis_data.get('take_profit_percentage', 0),
+            analysis_data.get('reasoning', ''),
+            trade_id
+        ))
+        return cursor.lastrowid
+
+
+def link_analysis_to_trade(analysis_id, trade_id):
+    """Link an AI analysis result to the trade it opened"""
+    with transaction() as conn:
+        conn.execute("UPDATE ai_analysis SET trade_id = ? WHERE id = ?", (trade_id, analysis_id))
+
+
+def save_trade(trade_data):
+    """Save trade information to the database"""
+    with transaction() as conn:
+        cursor = conn.execute('''
+        INSERT INTO trades (
+            timestamp,
+            action,
+            entry_price,
+            amount,
+            leverage,
+            sl_price,
+            tp_price,
+            sl_percentage,
+            tp_percentage,
+            position_size_percentage,
+            investment_amount
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (
+            datetime.now().isoformat(),
+            trade_data.get('action', ''),
+            trade_data.get('entry_price', 0),
+            trade_data.get('amount', 0),
+            trade_data.get('leverage', 0),
+            trade_data.get('sl_price', 0),
+            trade_data.get('tp_price', 0),
+            trade_data.get('sl_percentage', 0),
+            trade_data.get('tp_percentage', 0),
+            trade_data.get('position_size_percentage', 0),
+            trade_data.get('investment_amount', 0)
+        ))
+        return cursor.lastrowid
+
+
+def update_trade_status(trade_id, status, exit_price=None, exit_timestamp=None, profit_loss=None, profit_loss_percentage=None):
+    """Update trade status"""
+    update_fields = ["status = ?"]
+    update_values = [status]
+
+    if exit_price is not None:
+        update_fields.append("exit_price = ?")
+        update_values.append(exit_price)
+
+    if exit_timestamp is not None:
+        update_fields.append("exit_timestamp = ?")
+        update_values.append(exit_timestamp)
+
+    if profit_loss is not None:
+        update_fields.append("profit_loss = ?")
+        update_values.append(profit_loss)
+
+    if profit_loss_percentage is not None:
+        update_fields.append("profit_loss_percentage = ?")
+        update_values.append(profit_loss_percentage)
+
+    update_sql = f"UPDATE trades SET {', '.join(update_fields)} WHERE id = ?"
+    update_values.append(trade_id)
+
+    with transaction() as conn:
+        previous = conn.execute("SELECT status FROM trades WHERE id = ?", (trade_id,)).fetchone()
+        conn.execute(update_sql, update_values)
+
+        # Keep performance_rollup in step, in the same transaction
+        if previous is None:
+            return
+        if previous[0] == 'CLOSED':
+            # A closed trade was edited or reopened; its old figures cannot be subtracted from MAX/MIN
+            rebuild_rollup(conn)
+        elif status == 'CLOSED':
+            conn.execute(ROLLUP_SQL.format(where="id = ?"), (trade_id,))
+            conn.execute(ADD_DRAWDOWN_SQL)
+
+
+def rebuild_rollup(conn):
+    """Recompute performance_rollup from every closed trade"""
+    conn.execute("DELETE FROM performance_rollup")
+    conn.execute(ROLLUP_SQL.format(where="status = 'CLOSED'"))
+    conn.execute(REBUILD_DRAWDOWN_SQL)
+
+
+def get_latest_open_trade():
+    """Get the latest open trade information"""
+    with transaction() as conn:
+        result = conn.execute('''
+        SELECT id, action, entry_price, amount, leverage, sl_price, tp_price
+        FROM trades
+        WHERE status = 'OPEN'
+        ORDER BY timestamp DESC
+        LIMIT 1
+        ''').fetchone()
+
+    if result:
+        return {
+            'id': result[0],
+            'action': result[1],
+            'entry_price': result[2],
+            'amount': result[3],
+            'leverage': result[4],
+            'sl_price': result[5],
+            'tp_price': result[6]
+        }
+    return None
+
+
+def window_start(days):
+    """Start of a window of the last `days` days: local midnight `days` days ago (days=0 is today).
+    The per-day rollup cannot be split within a day, so every window starts at midnight."""
+    return datetime.combine((datetime.now() - timedelta(days=days)).date(), datetime.min.time())
+
+
+def _since(days):
+    """First day (YYYY-MM-DD) of a window of the last `days` days; '' for all history"""
+    if days is None:
+        return ''
+    return window_start(days).strftime('%Y-%m-%d')
+
+
+def get_trade_summary(days=7):
+    """Get recent trade summary information (from the per-day rollup rows)"""
+    with transaction() as conn:
+        result = conn.execute('''
+        SELECT
+            SUM(total_trades),
+            SUM(winning_trades),
+            SUM(losing_trades),
+            SUM(total_profit_loss),
+            SUM(sum_percentage) / SUM(percentage_count)
+        FROM performance_rollup
+        WHERE scope = 'day' AND key >= ?
+        ''', (_since(days),)).fetchone()
+
+    if result:
+        return {
+            'total_trades': result[0] or 0,
+            'winning_trades': result[1] or 0,
+            'losing_trades': result[2] or 0,
+            'total_profit_loss': result[3] or 0,
+            'avg_profit_loss_percentage': result[4] or 0
+        }
+    return None
+
+
+def get_daily_performance(days=None):
+    """Per-day rollup rows, oldest first, for the last `days` days (all days if None)"""
+    with transaction() as conn:
+        cursor = conn.execute(
+            "SELECT * FROM performance_rollup WHERE scope = 'day' AND key >= ? ORDER BY key", (_since(days),))
+        columns = [column[0] for column in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+
+def get_max_drawdown(days=None):
+    """Max drawdown ratio of the cumulative P/L of the trades opened in the last `days` days (all trades if None)"""
+    with transaction() as conn:
+        if days is None:
+            result = conn.execute("SELECT max_drawdown FROM performance_rollup WHERE scope = 'overall'").fetchone()
+        else:
+            series = DRAWDOWN_SERIES_SQL.format(where="status = 'CLOSED' AND timestamp >= ?")
+            result = conn.execute(f"SELECT MAX((peak - cum) / nullif(peak, 0)) FROM ({series})",
+                                  (_since(days),)).fetchone()
+    return result[0] if result and result[0] is not None else 0
+
+
+def get_initial_investment(days=None):
+    """Estimated starting capital: mean entry price x mean amount of the first 3 closed trades in the window"""
+    with transaction() as conn:
+        result = conn.execute('''
+        SELECT AVG(entry_price) * AVG(amount) FROM (
+            SELECT entry_price, amount FROM trades
+            WHERE status = 'CLOSED' AND timestamp >= ?
+            ORDER BY timestamp
+            LIMIT 3
+        )
+        ''', (_since(days),)).fetchone()
+    return result[0] or 0
+
+
+def get_historical_trading_data(limit=10):
+    """Get historical trading data and related AI analysis results"""
+    with transaction() as conn:
+        # Get completed trades along with related AI analysis
+        cursor = conn.execute('''
+        SELECT
+            t.id as trade_id,
+            t.timestamp as trade_timestamp,
+            t.action,
+            t.entry_price,
+            t.exit_price,
+            t.amount,
+            t.leverage,
+            t.sl_price,
+            t.tp_price,
+            t.sl_percentage,
+            t.tp_percentage,
+            t.position_size_percentage,
+            t.status,
+            t.profit_loss,
+            t.profit_loss_percentage,
+            a.id as analysis_id,
+            a.reasoning,
+            a.direction,
+            a.recommended_leverage,
+            a.recommended_position_size,
+            a.stop_loss_percentage,
+            a.take_profit_percentage
+        FROM
+            trades t
+        LEFT JOIN
+            ai_analysis a ON t.id = a.trade_id
+        WHERE
+            t.status = 'CLOSED'
+        ORDER BY
+            t.timestamp DESC
+        LIMIT ?
+        ''', (limit,))
+
+        # Convert to a list of dictionaries keyed by column name
+        columns = [column[0] for column in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+
+def _rollup_metrics(row):
+    """Turn a performance_rollup row into the metrics the bot reports"""
+    total = row['total_trades']
+    winning = row['winning_trades']
+    return {
+        "total_trades": total,
+        "winning_trades": winning,
+        "losing_trades": row['losing_trades'],
+        "total_profit_loss": row['total_profit_loss'],
+        "avg_profit_loss_percentage": row['sum_percentage'] / row['percentage_count'] if row['percentage_count'] else 0,
+        "max_profit_percentage": row['max_percentage'] or 0,
+        "max_loss_percentage": row['min_percentage'] or 0,
+        "avg_win_percentage": row['sum_win_percentage'] / row['win_percentage_count'] if row['win_percentage_count'] else 0,
+        "avg_loss_percentage": row['sum_loss_percentage'] / row['loss_percentage_count'] if row['loss_percentage_count'] else 0,
+        "win_rate": (winning / total * 100) if total > 0 else 0
+    }
+
+
+def get_performance_metrics():
+    """Get trade performance metrics (overall and by direction) from the rollup table"""
+    with transaction() as conn:
+        cursor = conn.execute("SELECT * FROM performance_rollup WHERE scope IN ('overall', 'direction')")
+        columns = [column[0] for column in cursor.description]
+        rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    overall = next((row for row in rows if row['scope'] == 'overall'), None)
+    if overall is None:
+        overall = {column: 0 for column in columns}
+    metrics = {
+        "overall": _rollup_metrics(overall),
+        "directional": {}
+    }
+
+    # Add directional metrics (same fields as before: no max/min/avg win and loss per direction)
+    for row in rows:
+        if row['scope'] != 'direction':
+            continue
+        direction_metrics = _rollup_metrics(row)
+        metrics["directional"][row['key']] = {
+            key: direction_metrics[key]
+            for key in ("total_trades", "winning_trades", "losing_trades", "total_profit_loss",
+                        "avg_profit_loss_percentage", "win_rate")
+        }
+
+    return metrics
+
+
+# Queries used by the Streamlit dashboard
+TRADES_QUERY = """
+SELECT
+    id, timestamp, action, entry_price, exit_price, amount, leverage,
+    status, profit_loss, profit_loss_percentage, exit_timestamp
+FROM trades
+ORDER BY timestamp DESC
+"""
+
+AI_ANALYSIS_QUERY = """
+SELECT
+    id, timestamp, current_price, direction,
+    recommended_leverage, reasoning, trade_id
+FROM ai_analysis
+ORDER BY timestamp DESC
+"""
+
+
+# =============================================================================
+# Synthetic journal: closed trades every 5 minutes up to now, the newest one still open
+# =============================================================================
+
+def _seed(conn, trades):
+    import random
+    rng = random.Random(1)
+    now = datetime.now()
+
+    def rows():
+        for i in range(trades):
+            opened = now - timedelta(minutes=5 * (trades - i))
+            action = rng.choice(['long', 'short'])
+            pnl_pct = rng.uniform(-3, 4)
+            if i == trades - 1:
+                yield (opened.isoformat(), action, 'OPEN', None, None, None, None)
+            else:
+                yield (opened.isoformat(), action, 'CLOSED', 61000, (opened + timedelta(minutes=4)).isoformat(),
+                       pnl_pct * 6, pnl_pct)
+
+    with conn:
+        conn.executemany('''
+        INSERT INTO trades (timestamp, action, entry_price, amount, leverage, sl_price, tp_price,
+                            sl_percentage, tp_percentage, position_size_percentage, investment_amount,
+                            status, exit_price, exit_timestamp, profit_loss, profit_loss_percentage)
+        VALUES (?, ?, 60000, 0.01, 5, 59000, 62000, 0.02, 0.03, 0.2, 100, ?, ?, ?, ?, ?)
+        ''', rows())
+        conn.execute('''
+        INSERT INTO ai_analysis (timestamp, current_price, direction, recommended_position_size,
+                                 recommended_leverage, stop_loss_percentage, take_profit_percentage, reasoning, trade_id)
+        SELECT timestamp, entry_price, upper(action), 0.2, leverage, 0.02, 0.03, 'seeded', id FROM trades
+        ''')
+        # The trades were written directly, so bring the rollup up to date if the schema has one
+        if schema_version(conn) >= 3:
+            rebuild_rollup(conn)
+
+
+# =============================================================================
+# Query plans: run the helpers against a synthetic journal and check that every
+# query they issue is answered from an index (no table scans, no temporary sorts of table rows)
+# =============================================================================
+
+def _plan_problems(conn, plan):
+    """Full scans of a table, and temporary sorts unless the only rows read are primary-key lookups"""
+    tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    problems = []
+    single_row = True
+    for detail in plan:
+        words = detail.split()
+        if words[0] in ('SCAN', 'SEARCH') and words[1] in tables | {'t', 'a'}:
+            if words[0] == 'SCAN' and 'USING' not in detail:
+                problems.append(detail)
+            if '(rowid=?)' not in detail:
+                single_row = False
+    if not single_row:
+        problems += [detail for detail in plan if 'TEMP B-TREE' in detail]
+    return problems
+
+
+def explain(trades=1_000_000, path='explain_trading.db'):
+    import time
+    global DB_FILE
+    original = DB_FILE
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+    DB_FILE = path
+    try:
+        conn = get_connection()
+        # Build the journal the way old files look (version 1, no indexes), then migrate it
+        migrate(conn, target=1)
+        started = time.perf_counter()
+        _seed(conn, trades)
+        print(f"Seeded {trades:,} trades in {time.perf_counter() - started:.1f}s")
+        started = time.perf_counter()
+        migrate(conn)
+        print(f"Migrated to version {schema_version(conn)} in {time.perf_counter() - started:.1f}s")
+
+        # Capture the SQL each helper sends, with its parameters inlined
+        open_trade_id = get_latest_open_trade()['id']
+        calls = [
+            ('get_latest_open_trade', lambda: get_latest_open_trade()),
+            ('get_historical_trading_data', lambda: get_historical_trading_data(limit=10)),
+            ('get_performance_metrics', lambda: get_performance_metrics()),
+            ('get_trade_summary', lambda: get_trade_summary(days=7)),
+            ('get_daily_performance', lambda: get_daily_performance(days=90)),
+            ('get_initial_investment', lambda: get_initial_investment(days=90)),
+            ('get_max_drawdown', lambda: get_max_drawdown()),
+            ('update_trade_status (close)', lambda: update_trade_status(
+                open_trade_id, 'CLOSED', exit_price=61000, exit_timestamp=datetime.now().isoformat(),
+                profit_loss=10, profit_loss_percentage=1.6)),
+        ]
+        queries = []
+        for name, call in calls:
+            statements = []
+            conn.set_trace_callback(statements.append)
+            started = time.perf_counter()
+            call()
+            elapsed = time.perf_counter() - started
+            conn.set_trace_callback(None)
+            for sql in statements:
+                if sql.lstrip().upper().startswith(('SELECT', 'UPDATE', 'WITH')):
+                    queries.append((name, elapsed, sql))
+        queries.append(('dashboard trades', None, TRADES_QUERY))
+        queries.append(('dashboard ai_analysis', None, AI_ANALYSIS_QUERY))
+
+        failures = 0
+        for name, elapsed, sql in queries:
+            plan = [row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + sql)]
+            problems = _plan_problems(conn, plan)
+            failures += bool(problems)
+            timing = f"{elapsed * 1000:.2f} ms" if elapsed is not None else "plan only"
+            print(f"\n{name} ({timing}){'  <-- NOT INDEXED' if problems else ''}")
+            for detail in plan:
+                print(f"    {detail}")
+        close_connections()
+    finally:
+        DB_FILE = original
+
+    print(f"\n{len(queries) - failures}/{len(queries)} queries use indexes")
+    return failures
+
+
+# =============================================================================
+# Benchmark: per-call latency of the helpers with a fresh connection per call
+# (the old behaviour) vs pooled WAL connections, while a dashboard reads the same file
+# =============================================================================
+
+def _dashboard_reader(db_file, stop, counts):
+    # Same queries as streamlit_app.py, on its own connection, as fast as possible
+    conn = sqlite3.connect(db_file, timeout=BUSY_TIMEOUT)
+    while not stop.is_set():
+        try:
+            conn.execute(TRADES_QUERY).fetchall()
+            conn.execute(AI_ANALYSIS_QUERY).fetchall()
+            counts['reads'] += 1
+        except sqlite3.OperationalError:
+            counts['errors'] += 1
+    conn.close()
+
+
+def _bench_loop(loops):
+    import time
+    timings = {}
+
+    def timed(name, func, *args, **kwargs):
+        started = time.perf_counter()
+        result = func(*args, **kwargs)
+        timings.setdefault(name, []).append(time.perf_counter() - started)
+        return result
+
+    # One iteration of the main loop: check the open trade, analyse, open a trade, later close it
+    for i in range(loops):
+        timed('get_latest_open_trade', get_latest_open_trade)
+        timed('get_historical_trading_data', get_historical_trading_data, limit=10)
+        timed('get_performance_metrics', get_performance_metrics)
+        analysis_id = timed('save_ai_analysis', save_ai_analysis,
+                            {'current_price': 60000, 'direction': 'LONG', 'reasoning': 'bench'})
+        trade_id = timed('save_trade', save_trade, {'action': 'long', 'entry_price': 60000, 'amount': 0.01})
+        timed('link_analysis_to_trade', link_analysis_to_trade, analysis_id, trade_id)
+        timed('update_trade_status', update_trade_status, trade_id, 'CLOSED', exit_price=61000,
+              exit_timestamp=datetime.now().isoformat(), profit_loss=10, profit_loss_percentage=1.6)
+        timed('get_trade_summary', get_trade_summary, days=7)
+    return timings
+
+
+def benchmark(trades=5000, loops=200, readers=1, directory='.'):
+    import statistics
+    global DB_FILE, POOLED
+    original = DB_FILE, POOLED
+
+    results = {}
+    try:
+        for label, pooled in (('per-call connect', False), ('pooled WAL', True)):
+            DB_FILE = os.path.join(directory, f'bench_trading_{"pooled" if pooled else "percall"}.db')
+            for suffix in ('', '-wal', '-shm'):
+                if os.path.exists(DB_FILE + suffix):
+                    os.remove(DB_FILE + suffix)
+            POOLED = pooled
+            setup_database()
+            seed_conn = sqlite3.connect(DB_FILE)
+            _seed(seed_conn, trades)
+            seed_conn.close()
+
+            stop = threading.Event()
+            counts = {'reads': 0, 'errors': 0}
+            threads = [threading.Thread(target=_dashboard_reader, args=(DB_FILE, stop, counts)) for _ in range(readers)]
+            for thread in threads:
+                thread.start()
+            try:
+                results[label] = (_bench_loop(loops), dict(counts))
+            finally:
+                stop.set()
+                for thread in threads:
+                    thread.join()
+                results[label][1].update(counts)
+            close_connections()
+    finally:
+        DB_FILE, POOLED = original
+
+    print(f"{trades} seeded trades, {loops} main-loop iterations, {readers} dashboard reader thread(s)")
+    print(f"{'call':<30} {'per-call connect (ms)':>24} {'pooled WAL (ms)':>20}")
+    print(f"{'':<30} {'mean':>11} {'p95':>12} {'mean':>9} {'p95':>10}")
+    before, after = results['per-call connect'][0], results['pooled WAL'][0]
+    total_before = total_after = 0.0
+    for name in before:
+        b, a = sorted(before[name]), sorted(after[name])
+        total_before += sum(b)
+        total_after += sum(a)
+        print(f"{name:<30} {statistics.mean(b) * 1000:>11.3f} {b[int(len(b) * 0.95)] * 1000:>12.3f}"
+              f" {statistics.mean(a) * 1000:>9.3f} {a[int(len(a) * 0.95)] * 1000:>10.3f}")
+    print(f"{'whole loop iteration':<30} {total_before / loops * 1000:>11.3f} {'':>12}"
+          f" {total_after / loops * 1000:>9.3f}")
+    for label, (_, counts) in results.items():
+        print(f"dashboard during {label}: {counts['reads']} reads, {counts['errors']} lock errors")
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description="Trading journal database")
+    parser.add_argument('--bench', action='store_true', help="compare per-call connections with pooled WAL connections")
+    parser.add_argument('--trades', type=int, default=5000, help="trades to seed the benchmark database with")
+    parser.add_argument('--loops', type=int, default=200, help="main-loop iterations to time")
+    parser.add_argument('--readers', type=int, default=1, help="dashboard reader threads during the benchmark")
+    parser.add_argument('--explain', action='store_true',
+                        help="check the query plans of every helper against a synthetic journal")
+    parser.add_argument('--explain-trades', type=int, default=1_000_000, help="trades in the synthetic journal")
+    args = parser.parse_args()
+
+    if args.explain:
+        raise SystemExit(1 if explain(args.explain_trades) else 0)
+    elif args.bench:
+        benchmark(args.trades, args.loops, args.readers)
+    else:
+        setup_database()
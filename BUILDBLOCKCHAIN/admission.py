@@ -0,0 +1,113 @@
+import math
+import threading
+from collections import OrderedDict
+from time import monotonic
+
+
+# 묶음 제출(/transactions/batch) 한 번에 받는 최대 거래 수
+MAX_BATCH = 1000
+
+
+class TokenBucket:
+    """
+    클라이언트 하나의 요청 속도 제한. 초당 rate개의 토큰이 차고, 최대 burst개까지 쌓입니다.
+    """
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = monotonic()
+
+    def take(self, cost: int = 1) -> float:
+        """
+        토큰 cost개를 씁니다. 토큰이 하나라도 있으면 받고, 모자란 만큼은 빚으로 남겨 다음 요청을 늦춥니다.
+        (burst보다 큰 묶음 요청도 받을 수 있지만, 평균 속도는 rate를 넘지 못합니다.)
+        :return: 바로 쓸 수 있으면 0, 아니면 다음 토큰이 찰 때까지 기다려야 하는 시간(초)
+        """
+        now = monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= cost
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class AdmissionController:
+    """
+    거래 수신 단계의 입장 제어(admission control)입니다.
+    Mempool을 크기가 정해진 수신 큐로 보고, 가득 차면 새 거래를 거절합니다.
+    클라이언트별로 속도를 제한하여 한 클라이언트가 큐를 독차지하지 못하게 합니다.
+    거절할 때는 다시 시도할 시간(Retry-After)을 함께 알려 줍니다.
+    """
+
+    def __init__(self, max_pending: int = 10000, rate: float = 50.0, burst: int = 100,
+                 queue_full_retry_after: int = 5, max_clients: int = 10000):
+        self.max_pending = max_pending
+        self.rate = rate
+        self.burst = burst
+        self.queue_full_retry_after = queue_full_retry_after
+        self.max_clients = max_clients
+        self.lock = threading.Lock()
+        # 최근에 요청한 클라이언트부터 남기고 오래된 클라이언트의 버킷은 버립니다.
+        self.buckets = OrderedDict()
+        self.accepted = 0
+        self.rejected_queue_full = 0
+        self.rejected_rate_limited = 0
+        self.peak_depth = 0
+
+    def admit(self, client: str, depth: int, count: int = 1) -> tuple:
+        """
+        거래 count개(묶음 제출이면 묶음 전체)를 받아도 되는지 결정합니다.
+        본문을 검증하기 전에 부를 수 있도록 수락 횟수는 세지 않습니다. 검증을 통과해 거래를 추가한 뒤
+        record_accepted()를 부릅니다. (잘못된 요청도 클라이언트의 토큰은 씁니다.)
+        :param client: 클라이언트 식별자 (IP 주소)
+        :param depth: 현재 큐(Mempool)에 쌓인 거래 수
+        :param count: 받을 거래 수
+        :return: (받을지 여부, Retry-After 초)
+        """
+        with self.lock:
+            self.peak_depth = max(self.peak_depth, depth)
+
+            if depth + count > self.max_pending:
+                self.rejected_queue_full += 1
+                return False, self.queue_full_retry_after
+
+            bucket = self.buckets.get(client)
+            if bucket is None:
+                bucket = self.buckets[client] = TokenBucket(self.rate, self.burst)
+                if len(self.buckets) > self.max_clients:
+                    self.buckets.popitem(last=False)
+            else:
+                self.buckets.move_to_end(client)
+
+            wait = bucket.take(count)
+            if wait:
+                self.rejected_rate_limited += 1
+                return False, max(1, math.ceil(wait))
+
+            return True, 0
+
+    def record_accepted(self, count: int = 1):
+        """
+        admit()를 통과한 요청의 거래 count개가 검증을 통과해 Mempool에 추가되었음을 기록합니다.
+        """
+        with self.lock:
+            self.accepted += count
+
+    def metrics(self, depth: int) -> dict:
+        """
+        큐 깊이와 수락/거절 횟수를 반환합니다.
+        :param depth: 현재 큐(Mempool)에 쌓인 거래 수
+        """
+        with self.lock:
+            return {
+                'queue_depth': depth,
+                'queue_capacity': self.max_pending,
+                'peak_queue_depth': max(self.peak_depth, depth),
+                'accepted': self.accepted,
+                'rejected_queue_full': self.rejected_queue_full,
+                'rejected_rate_limited': self.rejected_rate_limited,
+                'tracked_clients': len(self.buckets),
+            }
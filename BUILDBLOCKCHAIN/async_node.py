@@ -0,0 +1,513 @@
+import asyncio
+from uuid import uuid4
+
+from aiohttp import ClientError, ClientSession, ClientTimeout, TCPConnector, web
+
+import wire
+from admission import MAX_BATCH, AdmissionController
+from blockchain import Blockchain, DuplicateTransaction
+from chain_cache import TipPayloadCache, etag_matches
+from mempool_sync import MempoolSync
+from mining_pool import MiningCoordinator
+from state import valid_transaction
+
+
+class AsyncNode:
+    """
+    blockchain.py와 같은 HTTP API를 asyncio(aiohttp) 위에서 제공하는 노드입니다.
+    이벤트 루프 하나가 수천 개의 동시 요청을 처리하고, 피어 통신도 비동기로 수행합니다.
+    CPU를 쓰는 작업(작업 증명, 체인 검증)은 스레드 풀에서 실행하여 루프를 막지 않습니다.
+    """
+
+    def __init__(self, blockchain: Blockchain, node_identifier: str, peer_timeout: float = 5.0,
+                 admission: AdmissionController = None, mempool_sync: MempoolSync = None,
+                 coordinator: MiningCoordinator = None):
+        self.blockchain = blockchain
+        # 원격 채굴 작업자들에게 논스 구간을 나눠 주는 코디네이터 (Flask 노드와 같은 /work API)
+        self.coordinator = coordinator or MiningCoordinator(blockchain, node_identifier)
+        self.admission = admission or AdmissionController()
+        self.mempool_sync = mempool_sync or MempoolSync(blockchain, max_pending=self.admission.max_pending)
+        self.node_identifier = node_identifier
+        self.peer_timeout = peer_timeout
+        self.session = None
+        # 채굴은 한 번에 하나만 진행합니다.
+        self.mine_lock = asyncio.Lock()
+        self.chain_cache = TipPayloadCache()
+        # 응답을 기다리지 않는 백그라운드 작업. 이벤트 루프는 작업을 약하게만 참조하므로,
+        # 끝날 때까지 여기서 참조를 들고 있어야 도중에 가비지 컬렉션되지 않습니다.
+        self.background_tasks = set()
+
+        self.app = web.Application()
+        self.app.add_routes([
+            web.get('/mine', self.mine),
+            web.get('/work', self.get_work),
+            web.get('/work/status', self.work_status),
+            web.post('/work/submit', self.submit_work),
+            web.get('/work/stats', self.work_stats),
+            web.post('/transactions/new', self.new_transaction),
+            web.post('/transactions/batch', self.new_transactions),
+            web.get('/metrics/admission', self.admission_metrics),
+            web.get('/chain', self.full_chain),
+            web.get('/chain/tip', self.chain_tip),
+            web.get('/blocks/range', self.block_range),
+            web.get('/headers', self.block_headers),
+            web.get('/transactions/proof', self.transaction_proof),
+            web.get('/snapshot', self.state_snapshot),
+            web.get('/state', self.chain_state),
+            web.get('/difficulty', self.difficulty),
+            web.post('/blocks/compact', self.compact_block),
+            web.post('/blocks/compact/transactions', self.compact_block_transactions),
+            web.get('/metrics/relay', self.relay_metrics),
+            web.get('/mempool', self.mempool_digest),
+            web.post('/mempool/reconcile', self.mempool_reconcile),
+            web.post('/mempool/fetch', self.mempool_fetch),
+            web.post('/mempool/transactions', self.mempool_transactions),
+            web.get('/mempool/sync', self.mempool_sync_now),
+            web.get('/metrics/mempool-sync', self.mempool_sync_metrics),
+            web.post('/nodes/register', self.register_nodes),
+            web.get('/nodes/peers', self.peer_table),
+            web.get('/nodes/resolve', self.consensus),
+        ])
+        self.app.on_startup.append(self._open_session)
+        self.app.on_cleanup.append(self._close_session)
+
+    async def _open_session(self, app):
+        # 피어 연결은 keep-alive 커넥션 풀 하나를 공유합니다.
+        self.session = ClientSession(
+            timeout=ClientTimeout(total=self.peer_timeout),
+            connector=TCPConnector(limit=100),
+        )
+
+    async def _close_session(self, app):
+        await self.session.close()
+
+    def spawn(self, coroutine):
+        """
+        코루틴을 백그라운드 작업으로 실행합니다. 작업은 끝나면 background_tasks에서 빠집니다.
+        """
+        task = asyncio.ensure_future(coroutine)
+        self.background_tasks.add(task)
+        task.add_done_callback(self.background_tasks.discard)
+        return task
+
+    async def resolve_conflicts(self) -> bool:
+        """
+        합의 알고리즘. Flask 노드와 같은 Blockchain.resolve_conflicts를 스레드 풀에서 실행합니다:
+        피어들의 tip을 먼저 묻고, 가장 긴 체인을 점수가 높은 피어들에게서 구간별로 병렬 다운로드하며,
+        잘못된 데이터를 보낸 피어는 피어 테이블에서 감점합니다.
+        :return: 우리 체인이 교체되었으면 True, 아니면 False
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.blockchain.resolve_conflicts)
+
+    async def announce_block(self, block: dict):
+        """
+        새 블록을 채굴했음을 피어들에게 알립니다 (가십).
+        헤더와 짧은 거래 ID만 담은 압축 블록을 보내고, 피어의 Mempool에 없는 거래만 추가로 보냅니다.
+        응답은 기다리지 않습니다.
+        """
+        compact = self.blockchain.compact_block(block)
+        headers = {'Content-Type': wire.CONTENT_TYPE, 'Accept': wire.ACCEPT}
+
+        async def post(url, payload):
+            async with self.session.post(url, data=wire.encode(payload), headers=headers) as response:
+                response.raise_for_status()
+                if wire.is_wire(response.headers.get('Content-Type')):
+                    return wire.decode(await response.read())
+                return await response.json()
+
+        async def notify(node):
+            sent = len(wire.encode(compact))
+            try:
+                values = await post(f'http://{node}/blocks/compact', compact)
+                if values['status'] == 'missing':
+                    transactions = block['transactions']
+                    payload = {
+                        'hash': self.blockchain.hash(block),
+                        'transactions': [[i, transactions[i]] for i in values['missing']
+                                         if 0 <= i < len(transactions)],
+                    }
+                    sent += len(wire.encode(payload))
+                    await post(f'http://{node}/blocks/compact/transactions', payload)
+            except (ClientError, asyncio.TimeoutError, ValueError, KeyError) as e:
+                print(f"Could not announce block to node {node}: {e}")
+                return
+
+            stats = self.blockchain.relay_stats
+            stats['blocks_relayed'] += 1
+            stats['full_bytes'] += len(wire.encode(block))
+            stats['relay_bytes'] += sent
+
+        for node in list(self.blockchain.nodes):
+            self.spawn(notify(node))
+
+    @staticmethod
+    def negotiated(request, payload, status: int = 200):
+        """
+        요청의 Accept 헤더가 바이너리 인코딩을 원하면 wire 형식으로, 아니면 JSON으로 응답합니다.
+        """
+        if wire.accepts(request.headers.get('Accept')):
+            return web.Response(body=wire.encode(payload), status=status, content_type=wire.CONTENT_TYPE)
+        return web.json_response(payload, status=status)
+
+    def conditional(self, request, tag: str, build):
+        """
+        tag(tip 키 등)로 만든 ETag를 붙여 응답합니다. If-None-Match가 일치하면 build()를 부르지 않고 304를 반환합니다.
+        """
+        etag = TipPayloadCache.make_etag(tag, wire.accepts(request.headers.get('Accept')))
+        headers = {'ETag': etag, 'Vary': 'Accept'}
+        if_none_match = request.headers.get('If-None-Match')
+        if if_none_match and etag_matches(if_none_match, etag):
+            return web.Response(status=304, headers=headers)
+        response = self.negotiated(request, build())
+        response.headers.update(headers)
+        return response
+
+    @staticmethod
+    async def request_values(request):
+        """
+        요청 본문을 Content-Type에 따라 바이너리 또는 JSON으로 파싱합니다. 잘못된 본문이면 ValueError.
+        """
+        if wire.is_wire(request.content_type):
+            return wire.decode(await request.read())
+        return await request.json()
+
+    # --- API 부분 ---
+
+    async def mine(self, request):
+        loop = asyncio.get_running_loop()
+
+        async with self.mine_lock:
+            # 작업 증명을 하는 동안 체인이 교체되면 새 마지막 블록으로 다시 시도합니다.
+            # 블록은 Flask 노드와 같은 block_lock 안에서 만듭니다 (풀 작업자, 릴레이된 블록과 직렬화).
+            # 락을 기다리는 동안이나 블록 저장소에 쓰는 동안 루프가 멈추지 않도록 스레드 풀에서 만듭니다.
+            while True:
+                if not self.blockchain.can_mine():
+                    return web.Response(text='Cannot mine a checkpoint block without the chain state', status=503)
+                last_block = self.blockchain.last_block
+                try:
+                    proof = await loop.run_in_executor(None, self.blockchain.consensus.prove, self.blockchain,
+                                                       last_block)
+                except ValueError as e:
+                    return web.Response(text=str(e), status=403)
+                block = await loop.run_in_executor(None, self.blockchain.forge_block, last_block, proof,
+                                                   self.node_identifier)
+                if block is not None:
+                    break
+
+        await self.announce_block(block)
+
+        response = {
+            'message': "New Block Forged",
+            'index': block['index'],
+            'transactions': block['transactions'],
+            'proof': block['proof'],
+            'previous_hash': block['previous_hash'],
+        }
+        return web.json_response(response, status=200)
+
+    async def get_work(self, request):
+        if self.blockchain.difficulty is None:
+            return web.Response(text='Pool mining needs proof of work', status=400)
+        if not self.blockchain.can_mine():
+            return web.Response(text='Cannot mine a checkpoint block without the chain state', status=503)
+        # 코디네이터는 block_lock을 잡으므로 스레드 풀에서 부릅니다.
+        loop = asyncio.get_running_loop()
+        job = await loop.run_in_executor(None, self.coordinator.get_work, request.query.get('worker', ''))
+        return web.json_response(job, status=200)
+
+    async def work_status(self, request):
+        loop = asyncio.get_running_loop()
+        current = await loop.run_in_executor(None, self.coordinator.is_current, request.query.get('job_id', ''))
+        return web.json_response({'current': current}, status=200)
+
+    async def submit_work(self, request):
+        try:
+            values = await request.json()
+        except ValueError:
+            values = None
+
+        required = ['job_id', 'proof']
+        if not isinstance(values, dict) or not all(k in values for k in required):
+            return web.Response(text='Missing values', status=400)
+        if self.blockchain.difficulty is None:
+            return web.Response(text='Pool mining needs proof of work', status=400)
+
+        # 증명 값은 0 이상의 정수여야 합니다 (숫자 문자열도 받습니다).
+        proof = values['proof']
+        if isinstance(proof, str) and proof.isdigit():
+            proof = int(proof)
+        if not isinstance(proof, int) or isinstance(proof, bool) or proof < 0:
+            return web.Response(text='Invalid proof', status=400)
+
+        loop = asyncio.get_running_loop()
+        result, block = await loop.run_in_executor(None, self.coordinator.submit, str(values['job_id']), proof)
+        response = {'result': result}
+        if result == 'accepted':
+            await self.announce_block(block)
+        if block is not None:
+            response['index'] = block['index']
+            response['previous_hash'] = block['previous_hash']
+        return web.json_response(response, status=200 if result == 'accepted' else 409)
+
+    async def work_stats(self, request):
+        return web.json_response(self.coordinator.stats, status=200)
+
+    async def new_transaction(self, request):
+        # Mempool이 가득 찼거나 클라이언트가 너무 빨리 보내면 본문을 읽기 전에 429로 거절합니다.
+        admitted, retry_after = self.admission.admit(request.remote, len(self.blockchain.current_transactions))
+        if not admitted:
+            return web.Response(text='Too many transactions, try again later', status=429,
+                                headers={'Retry-After': str(retry_after)})
+
+        try:
+            values = await self.request_values(request)
+        except ValueError:
+            return web.Response(text='Missing values', status=400)
+
+        required = ['sender', 'recipient', 'amount']
+        if not isinstance(values, dict) or not all(k in values for k in required):
+            return web.Response(text='Missing values', status=400)
+        if not valid_transaction(values):
+            return web.Response(text='Invalid sender, recipient or amount', status=400)
+
+        try:
+            index = self.blockchain.new_transaction(values['sender'], values['recipient'], values['amount'],
+                                                    values.get('nonce'))
+        except DuplicateTransaction as e:
+            return web.Response(text=str(e), status=409)
+        self.admission.record_accepted()
+
+        response = {'message': f'Transaction will be added to Block {index}'}
+        return web.json_response(response, status=201)
+
+    async def new_transactions(self, request):
+        # 묶음 크기를 알아야 하므로 본문을 읽은 뒤 입장 제어를 합니다.
+        try:
+            values = await self.request_values(request)
+        except ValueError:
+            values = None
+        if not self.blockchain.valid_batch(values):
+            return web.Response(
+                text=f'Expected 1 to {MAX_BATCH} transactions with sender, recipient and a positive amount',
+                status=400,
+            )
+
+        count = len(values['transactions'])
+        admitted, retry_after = self.admission.admit(request.remote, len(self.blockchain.current_transactions), count)
+        if not admitted:
+            return web.Response(text='Too many transactions, try again later', status=429,
+                                headers={'Retry-After': str(retry_after)})
+
+        try:
+            index = self.blockchain.new_transactions(values['transactions'])
+        except DuplicateTransaction as e:
+            return web.Response(text=str(e), status=409)
+        self.admission.record_accepted(count)
+
+        response = {'message': f'{count} transactions will be added to Block {index}', 'count': count, 'index': index}
+        return web.json_response(response, status=201)
+
+    async def admission_metrics(self, request):
+        return web.json_response(self.admission.metrics(len(self.blockchain.current_transactions)), status=200)
+
+    async def full_chain(self, request):
+        chain = self.blockchain.chain
+        status, headers, body = self.chain_cache.respond(
+            self.blockchain.tip_key(chain),
+            lambda: {'chain': self.blockchain.full_blocks(chain), 'length': len(chain)},
+            if_none_match=request.headers.get('If-None-Match'),
+            accept_encoding=request.headers.get('Accept-Encoding'),
+            accept=request.headers.get('Accept'),
+        )
+        return web.Response(body=body, status=status, headers=headers)
+
+    async def chain_tip(self, request):
+        chain = self.blockchain.chain
+        return self.conditional(request, self.blockchain.tip_key(chain), lambda: {
+            'length': len(chain),
+            'hash': self.blockchain.hash(chain[-1]),
+        })
+
+    async def block_range(self, request):
+        try:
+            start = max(int(request.query.get('start', 0)), 0)
+            count = min(int(request.query.get('count', 500)), 2000)
+        except ValueError:
+            return web.Response(text='Invalid values', status=400)
+
+        chain = self.blockchain.chain
+        # 응답에 체인 길이가 들어가므로 ETag는 tip과 구간으로 만듭니다.
+        return self.conditional(request, f'{self.blockchain.tip_key(chain)}-{start}-{count}', lambda: {
+            'blocks': self.blockchain.full_blocks(chain[start:start + count]),
+            'length': len(chain),
+        })
+
+    async def block_headers(self, request):
+        try:
+            start = int(request.query.get('start', 0))
+            count = int(request.query.get('count', 2000))
+        except ValueError:
+            return web.Response(text='Invalid values', status=400)
+
+        response = {
+            'headers': self.blockchain.headers(start, min(count, 2000)),
+            'length': len(self.blockchain.chain),
+        }
+        return self.negotiated(request, response)
+
+    async def transaction_proof(self, request):
+        try:
+            block_index = int(request.query['block'])
+            tx_index = int(request.query['tx'])
+        except (KeyError, ValueError):
+            return web.Response(text='Missing values', status=400)
+
+        proof = self.blockchain.transaction_proof(block_index, tx_index)
+        if proof is None:
+            return web.Response(text='Transaction not found', status=404)
+
+        return self.negotiated(request, proof)
+
+    async def state_snapshot(self, request):
+        try:
+            height = int(request.query['height']) if 'height' in request.query else None
+        except ValueError:
+            return web.Response(text='Invalid height', status=400)
+
+        state = self.blockchain.snapshot(height)
+        if state is None:
+            return web.Response(text='Snapshot not found', status=404)
+        return self.negotiated(request, state.to_dict())
+
+    async def chain_state(self, request):
+        summary = self.blockchain.state_summary(request.query.get('address'))
+        if summary is None:
+            return web.Response(text='State is not available', status=503)
+        return web.json_response(summary, status=200)
+
+    async def difficulty(self, request):
+        info = self.blockchain.difficulty_info()
+        if info is None:
+            return web.Response(text='This node does not use proof of work', status=404)
+        return web.json_response(info, status=200)
+
+    async def compact_block(self, request):
+        try:
+            values = await self.request_values(request)
+            # 블록을 붙일 때 block_lock을 잡으므로 스레드 풀에서 처리합니다.
+            loop = asyncio.get_running_loop()
+            status, missing = await loop.run_in_executor(None, self.blockchain.receive_compact, values)
+        except (KeyError, TypeError, ValueError):
+            return web.Response(text='Invalid compact block', status=400)
+
+        # 피어의 체인이 우리 체인보다 앞서 있으면 합의 알고리즘으로 따라잡습니다.
+        if status == 'orphan':
+            self.spawn(self.resolve_conflicts())
+
+        return self.negotiated(request, {'status': status, 'missing': missing})
+
+    async def compact_block_transactions(self, request):
+        try:
+            values = await self.request_values(request)
+            loop = asyncio.get_running_loop()
+            status, missing = await loop.run_in_executor(None, self.blockchain.complete_compact, values['hash'],
+                                                         values['transactions'])
+        except (KeyError, TypeError, ValueError):
+            return web.Response(text='Invalid transactions', status=400)
+
+        return self.negotiated(request, {'status': status, 'missing': missing})
+
+    async def relay_metrics(self, request):
+        return web.json_response(self.blockchain.relay_stats, status=200)
+
+    async def mempool_digest(self, request):
+        return web.json_response(self.mempool_sync.mempool_digest(), status=200)
+
+    async def _mempool_answer(self, request, answer):
+        try:
+            return self.negotiated(request, answer(await self.request_values(request)))
+        except (KeyError, TypeError, ValueError):
+            return web.Response(text='Invalid values', status=400)
+
+    async def mempool_reconcile(self, request):
+        return await self._mempool_answer(request, self.mempool_sync.answer_reconcile)
+
+    async def mempool_fetch(self, request):
+        return await self._mempool_answer(request, self.mempool_sync.answer_fetch)
+
+    async def mempool_transactions(self, request):
+        return await self._mempool_answer(request, self.mempool_sync.receive)
+
+    async def mempool_sync_now(self, request):
+        # 조정은 동기식 HTTP 요청으로 하므로 스레드 풀에서 실행합니다.
+        loop = asyncio.get_running_loop()
+        results = await loop.run_in_executor(None, self.mempool_sync.sync_all)
+        response = {
+            'peers': {node: {'received': r[0], 'sent': r[1]} for node, r in results.items()},
+            'stats': self.mempool_sync.stats,
+        }
+        return web.json_response(response, status=200)
+
+    async def mempool_sync_metrics(self, request):
+        return web.json_response(self.mempool_sync.stats, status=200)
+
+    async def register_nodes(self, request):
+        values = await request.json()
+
+        nodes = values.get('nodes')
+        if nodes is None:
+            return web.Response(text="Error: Please supply a valid list of nodes", status=400)
+
+        for node in nodes:
+            self.blockchain.register_node(node)
+
+        response = {
+            'message': 'New nodes have been added',
+            'total_nodes': list(self.blockchain.nodes),
+        }
+        return web.json_response(response, status=201)
+
+    async def peer_table(self, request):
+        response = {
+            'peers': self.blockchain.nodes.to_list(),
+        }
+        return web.json_response(response, status=200)
+
+    async def consensus(self, request):
+        replaced = await self.resolve_conflicts()
+
+        if replaced:
+            response = {
+                'message': 'Our chain was replaced',
+                'new_chain': self.blockchain.chain
+            }
+        else:
+            response = {
+                'message': 'Our chain is authoritative',
+                'chain': self.blockchain.chain
+            }
+
+        return web.json_response(response, status=200)
+
+
+def run(blockchain: Blockchain, node_identifier: str, host: str = '0.0.0.0', port: int = 5000,
+        admission: AdmissionController = None, mempool_sync: MempoolSync = None,
+        coordinator: MiningCoordinator = None):
+    """
+    asyncio 서버 모드로 노드를 실행합니다.
+    """
+    node = AsyncNode(blockchain, node_identifier, admission=admission, mempool_sync=mempool_sync,
+                     coordinator=coordinator)
+    # backlog를 넉넉히 잡아 동시 접속이 몰려도 연결이 거절되지 않도록 합니다.
+    web.run_app(node.app, host=host, port=port, backlog=4096)
+
+
+if __name__ == '__main__':
+
+    from argparse import ArgumentParser
+    parser = ArgumentParser()
+    parser.add_argument('-p', '--port', default=5000, type=int, help='port to listen on')
+    args = parser.parse_args()
+
+    run(Blockchain(), str(uuid4()).replace('-', ''), port=args.port)
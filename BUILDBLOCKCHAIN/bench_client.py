@@ -0,0 +1,110 @@
+import asyncio
+import threading
+import time
+
+import requests
+
+from bench_mempool import start_node, wait_until_up
+from client import AsyncNodeClient, NodeClient
+
+
+def new_transactions(count: int, tag: str) -> list:
+    return [{'sender': f'{tag}-{i}', 'recipient': 'bench', 'amount': 1} for i in range(count)]
+
+
+def run_threads(transactions: list, concurrency: int, send):
+    """
+    concurrency개의 스레드가 거래를 나누어 send(tx)로 하나씩 보냅니다.
+    """
+    def worker(part):
+        for tx in part:
+            send(tx)
+
+    threads = [threading.Thread(target=worker, args=(transactions[i::concurrency],)) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def naive(url: str, transactions: list, concurrency: int, batch_size: int):
+    # 지금 서비스들이 하는 방식: 요청마다 새 연결, 요청 하나에 거래 하나
+    run_threads(transactions, concurrency, lambda tx: requests.post(f'{url}/transactions/new', json=tx))
+
+
+def keep_alive(url: str, transactions: list, concurrency: int, batch_size: int):
+    # 스레드마다 keep-alive 세션을 쓰지만 요청 하나에 거래 하나
+    local = threading.local()
+
+    def send(tx):
+        if not hasattr(local, 'session'):
+            local.session = requests.Session()
+        local.session.post(f'{url}/transactions/new', json=tx)
+
+    run_threads(transactions, concurrency, send)
+
+
+def client_sync(url: str, transactions: list, concurrency: int, batch_size: int):
+    # NodeClient.submit: 자동으로 묶어서 pool_size개의 연결로 동시에 보냅니다.
+    with NodeClient(url, pool_size=concurrency, batch_size=batch_size) as client:
+        futures = [client.submit(tx['sender'], tx['recipient'], tx['amount']) for tx in transactions]
+        client.flush()
+        for future in futures:
+            future.result()
+
+
+def client_async(url: str, transactions: list, concurrency: int, batch_size: int):
+    async def run():
+        async with AsyncNodeClient(url, pool_size=concurrency, batch_size=batch_size) as client:
+            futures = [client.submit(tx['sender'], tx['recipient'], tx['amount']) for tx in transactions]
+            await asyncio.gather(*futures)
+
+    asyncio.run(run())
+
+
+MODES = {
+    'naive': naive,
+    'keep-alive': keep_alive,
+    'client': client_sync,
+    'async-client': client_async,
+}
+
+
+def main(count: int, concurrency: int, batch_size: int, server: str, port: int, modes: list):
+    url = f'http://127.0.0.1:{port}'
+    process = start_node(port, server, 0)
+    try:
+        wait_until_up(url)
+        print(f"{count} transactions to a {server} node, {concurrency} connections, batches of {batch_size}")
+        print(f"{'mode':<14} {'seconds':>9} {'tx/s':>10} {'accepted':>9} {'speedup':>8}")
+
+        baseline = None
+        for mode in modes:
+            before = requests.get(f'{url}/mempool').json()['count']
+            transactions = new_transactions(count, f'{mode}-{time.time()}')
+            started = time.perf_counter()
+            MODES[mode](url, transactions, concurrency, batch_size)
+            elapsed = time.perf_counter() - started
+            accepted = requests.get(f'{url}/mempool').json()['count'] - before
+
+            rate = count / elapsed
+            baseline = baseline or rate
+            print(f"{mode:<14} {elapsed:>9.2f} {rate:>10,.0f} {accepted:>9} {rate / baseline:>7.1f}x")
+    finally:
+        process.terminate()
+        process.wait()
+
+
+if __name__ == '__main__':
+
+    from argparse import ArgumentParser
+    parser = ArgumentParser(description='Compare client-side transaction submission throughput')
+    parser.add_argument('-n', '--transactions', default=5000, type=int, help='transactions to submit per mode')
+    parser.add_argument('-c', '--concurrency', default=8, type=int, help='connections (threads for per-request modes)')
+    parser.add_argument('-b', '--batch-size', default=500, type=int, help='transactions per batch for the client')
+    parser.add_argument('--server', default='flask', choices=['flask', 'async'], help='server mode')
+    parser.add_argument('-p', '--port', default=5800, type=int, help='port for the node')
+    parser.add_argument('-m', '--modes', default=','.join(MODES), help='comma-separated modes to run')
+    args = parser.parse_args()
+
+    main(args.transactions, args.concurrency, args.batch_size, args.server, args.port, args.modes.split(','))
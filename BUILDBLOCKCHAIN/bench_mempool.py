@@ -0,0 +1,155 @@
+import os
+import random
+import subprocess
+import sys
+import time
+from uuid import uuid4
+
+import requests
+
+import wire
+
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def start_node(port: int, server: str, interval: float) -> subprocess.Popen:
+    """
+    blockchain.py 노드를 별도 프로세스에서 실행합니다. 입장 제어 한도는 풀어 둡니다.
+    """
+    return subprocess.Popen(
+        [sys.executable, os.path.join(HERE, 'blockchain.py'), '--port', str(port), '--server', server,
+         '--mempool-sync', str(interval), '--rate-limit', '1000000', '--max-pending', '100000000'],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+
+
+def wait_until_up(url: str, timeout: float = 15.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if requests.get(f'{url}/chain/tip', timeout=1).status_code == 200:
+                return
+        except requests.exceptions.RequestException:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f'Node at {url} did not start')
+
+
+def links(ports: list, topology: str) -> list:
+    """
+    (노드, 피어) 연결 목록. mesh는 모든 노드끼리, ring은 이웃끼리 연결합니다.
+    """
+    if topology == 'mesh':
+        return [(a, b) for a in ports for b in ports if a != b]
+    return [(a, b) for i, a in enumerate(ports) for b in (ports[i - 1], ports[(i + 1) % len(ports)]) if a != b]
+
+
+def mempool_digests(urls: list) -> list:
+    return [requests.get(f'{url}/mempool', timeout=5).json() for url in urls]
+
+
+def sync_stats(urls: list) -> tuple:
+    """
+    :return: (모든 노드의 조정 트래픽 합계, 가장 많이 실행된 노드의 라운드 수)
+    """
+    stats = [requests.get(f'{url}/metrics/mempool-sync', timeout=5).json() for url in urls]
+    return sum(s['bytes_sent'] + s['bytes_received'] for s in stats), max(s['rounds'] for s in stats)
+
+
+def submit_and_converge(urls: list, transactions: list, on_demand: bool, timeout: float) -> float:
+    """
+    각 거래를 임의의 노드 한 곳에만 제출하고, 모든 노드의 Mempool이 같아질 때까지 기다립니다.
+    :return: 첫 제출부터 수렴까지 걸린 시간(초)
+    """
+    session = requests.Session()
+    expected = mempool_digests(urls)[0]['count'] + len(transactions)
+
+    started = time.perf_counter()
+    for tx in transactions:
+        session.post(f'{random.choice(urls)}/transactions/new', json=tx)
+
+    while True:
+        digests = mempool_digests(urls)
+        if all(d == digests[0] for d in digests) and digests[0]['count'] == expected:
+            break
+        if time.perf_counter() - started > timeout:
+            print(f"Mempools did not converge within {timeout}s")
+            break
+        if on_demand:
+            for url in urls:
+                session.get(f'{url}/mempool/sync')
+        else:
+            time.sleep(0.05)
+    return time.perf_counter() - started
+
+
+def new_transactions(count: int) -> list:
+    return [{'sender': uuid4().hex, 'recipient': uuid4().hex, 'amount': random.randint(1, 1000)}
+            for _ in range(count)]
+
+
+def main(nodes: int, backlog: int, transactions: int, interval: float, topology: str, server: str,
+         base_port: int, timeout: float):
+    ports = [base_port + i for i in range(nodes)]
+    urls = [f'http://127.0.0.1:{port}' for port in ports]
+    on_demand = interval <= 0
+    processes = [start_node(port, server, interval) for port in ports]
+    try:
+        for url in urls:
+            wait_until_up(url)
+
+        pairs = links(ports, topology)
+        for a, b in pairs:
+            requests.post(f'http://127.0.0.1:{a}/nodes/register', json={'nodes': [f'127.0.0.1:{b}']})
+
+        mode = 'on-demand' if on_demand else f'every {interval}s'
+        print(f"{nodes} {server} nodes ({topology}, {len(pairs)} links), rounds {mode}")
+
+        # 1단계: 비어 있는 Mempool들에 backlog개의 거래를 퍼뜨립니다 (차이가 큰 경우).
+        # 2단계: Mempool이 이미 맞춰진 상태에서 새 거래 transactions개를 퍼뜨립니다 (평소 상황).
+        submitted = []
+        for phase, count in (('initial backlog', backlog), ('new transactions', transactions)):
+            txs = new_transactions(count)
+            bytes_before, rounds_before = sync_stats(urls)
+            elapsed = submit_and_converge(urls, txs, on_demand, timeout)
+            bytes_after, rounds_after = sync_stats(urls)
+            submitted += txs
+
+            traffic = bytes_after - bytes_before
+            rounds = max(rounds_after - rounds_before, 1)
+            new_bytes = len(wire.encode(txs))
+            # 비교 기준: 라운드마다 모든 연결에서 전체 Mempool을 주고받는 방식
+            naive_bytes = len(wire.encode(submitted)) * len(pairs) * rounds
+
+            print(f"  {phase}: {count} transactions, Mempool now {len(submitted)}")
+            print(f"    convergence time:       {elapsed:10.2f} s  ({rounds} rounds)")
+            print(f"    reconciliation traffic: {traffic:10,} bytes  ({traffic / max(count, 1):.0f} per transaction)")
+            print(f"    new transactions alone: {new_bytes:10,} bytes  (x{nodes - 1} nodes to reach)")
+            print(f"    naive full exchange:    {naive_bytes:10,} bytes  ({traffic / naive_bytes:.1%} of it)")
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.wait()
+
+
+if __name__ == '__main__':
+
+    from argparse import ArgumentParser
+    parser = ArgumentParser(description='Measure mempool convergence time and bandwidth across local nodes')
+    parser.add_argument('-n', '--nodes', default=4, type=int, help='number of nodes to start')
+    parser.add_argument('-b', '--backlog', default=2000, type=int, help='transactions to spread first')
+    parser.add_argument('-t', '--transactions', default=50, type=int,
+                        help='new transactions to spread once mempools are in sync')
+    parser.add_argument('-i', '--interval', default=1.0, type=float,
+                        help='seconds between reconciliation rounds (0 to trigger rounds on demand)')
+    parser.add_argument('--topology', default='mesh', choices=['mesh', 'ring'], help='how nodes are connected')
+    parser.add_argument('--server', default='flask', choices=['flask', 'async'], help='server mode')
+    parser.add_argument('-p', '--port', default=5700, type=int, help='first port to use')
+    parser.add_argument('--timeout', default=120.0, type=float, help='give up after this many seconds')
+    args = parser.parse_args()
+
+    main(args.nodes, args.backlog, args.transactions, args.interval, args.topology, args.server, args.port,
+         args.timeout)
@@ -0,0 +1,94 @@
+import asyncio
+import os
+import subprocess
+import sys
+import time
+
+import aiohttp
+
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def start_node(server: str, port: int) -> subprocess.Popen:
+    """
+    blockchain.py 노드를 지정한 서버 모드로 별도 프로세스에서 실행합니다.
+    """
+    return subprocess.Popen(
+        # 모든 요청이 한 클라이언트(127.0.0.1)에서 오므로 입장 제어 한도를 풀어 둡니다.
+        [sys.executable, os.path.join(HERE, 'blockchain.py'), '--port', str(port), '--server', server,
+         '--rate-limit', '1000000', '--max-pending', '100000000'],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+
+
+async def wait_until_up(url: str, timeout: float = 15.0):
+    deadline = time.time() + timeout
+    async with aiohttp.ClientSession() as session:
+        while time.time() < deadline:
+            try:
+                async with session.get(f'{url}/chain') as response:
+                    if response.status == 200:
+                        return
+            except aiohttp.ClientError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f'Node at {url} did not start')
+
+
+async def submit_transactions(url: str, total: int, concurrency: int) -> float:
+    """
+    total개의 거래를 concurrency개의 동시 연결로 제출하고 초당 처리량을 반환합니다.
+    """
+    queue = asyncio.Queue()
+    for i in range(total):
+        queue.put_nowait(i)
+
+    async def worker(session):
+        while True:
+            try:
+                i = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            payload = {'sender': f'bench-{i}', 'recipient': 'bench', 'amount': 1}
+            async with session.post(f'{url}/transactions/new', json=payload) as response:
+                await response.read()
+
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(session) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    return total / elapsed
+
+
+async def main(total: int, concurrency: int, port: int):
+    results = {}
+    for server in ('flask', 'async'):
+        process = start_node(server, port)
+        url = f'http://127.0.0.1:{port}'
+        try:
+            await wait_until_up(url)
+            results[server] = await submit_transactions(url, total, concurrency)
+        finally:
+            process.terminate()
+            process.wait()
+
+    print(f"{total} transactions, {concurrency} concurrent clients")
+    for server, rate in results.items():
+        print(f"  {server:>5}: {rate:10.1f} tx/s")
+    print(f"  speedup: {results['async'] / results['flask']:.2f}x")
+
+
+if __name__ == '__main__':
+
+    from argparse import ArgumentParser
+    parser = ArgumentParser(description='Compare transaction throughput of the Flask and asyncio server modes')
+    parser.add_argument('-n', '--requests', default=5000, type=int, help='number of transactions to submit')
+    parser.add_argument('-c', '--concurrency', default=200, type=int, help='number of concurrent clients')
+    parser.add_argument('-p', '--port', default=5900, type=int, help='port to run the benchmark node on')
+    args = parser.parse_args()
+
+    asyncio.run(main(args.requests, args.concurrency, args.port))
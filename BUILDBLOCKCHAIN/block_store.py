@@ -0,0 +1,86 @@
+import json
+import sqlite3
+import threading
+
+
+class BlockStore:
+    """
+    블록을 SQLite 파일에 저장하는 디스크 블록 저장소입니다.
+    헤더와 거래 목록을 따로 저장하므로, 메모리에서 지운 블록 본문을 필요할 때 다시 읽을 수 있습니다.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.execute('''
+        CREATE TABLE IF NOT EXISTS blocks (
+            height INTEGER PRIMARY KEY,
+            header TEXT NOT NULL,
+            transactions TEXT
+        )
+        ''')
+        self.conn.commit()
+
+    def __len__(self) -> int:
+        with self.lock:
+            return self.conn.execute('SELECT COUNT(*) FROM blocks').fetchone()[0]
+
+    def put_blocks(self, blocks: list):
+        """
+        블록들을 저장합니다. 같은 높이의 블록이 있으면 덮어씁니다.
+        :param blocks: 블록 목록 (index는 1부터). 본문이 없는 블록(헤더)은 헤더만 저장합니다.
+        """
+        rows = []
+        for block in blocks:
+            header = {k: v for k, v in block.items() if k != 'transactions'}
+            transactions = json.dumps(block['transactions']) if 'transactions' in block else None
+            rows.append((block['index'], json.dumps(header), transactions))
+        with self.lock:
+            self.conn.executemany('INSERT OR REPLACE INTO blocks VALUES (?, ?, ?)', rows)
+            self.conn.commit()
+
+    def truncate(self, height: int):
+        """
+        height보다 높은 블록을 지웁니다 (체인이 더 짧은 체인으로 교체될 때 남은 블록 정리).
+        """
+        with self.lock:
+            self.conn.execute('DELETE FROM blocks WHERE height > ?', (height,))
+            self.conn.commit()
+
+    def get_transactions(self, height: int):
+        """
+        :param height: 블록의 index (1부터)
+        :return: 블록의 거래 목록 또는 없으면 None
+        """
+        with self.lock:
+            row = self.conn.execute('SELECT transactions FROM blocks WHERE height = ?', (height,)).fetchone()
+        return json.loads(row[0]) if row and row[0] is not None else None
+
+    def load_chain(self, keep_bodies: int = None) -> list:
+        """
+        저장된 체인을 읽습니다. 마지막 keep_bodies개 블록만 거래 목록까지 읽고 나머지는 헤더만 읽습니다.
+        :param keep_bodies: 본문까지 읽을 블록 수 (None이면 전부)
+        :return: 블록 목록
+        """
+        with self.lock:
+            count = self.conn.execute('SELECT COUNT(*) FROM blocks').fetchone()[0]
+            first_body = 0 if keep_bodies is None else count - keep_bodies
+            rows = self.conn.execute(
+                'SELECT height, header, CASE WHEN height > ? THEN transactions END FROM blocks ORDER BY height',
+                (first_body,),
+            ).fetchall()
+
+        chain = []
+        for height, header, transactions in rows:
+            block = json.loads(header)
+            if transactions is not None:
+                block['transactions'] = json.loads(transactions)
+            chain.append(block)
+        return chain
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
@@ -1,21 +1,120 @@
 import hashlib
 import json
-from time import time
+import random
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from time import monotonic, time
 from urllib.parse import urlparse
 from uuid import uuid4
 
 import requests
-from flask import Flask, jsonify, request
+from flask import Flask, Response, jsonify, make_response, request
+
+import wire
+from admission import MAX_BATCH, AdmissionController
+from block_store import BlockStore
+from chain_cache import TipPayloadCache, etag_matches
+from compact_block import MAX_PARTIAL_BLOCKS, PartialBlock, make_compact
+from consensus import ProofOfWork, make_consensus, valid_proof
+from difficulty import (RETARGET_INTERVAL, TARGET_BLOCK_TIME, DifficultyAdjuster, estimate_hash_rate,
+                        relative_difficulty, target_bytes)
+from mempool_sync import MempoolSync
+from merkle import merkle_proof, merkle_root_from_hashes, tx_hash
+from mining_pool import MiningCoordinator
+from peers import PeerTable, RangeCache, RangeDownloader
+from state import STATE_INTERVAL, TRANSACTION_FIELDS, ChainState, SnapshotStore, valid_transaction
+
+
+class StateRootMismatch(ValueError):
+    """
+    체크포인트 블록의 상태 루트가 거래를 적용한 결과와 다릅니다. index는 그 블록의 index입니다.
+    """
+
+    def __init__(self, index: int):
+        super().__init__(f"State root of block {index} does not match its transactions")
+        self.index = index
+
+
+class DuplicateTransaction(ValueError):
+    """
+    nonce까지 같은 거래가 이미 Mempool이나 최근 블록에 있습니다 (같은 거래를 다시 보냈습니다).
+    """
 
 
 class Blockchain:
-    def __init__(self):
+    def __init__(self, sync_range_size: int = 500, sync_timeout: float = 10.0,
+                 prune_depth: int = None, memory_budget: int = None, block_store: BlockStore = None,
+                 snapshot_store: SnapshotStore = None, state_interval: int = STATE_INTERVAL,
+                 difficulty: DifficultyAdjuster = None, consensus=None):
         self.current_transactions = []
+        # 거래가 들어올 때마다 미리 계산해 두는 거래 해시 (머클 트리의 잎)
+        self.current_tx_hashes = []
+        # Mempool(위의 두 목록과 confirmed_tx_hashes)은 요청 스레드와 Mempool 조정 스레드가 함께 바꿉니다.
+        # block_lock과 함께 잡을 때는 block_lock을 먼저 잡습니다.
+        self.mempool_lock = threading.Lock()
+        # 채굴 템플릿: (마지막 블록, 그 해시, 이전 증명까지 해시한 SHA-256 상태)
+        self.template = None
         self.chain = []
-        self.nodes = set()
+        # 피어 주소와 통계(지연 시간, 처리량, 잘못된 데이터)를 관리하는 테이블
+        self.nodes = PeerTable()
+        # 동기화 시 한 번에 요청하는 블록 수와 피어 요청 타임아웃
+        self.sync_range_size = sync_range_size
+        self.sync_timeout = sync_timeout
+        # 피어별로 마지막으로 받은 tip과 그 ETag, 최근에 받은 블록 구간 (조건부 요청용)
+        self.peer_tips = {}
+        self.range_cache = RangeCache()
+
+        # 가지치기(pruning) 설정: 최근 prune_depth개 블록과 memory_budget 바이트까지만 거래 목록을 메모리에 둡니다.
+        self.prune_depth = prune_depth
+        self.memory_budget = memory_budget
+        # 블록 저장소가 있으면 메모리에서 지운 거래 목록을 디스크에서 다시 읽을 수 있습니다.
+        self.block_store = block_store
+        # 거래 목록을 메모리에서 지운 앞쪽 블록 수, 남아 있는 블록 본문들의 크기
+        self.pruned_height = 0
+        self.body_sizes = deque()
+        self.body_bytes = 0
+
+        # 블록을 만들거나 체인 끝을 바꾸는 작업(/mine, 풀 작업자의 해답, 릴레이된 블록, 체인 교체)을 하나씩 처리합니다.
+        self.block_lock = threading.Lock()
+
+        # 압축 블록 릴레이: 부족한 거래를 기다리는 블록들, 릴레이 통계, 백그라운드 전송 스레드
+        self.partial_blocks = {}
+        self.relay_lock = threading.Lock()
+        self.relay_stats = {
+            'blocks_relayed': 0,
+            'full_bytes': 0,
+            'relay_bytes': 0,
+            'blocks_received': 0,
+            'reconstructed_from_mempool': 0,
+            'transactions_requested': 0,
+        }
+        self.relay_executor = ThreadPoolExecutor(max_workers=8)
+        # 최근 블록에 들어간 거래 해시. 피어의 Mempool에서 이미 채굴된 거래를 다시 받지 않도록 합니다.
+        self.confirmed_tx_hashes = OrderedDict()
+        self.max_confirmed = 100000
+
+        # 체인에서 파생되는 상태(잔액). state_interval 블록마다 헤더에 상태 루트를 넣고 스냅샷을 남깁니다.
+        self.state = ChainState()
+        self.state_interval = state_interval
+        self.snapshot_store = snapshot_store
+        # 최근 체크포인트의 상태 (체인이 교체될 때 처음부터 다시 적용하지 않도록)
+        self.checkpoints = OrderedDict()
+        # 합의 방식 (기본은 작업 증명, 개발/벤치마크용으로 권한 증명)과 작업 증명 목표값을 다시 정하는 규칙
+        self.consensus = consensus or ProofOfWork(difficulty)
+        self.difficulty = getattr(self.consensus, 'difficulty', None)
 
-        # 제네시스 블록 (가장 첫 블록) 생성
-        self.new_block(previous_hash='1', proof=100)
+        if block_store is not None and len(block_store):
+            # 디스크에 저장된 체인을 읽어 이어서 실행합니다.
+            self.chain = block_store.load_chain(keep_bodies=prune_depth)
+            self._reset_body_sizes()
+            self.prune()
+            # 마지막 스냅샷을 읽고 그 뒤의 블록만 다시 적용합니다.
+            self.state, checkpoints = self.replay_state(self.chain, verify=False)
+            self._register_checkpoints(checkpoints, write=False)
+        else:
+            # 제네시스 블록 (가장 첫 블록) 생성
+            self.new_block(previous_hash='1', proof=100)
 
     def register_node(self, address: str):
         """
@@ -30,67 +129,685 @@ class Blockchain:
         else:
             raise ValueError('Invalid URL')
 
-    def valid_chain(self, chain: list) -> bool:
+    def valid_chain(self, chain: list, bodies_from: int = 0) -> bool:
         """
         주어진 블록체인이 유효한지 확인합니다. :param chain: 블록체인 :return: True or False
+        :param bodies_from: 이 위치부터는 거래 목록이 있어야 합니다 (기본값: 모든 블록)
+        """
+        return self.first_invalid(chain, bodies_from) is None
+
+    def first_invalid(self, chain: list, bodies_from: int = 0):
+        """
+        chain에서 처음으로 검증에 실패한 블록의 위치를 찾습니다. 어느 피어가 잘못된 블록을 보냈는지 가릴 때 씁니다.
+        피어에게서 받은 블록은 거래 목록이 있어야 합니다. 헤더만 있어도 되는 것은 bodies_from 앞의 블록
+        (가지치기된 우리 블록이나 부트스트랩의 헤더 체인)뿐입니다.
+        :param chain: 블록체인
+        :param bodies_from: 이 위치부터는 거래 목록이 있어야 합니다
+        :return: chain 안의 위치 (0부터), 모두 유효하면 None
         """
         last_block = chain[0]
         current_index = 1
 
+        if not self.valid_merkle_root(last_block, require_body=bodies_from <= 0) or \
+                not self.valid_transactions(last_block):
+            return 0
+
+        # chain이 이미 검증된 우리 체인 뒤에 이어지는 일부일 수 있으므로, 블록 위치는 index로 셉니다.
+        # (download_chain은 새 블록을 검증할 수 있도록 합의 방식이 필요로 하는 만큼 앞 블록을 함께 넘깁니다)
+        offset = last_block['index'] - 1
+        timestamp_at = self.timestamp_lookup(chain, offset)
+
         while current_index < len(chain):
             block = chain[current_index]
-            print(f'{last_block}')
-            print(f'{block}')
-            print("\n-----------\n")
+
+            # 머클 루트가 블록의 거래 목록과 일치하는지 확인
+            if not self.valid_merkle_root(block, require_body=current_index >= bodies_from):
+                return current_index
+
+            # 거래의 금액이 0보다 큰 유한한 숫자인지 확인 (상태에 적용할 수 없는 블록을 거절합니다)
+            if not self.valid_transactions(block):
+                return current_index
 
             # 블록의 해시가 올바른지 확인
-            if block['previous_hash'] != self.hash(last_block):
-                return False
+            last_hash = self.hash(last_block)
+            if block['previous_hash'] != last_hash:
+                return current_index
 
-            # 작업 증명이 올바른지 확인
-            if not self.valid_proof(last_block['proof'], block['proof'], self.hash(last_block)):
-                return False
+            # 합의 규칙(작업 증명과 목표값, 또는 권한자 서명)을 확인
+            if not self.consensus.valid_seal(last_block, last_hash, block, timestamp_at):
+                return current_index
 
             last_block = block
             current_index += 1
 
-        return True
+        return None
+
+    @staticmethod
+    def timestamp_lookup(chain: list, offset: int = 0):
+        """
+        위치(0부터)를 받아 chain에서 그 블록의 타임스탬프를 돌려주는 함수. chain[0]의 위치가 offset입니다.
+        """
+        def timestamp_at(height: int):
+            if height < offset:
+                raise LookupError(height)
+            return chain[height - offset]['timestamp']
+        return timestamp_at
+
+    def fetch_tip(self, node: str):
+        """
+        피어 체인의 끝(tip) 정보를 가져오고 응답 시간을 피어 테이블에 기록합니다.
+        :param node: 피어 주소
+        :return: {'length', 'hash'} 또는 실패 시 None
+        """
+        started = monotonic()
+        cached = self.peer_tips.get(node)
+        headers = {'Accept': wire.ACCEPT}
+        if cached is not None:
+            headers['If-None-Match'] = cached[0]
+        try:
+            response = requests.get(f'http://{node}/chain/tip', headers=headers, timeout=self.sync_timeout)
+            # 304: 지난번 이후 피어의 tip이 바뀌지 않았으므로 본문 없이 지난번 tip을 씁니다.
+            if response.status_code == 304 and cached is not None:
+                tip = cached[1]
+            else:
+                response.raise_for_status()
+                tip = wire.parse_response(response)
+                if 'ETag' in response.headers:
+                    self.peer_tips[node] = (response.headers['ETag'], tip)
+            self.nodes.record_success(node, monotonic() - started)
+            return tip
+        except (requests.exceptions.RequestException, ValueError) as e:
+            print(f"Could not connect to node {node}: {e}")
+            self.nodes.record_failure(node)
+            return None
+
+    def download_chain(self, peers: list, length: int, tip_hash: str):
+        """
+        같은 tip을 가진 피어들에게서 체인을 구간별로 병렬 다운로드하고 검증합니다.
+        피어의 체인이 우리 tip을 포함하면 그 뒤의 블록만 받습니다.
+        :param peers: tip이 같은 피어 주소 목록
+        :param length: 피어 체인의 길이
+        :param tip_hash: 피어 체인의 마지막 블록 해시
+        :return: (검증된 새 체인, replay_state()의 결과) 또는 실패 시 None
+        """
+        chain = self.chain
+        ranked = self.nodes.ranked(peers)
+        if not ranked:
+            return None
+
+        # 피어 체인의 같은 높이에 우리 tip이 있으면 공통 부분은 다시 받지 않습니다.
+        start = 0
+        try:
+            response = requests.get(
+                f'http://{ranked[0]}/headers',
+                params={'start': len(chain) - 1, 'count': 1},
+                headers={'Accept': wire.ACCEPT},
+                timeout=self.sync_timeout,
+            )
+            headers = wire.parse_response(response)['headers'] if response.status_code == 200 else []
+            if headers and self.hash(headers[0]) == self.hash(chain[-1]):
+                start = len(chain)
+        except (requests.exceptions.RequestException, ValueError, KeyError):
+            pass
+
+        downloader = RangeDownloader(self, ranked, start, length, self.sync_range_size, self.sync_timeout)
+        blocks = downloader.run()
+        if blocks is None:
+            return None
+
+        new_chain = chain[:start] + blocks
+        # 우리 체인의 앞부분은 이미 검증되었으므로 이어지는 지점부터만 검증합니다.
+        # 합의 규칙(난이도 재조정 등)을 확인할 수 있도록 필요한 만큼 앞 블록을 함께 넘깁니다.
+        # 실패하면 잘못된 블록이 든 구간을 보낸 피어만 벌점을 받습니다.
+        verify_from = max(start - 1 - self.consensus.lookback, 0)
+        replayed = None
+        if self.hash(new_chain[-1]) != tip_hash:
+            bad = len(new_chain) - 1
+        else:
+            # start 앞은 우리 블록이므로 가지치기되어 헤더만 있어도 됩니다.
+            bad = self.first_invalid(new_chain[verify_from:], bodies_from=start - verify_from)
+            if bad is not None:
+                bad += verify_from
+            else:
+                try:
+                    replayed = self.replay_state(new_chain)
+                except StateRootMismatch as e:
+                    bad = e.index - 1
+        if bad is not None:
+            peer = downloader.source(bad)
+            print(f"Block {bad + 1} from node {peer} is invalid")
+            if peer is not None:
+                self.nodes.record_invalid(peer)
+            return None
+
+        return new_chain, replayed
 
     def resolve_conflicts(self) -> bool:
         """
         합의 알고리즘입니다. 네트워크에서 가장 긴 체인을 찾아 우리 체인으로 교체하여 충돌을 해결합니다.
+        모든 피어의 tip을 먼저 물어보고, 가장 긴 체인을 가진 피어들에게서 구간을 나누어 병렬로 내려받습니다.
         :return: 우리 체인이 교체되었으면 True, 아니면 False
         """
-        neighbours = self.nodes
-        new_chain = None
+        neighbours = list(self.nodes)
+        if not neighbours:
+            return False
+
+        # 네트워크의 모든 노드에 체인 길이와 tip 해시를 동시에 물어봅니다.
+        with ThreadPoolExecutor(max_workers=len(neighbours)) as executor:
+            tips = dict(zip(neighbours, executor.map(self.fetch_tip, neighbours)))
+
+        # 우리 체인보다 긴 체인을 tip별로 묶습니다.
+        groups = {}
+        for node, tip in tips.items():
+            if tip and tip['length'] > len(self.chain):
+                groups.setdefault((tip['length'], tip['hash']), []).append(node)
+
+        # 가장 긴 체인부터 (같으면 더 많은 피어가 가진 체인부터) 내려받아 검증합니다.
+        for (length, tip_hash), peers in sorted(groups.items(), key=lambda g: (g[0][0], len(g[1])), reverse=True):
+            downloaded = self.download_chain(peers, length, tip_hash)
+
+            # 만약 우리 체인보다 길고 유효한 체인을 찾았다면 교체합니다.
+            if downloaded and self.replace_chain(*downloaded):
+                return True
+
+        return False
+
+    def compact_block(self, block: dict) -> dict:
+        """
+        블록을 피어에게 릴레이할 압축 블록(헤더 + 짧은 거래 ID)으로 만듭니다.
+        채굴 보상 거래(마지막 거래)는 받는 쪽 Mempool에 있을 수 없으므로 그대로 넣습니다.
+        """
+        return make_compact(self.header(block), block['transactions'], self.hash(block), prefill=(-1,))
+
+    def relay_block(self, block: dict):
+        """
+        새 블록을 모든 피어에게 압축 블록으로 릴레이합니다. 전송은 백그라운드 스레드에서 합니다.
+        :param block: 우리가 방금 만든 블록
+        """
+        peers = list(self.nodes)
+        if not peers:
+            return
+        compact = self.compact_block(block)
+        for node in peers:
+            self.relay_executor.submit(self._relay_to, node, block, compact)
+
+    def _relay_to(self, node: str, block: dict, compact: dict):
+        headers = {'Content-Type': wire.CONTENT_TYPE, 'Accept': wire.ACCEPT}
+        body = wire.encode(compact)
+        sent = len(body)
+        try:
+            response = requests.post(f'http://{node}/blocks/compact', data=body, headers=headers,
+                                     timeout=self.sync_timeout)
+            response.raise_for_status()
+            values = wire.parse_response(response)
 
-        # 우리 체인보다 긴 체인을 찾습니다.
-        max_length = len(self.chain)
+            # 피어의 Mempool에 없던 거래만 보내 줍니다.
+            if values['status'] == 'missing':
+                transactions = block['transactions']
+                body = wire.encode({
+                    'hash': self.hash(block),
+                    'transactions': [[i, transactions[i]] for i in values['missing'] if 0 <= i < len(transactions)],
+                })
+                sent += len(body)
+                response = requests.post(f'http://{node}/blocks/compact/transactions', data=body, headers=headers,
+                                         timeout=self.sync_timeout)
+                response.raise_for_status()
+        except (requests.exceptions.RequestException, ValueError, KeyError) as e:
+            print(f"Could not relay block {block['index']} to node {node}: {e}")
+            return
+
+        with self.relay_lock:
+            self.relay_stats['blocks_relayed'] += 1
+            self.relay_stats['full_bytes'] += len(wire.encode(block))
+            self.relay_stats['relay_bytes'] += sent
+
+    def receive_compact(self, compact: dict) -> tuple:
+        """
+        피어가 릴레이한 압축 블록을 우리 Mempool의 거래로 복원하여 체인에 추가합니다.
+        :param compact: make_compact()로 만든 압축 블록
+        :return: (상태, 부족한 거래 위치 목록). 상태는 'accepted', 'missing', 'known', 'stale', 'orphan', 'invalid'
+        """
+        header = compact['header']
+        block_hash = self.hash(header)
+        chain = self.chain
+        index = header['index']
+
+        # 이미 가진 높이의 블록이면 같은 블록인지만 확인합니다.
+        if index <= len(chain):
+            return ('known' if self.hash(chain[index - 1]) == block_hash else 'stale'), []
+
+        # 우리 tip 바로 다음 블록이 아니면 체인 전체를 동기화해야 합니다.
+        last_block = chain[-1]
+        last_hash = self.hash(last_block)
+        if index != len(chain) + 1 or header['previous_hash'] != last_hash:
+            return 'orphan', []
+
+        # 거래를 복원하기 전에 헤더의 합의 규칙(작업 증명, 서명)부터 확인하여 가짜 블록을 싸게 거절합니다.
+        if not self.consensus.valid_seal(last_block, last_hash, header, self.timestamp_lookup(chain)):
+            return 'invalid', []
+
+        with self.relay_lock:
+            self.relay_stats['blocks_received'] += 1
+        partial = PartialBlock(compact, block_hash, *self.mempool_snapshot())
+        if partial.complete:
+            with self.relay_lock:
+                self.relay_stats['reconstructed_from_mempool'] += 1
+        return self._finish_partial(block_hash, partial)
+
+    def complete_compact(self, block_hash: str, transactions: list) -> tuple:
+        """
+        receive_compact()가 'missing'을 반환한 블록의 부족한 거래를 채워 완성합니다.
+        :param block_hash: 블록 해시
+        :param transactions: [[위치, 거래], ...]
+        :return: receive_compact()와 같은 (상태, 부족한 거래 위치 목록). 기다리는 블록이 없으면 'unknown'
+        """
+        with self.relay_lock:
+            partial = self.partial_blocks.pop(block_hash, None)
+        if partial is None:
+            return 'unknown', []
+        partial.fill(transactions)
+        return self._finish_partial(block_hash, partial)
+
+    def _finish_partial(self, block_hash: str, partial: PartialBlock) -> tuple:
+        # 복원한 거래 목록이 헤더의 머클 루트와 다르면 (짧은 ID 충돌 등) Mempool에서 가져온 거래도 다시 요청합니다.
+        # (중복 거래가 있는 블록도 여기서 거절됩니다)
+        if partial.complete and not self.valid_merkle_root(dict(partial.header, transactions=partial.transactions)):
+            if not partial.distrust_mempool():
+                return 'invalid', []
+
+        if not partial.complete:
+            with self.relay_lock:
+                self.partial_blocks[block_hash] = partial
+                while len(self.partial_blocks) > MAX_PARTIAL_BLOCKS:
+                    del self.partial_blocks[next(iter(self.partial_blocks))]
+                self.relay_stats['transactions_requested'] += len(partial.missing)
+            return 'missing', partial.missing
+
+        block = dict(partial.header, transactions=partial.transactions)
+        if not self.valid_transactions(block):
+            return 'invalid', []
+        with self.block_lock:
+            # 거래를 기다리는 동안 우리 체인이 바뀌었을 수 있습니다.
+            if partial.header['previous_hash'] != self.hash(self.last_block):
+                return 'orphan', []
+
+            # 체크포인트 블록이면 헤더의 상태 루트가 거래를 적용한 결과와 같아야 합니다.
+            # (상태를 모르는 노드는 확인하지 못하고 받아들입니다)
+            state_root = self.next_state_root(block['transactions']) if self.state is not None else None
+            if state_root is not None and block.get('state_root') != state_root:
+                return 'invalid', []
+            self.append_block(block)
+        self.remove_transactions(block['transactions'])
+        return 'accepted', []
+
+    def remove_transactions(self, transactions: list):
+        """
+        다른 노드가 채굴한 블록에 들어간 거래를 Mempool에서 지웁니다.
+        """
+        included = {tx_hash(tx) for tx in transactions}
+        with self.mempool_lock:
+            self._remember_confirmed(included)
+            kept = [(tx, h) for tx, h in zip(self.current_transactions, self.current_tx_hashes) if h not in included]
+            self.current_transactions = [tx for tx, _ in kept]
+            self.current_tx_hashes = [h for _, h in kept]
+
+    def mempool_snapshot(self) -> tuple:
+        """
+        :return: (Mempool의 거래 목록, 거래 해시 목록) 복사본
+        """
+        with self.mempool_lock:
+            return list(self.current_transactions), list(self.current_tx_hashes)
 
-        # 네트워크의 모든 노드에서 체인을 가져와 확인합니다.
-        for node in neighbours:
-            try:
-                response = requests.get(f'http://{node}/chain')
+    def _remember_confirmed(self, hashes):
+        for h in hashes:
+            self.confirmed_tx_hashes[h] = None
+        while len(self.confirmed_tx_hashes) > self.max_confirmed:
+            self.confirmed_tx_hashes.popitem(last=False)
 
-                if response.status_code == 200:
-                    length = response.json()['length']
-                    chain = response.json()['chain']
+    def add_transactions(self, transactions: list, max_pending: int = None) -> int:
+        """
+        피어에게서 받은 거래들을 Mempool에 추가합니다.
+        이미 Mempool에 있거나 최근 블록에 들어간 거래, 형식이 잘못된 거래는 건너뜁니다.
+        :param transactions: 거래 목록
+        :param max_pending: Mempool 크기 상한 (None이면 제한 없음)
+        :return: 추가한 거래 수
+        """
+        candidates = [(tx, tx_hash(tx)) for tx in transactions
+                      if valid_transaction(tx) and set(tx) == TRANSACTION_FIELDS and tx['sender'] != '0']
+        added = 0
+        with self.mempool_lock:
+            known = set(self.current_tx_hashes)
+            for tx, h in candidates:
+                if max_pending is not None and len(self.current_transactions) >= max_pending:
+                    break
+                if h in known or h in self.confirmed_tx_hashes:
+                    continue
+                known.add(h)
+                self.current_transactions.append(tx)
+                self.current_tx_hashes.append(h)
+                added += 1
+        return added
 
-                    # 길이가 더 길고, 체인이 유효한지 확인합니다.
-                    if length > max_length and self.valid_chain(chain):
-                        max_length = length
-                        new_chain = chain
-            except requests.exceptions.RequestException as e:
-                print(f"Could not connect to node {node}: {e}")
-                continue
+    def replace_chain(self, new_chain: list, replayed: tuple = None) -> bool:
+        """
+        우리 체인을 검증된 새 체인으로 교체하고, 블록 저장소와 가지치기 상태, 파생 상태를 맞춥니다.
+        새 체인의 헤더에 있는 상태 루트가 거래를 적용한 결과와 다르면 교체하지 않습니다.
+        :param new_chain: 새 체인
+        :param replayed: 이미 구한 replay_state(new_chain)의 결과 (없으면 여기서 구합니다)
+        :return: 교체했으면 True
+        """
+        try:
+            new_state, checkpoints = replayed or self.replay_state(new_chain)
+        except ValueError as e:
+            print(f"Rejected chain: {e}")
+            return False
 
+        with self.block_lock:
+            old_chain = self.chain
+            # 검증하는 동안 우리 체인이 새 체인만큼 길어졌으면 교체하지 않습니다.
+            if len(new_chain) <= len(old_chain):
+                return False
+            # 두 체인이 공유하는 앞부분(같은 블록 객체)은 다시 저장하지 않습니다.
+            start = 0
+            while start < min(len(old_chain), len(new_chain)) and new_chain[start] is old_chain[start]:
+                start += 1
 
-        # 만약 우리 체인보다 길고 유효한 체인을 찾았다면 교체합니다.
-        if new_chain:
             self.chain = new_chain
-            return True
+            if self.block_store is not None:
+                self.block_store.put_blocks(new_chain[start:])
+                self.block_store.truncate(len(new_chain))
 
-        return False
+            self._reset_body_sizes()
+            self.prune()
+
+            self.state = new_state
+            self._register_checkpoints(checkpoints)
+
+        # 새 체인에 들어간 거래는 Mempool에서 지웁니다.
+        for block in new_chain[max(start, len(new_chain) - 100):]:
+            if 'transactions' in block:
+                self.remove_transactions(block['transactions'])
+        return True
+
+    def _checkpoint(self, state: ChainState, write: bool = True):
+        """
+        체크포인트 높이의 상태를 메모리에 기억하고, 스냅샷 저장소가 있으면 파일로도 남깁니다.
+        """
+        self.checkpoints[state.height] = state.copy()
+        while len(self.checkpoints) > 5:
+            self.checkpoints.popitem(last=False)
+        if write and self.snapshot_store is not None:
+            self.snapshot_store.write(state)
+
+    def _register_checkpoints(self, checkpoints: list, write: bool = True):
+        # 다른 체인의 같은 높이 체크포인트는 버립니다.
+        for state in checkpoints:
+            self.checkpoints.pop(state.height, None)
+            self._checkpoint(state, write)
+
+    def _base_state(self, chain: list) -> ChainState:
+        """
+        chain의 앞부분과 일치하는 가장 높은 상태 (현재 상태, 메모리의 체크포인트, 스냅샷 파일, 빈 상태 순).
+        """
+        def matches(state):
+            return 0 < state.height <= len(chain) and self.hash(chain[state.height - 1]) == state.block_hash
+
+        if self.state is not None and matches(self.state):
+            return self.state.copy()
+        for height in reversed(self.checkpoints):
+            if matches(self.checkpoints[height]):
+                return self.checkpoints[height].copy()
+        if self.snapshot_store is not None:
+            for state in self.snapshot_store.snapshots():
+                if matches(state):
+                    return state
+        return ChainState()
+
+    def replay_state(self, chain: list, verify: bool = True) -> tuple:
+        """
+        chain의 끝에서의 상태를 구합니다. 일치하는 가장 최근 상태에서 시작하여 그 뒤의 블록만 적용합니다.
+        체인이 채택되기 전이므로 체크포인트는 기록하지 않고 돌려줍니다.
+        :param chain: 블록체인
+        :param verify: True면 체크포인트 블록의 상태 루트를 확인합니다
+        :return: (상태, 지나온 체크포인트 상태 목록). 블록 본문이 없어 계산할 수 없으면 상태는 None
+        :raise ValueError: 체크포인트 블록의 상태 루트가 거래를 적용한 결과와 다를 때
+        """
+        state = self._base_state(chain)
+        start = state.height
+        checkpoints = []
+        for block in chain[start:]:
+            block = self.full_block(block)
+            if 'transactions' not in block:
+                return None, checkpoints
+
+            state.apply_block(block, self.hash(block))
+            if block['index'] % self.state_interval == 0:
+                if verify and block.get('state_root') != state.root():
+                    raise StateRootMismatch(block['index'])
+                checkpoints.append(state.copy())
+
+        if start and len(chain) > start:
+            print(f"State at height {start} reused, replayed {len(chain) - start} blocks")
+        return state, checkpoints
+
+    def forge_block(self, last_block: dict, proof: int, reward_address: str):
+        """
+        last_block 위에 proof로 새 블록을 만들어 체인에 추가합니다 (채굴 보상 거래 포함).
+        block_lock 안에서 만들므로 풀 작업자의 해답, 릴레이된 블록, 체인 교체와 동시에 체인에 붙지 않습니다.
+        블록 저장소 쓰기와 스냅샷 저장을 하므로 이벤트 루프에서는 스레드 풀에서 부릅니다.
+        :return: 새 블록, 그 사이 마지막 블록이 바뀌었거나 블록을 만들 수 없으면 None
+        """
+        with self.block_lock:
+            if self.last_block is not last_block or not self.can_mine():
+                return None
+
+            # 채굴에 대한 보상을 받아야 합니다.
+            # 보낸 사람이 "0"인 것은 이 노드가 새 코인을 채굴했다는 것을 의미합니다.
+            self.new_transaction(sender="0", recipient=reward_address, amount=1)
+
+            # 체인에 새 블록을 추가하여 위조합니다.
+            return self.new_block(proof, self.hash(last_block))
+
+    def can_mine(self) -> bool:
+        """
+        다음 블록을 만들 수 있는지 확인합니다. 체크포인트 높이의 블록은 헤더에 상태 루트를 커밋해야 하므로,
+        상태를 모르는 노드(본문을 지웠고 스냅샷도 없는 노드)는 만들 수 없습니다.
+        """
+        return self.state is not None or (len(self.chain) + 1) % self.state_interval != 0
+
+    def next_state_root(self, transactions: list):
+        """
+        다음 블록이 체크포인트 높이이면, 그 블록의 거래를 적용한 뒤의 상태 루트를 반환합니다.
+        :return: 상태 루트, 또는 체크포인트가 아니면 None
+        :raise ValueError: 체크포인트 높이인데 상태를 모르거나 거래를 적용할 수 없을 때
+        """
+        if (len(self.chain) + 1) % self.state_interval:
+            return None
+        if self.state is None:
+            raise ValueError(f'Cannot build checkpoint block {len(self.chain) + 1} without the chain state')
+        state = self.state.copy()
+        state.apply_transactions(transactions)
+        return state.root()
+
+    def snapshot(self, height: int = None):
+        """
+        체크포인트 높이의 상태 스냅샷을 반환합니다 (height가 없으면 가장 최근 것).
+        :return: ChainState 또는 없으면 None
+        """
+        candidates = [s for h, s in reversed(self.checkpoints.items()) if height is None or h == height]
+        if not candidates and self.snapshot_store is not None:
+            candidates = [s for s in self.snapshot_store.snapshots() if height is None or s.height == height]
+        for state in candidates:
+            # 우리 체인에 있는 블록의 스냅샷만 내보냅니다.
+            if state.height <= len(self.chain) and self.hash(self.chain[state.height - 1]) == state.block_hash:
+                return state
+        return None
+
+    def state_summary(self, address: str = None) -> dict:
+        """
+        현재 상태의 요약 (높이, 블록 해시, 상태 루트, 계정 수). address가 있으면 그 주소의 잔액도 넣습니다.
+        :return: 요약 또는 상태를 모르면 None
+        """
+        state = self.state
+        if state is None:
+            return None
+        summary = {
+            'height': state.height,
+            'block_hash': state.block_hash,
+            'state_root': state.root(),
+            'tx_count': state.tx_count,
+            'accounts': len(state.balances),
+        }
+        if address is not None:
+            summary['address'] = address
+            summary['balance'] = state.balances.get(address, 0)
+        return summary
+
+    def fetch_headers(self, node: str) -> list:
+        """
+        피어의 블록 헤더를 처음부터 모두 받아옵니다.
+        """
+        headers = []
+        while True:
+            response = requests.get(f'http://{node}/headers', params={'start': len(headers), 'count': 2000},
+                                    headers={'Accept': wire.ACCEPT}, timeout=self.sync_timeout)
+            response.raise_for_status()
+            values = wire.parse_response(response)
+            headers += values['headers']
+            if not values['headers'] or len(headers) >= values['length']:
+                return headers
+
+    def bootstrap(self, node: str) -> bool:
+        """
+        피어에게서 헤더 체인과 최신 상태 스냅샷을 받아 빠르게 시작합니다.
+        스냅샷은 헤더 체인으로 검증합니다: 스냅샷 높이의 블록 해시와 그 헤더의 상태 루트가 일치해야 합니다.
+        스냅샷 이전 블록은 헤더만 두고, 그 뒤의 블록만 내려받아 적용합니다.
+        :param node: 피어 주소
+        :return: 성공하면 True
+        """
+        try:
+            headers = self.fetch_headers(node)
+            response = requests.get(f'http://{node}/snapshot', headers={'Accept': wire.ACCEPT},
+                                    timeout=self.sync_timeout)
+            response.raise_for_status()
+            state = ChainState.from_dict(wire.parse_response(response))
+        except (requests.exceptions.RequestException, ValueError, KeyError) as e:
+            print(f"Could not bootstrap from node {node}: {e}")
+            return False
+
+        if len(headers) <= len(self.chain) or not self.valid_chain(headers, bodies_from=len(headers)):
+            print(f"Node {node} has no longer valid header chain")
+            return False
+        height = state.height
+        if not 0 < height <= len(headers) or self.hash(headers[height - 1]) != state.block_hash \
+                or headers[height - 1].get('state_root') != state.root():
+            print(f"Snapshot from node {node} does not match the header chain")
+            self.nodes.record_invalid(node)
+            return False
+
+        # 스냅샷 이후의 블록만 내려받아 헤더와 같은지 확인합니다.
+        blocks = RangeDownloader(self, [node], height, len(headers), self.sync_range_size, self.sync_timeout).run()
+        if blocks is None or any(self.hash(b) != self.hash(h) or not self.valid_merkle_root(b)
+                                 for b, h in zip(blocks, headers[height:])):
+            print(f"Could not download blocks after the snapshot from node {node}")
+            return False
+
+        new_chain = headers[:height] + blocks
+        self.checkpoints[height] = state.copy()
+        try:
+            new_state, checkpoints = self.replay_state(new_chain)
+        except ValueError as e:
+            print(f"Blocks after the snapshot from node {node} are invalid: {e}")
+            self.checkpoints.pop(height)
+            self.nodes.record_invalid(node)
+            return False
+
+        self.chain = new_chain
+        if self.block_store is not None:
+            self.block_store.put_blocks(self.chain)
+            self.block_store.truncate(len(self.chain))
+        # 스냅샷 이전 블록은 헤더만 있으므로 가지치기된 블록으로 취급합니다.
+        self.pruned_height = height
+        self.body_sizes = deque(self.body_size(block) for block in blocks)
+        self.body_bytes = sum(self.body_sizes)
+        self.prune()
+        self.state = new_state
+        self._register_checkpoints([state] + checkpoints)
+        print(f"Bootstrapped from snapshot at height {height}, replayed {len(blocks)} blocks")
+        return True
+
+    def append_block(self, block: dict):
+        """
+        블록을 체인 끝에 추가하고, 저장소에 기록한 뒤 오래된 블록 본문을 정리합니다.
+        상태에 적용할 수 없는 블록이면 체인과 저장소를 바꾸기 전에 ValueError를 일으킵니다.
+        :param block: 블록
+        """
+        if self.state is not None:
+            self.state.check_block(block)
+        self.chain.append(block)
+        if self.block_store is not None:
+            self.block_store.put_blocks([block])
+
+        if self.state is not None:
+            self.state.apply_block(block, self.hash(block))
+            if block['index'] % self.state_interval == 0:
+                self._checkpoint(self.state)
+
+        size = self.body_size(block)
+        self.body_sizes.append(size)
+        self.body_bytes += size
+        self.prune()
+
+    @staticmethod
+    def body_size(block: dict) -> int:
+        """
+        블록 본문(거래 목록)이 차지하는 메모리를 JSON 크기로 추정합니다.
+        """
+        if 'transactions' not in block:
+            return 0
+        return len(json.dumps(block['transactions']))
+
+    def _reset_body_sizes(self):
+        self.pruned_height = 0
+        self.body_sizes = deque(self.body_size(block) for block in self.chain)
+        self.body_bytes = sum(self.body_sizes)
+
+    def prune(self):
+        """
+        가지치기 모드일 때, 최근 prune_depth개 블록보다 오래되었거나 메모리 예산을 넘는 블록의 거래 목록을
+        메모리에서 지우고 헤더만 남깁니다. 마지막 블록의 본문은 항상 남겨 둡니다.
+        """
+        if self.prune_depth is None and self.memory_budget is None:
+            return
+
+        keep_from = len(self.chain) - self.prune_depth if self.prune_depth is not None else 0
+        while self.pruned_height < len(self.chain) - 1:
+            over_depth = self.pruned_height < keep_from
+            over_budget = self.memory_budget is not None and self.body_bytes > self.memory_budget
+            if not (over_depth or over_budget):
+                break
+
+            # 블록 객체를 바꾸지 않고 헤더로 교체하므로, 이미 반환된 블록은 그대로입니다.
+            self.chain[self.pruned_height] = self.header(self.chain[self.pruned_height])
+            self.body_bytes -= self.body_sizes.popleft()
+            self.pruned_height += 1
+
+    def full_block(self, block: dict) -> dict:
+        """
+        거래 목록이 지워진 블록이면 블록 저장소에서 본문을 읽어 채운 블록을 반환합니다.
+        저장소가 없거나 본문을 찾을 수 없으면 헤더를 그대로 반환합니다.
+        """
+        if 'transactions' in block or self.block_store is None:
+            return block
+        transactions = self.block_store.get_transactions(block['index'])
+        if transactions is None:
+            return block
+        return dict(block, transactions=transactions)
+
+    def full_blocks(self, blocks: list) -> list:
+        if not self.pruned_height:
+            return blocks
+        return [self.full_block(block) for block in blocks]
 
     def new_block(self, proof: int, previous_hash: str = None) -> dict:
         """
@@ -99,80 +816,280 @@ class Blockchain:
         :param previous_hash: 이전 블록의 해시
         :return: 새 블록
         """
-        block = {
-            'index': len(self.chain) + 1,
-            'timestamp': time(),
-            'transactions': self.current_transactions,
-            'proof': proof,
-            'previous_hash': previous_hash or self.hash(self.chain[-1]),
-        }
+        # 블록에 넣을 거래 목록을 복사해 두고 Mempool을 비우는 동안 다른 스레드가 거래를 추가하지 못하게 합니다.
+        # (복사하지 않으면 머클 루트를 계산한 뒤에 추가된 거래가 블록에 섞여 들어갑니다.)
+        with self.mempool_lock:
+            transactions = list(self.current_transactions)
+            hashes = list(self.current_tx_hashes)
+            block = {
+                'index': len(self.chain) + 1,
+                'timestamp': time(),
+                'transactions': transactions,
+                'merkle_root': merkle_root_from_hashes(hashes),
+                'proof': proof,
+                'previous_hash': previous_hash or self.hash(self.chain[-1]),
+            }
+            # 체크포인트 높이의 블록은 거래를 적용한 뒤의 상태 루트를 헤더에 커밋합니다.
+            state_root = self.next_state_root(transactions)
+            if state_root is not None:
+                block['state_root'] = state_root
+            # 합의 필드(작업 증명 목표값 또는 권한자 서명)를 채웁니다.
+            self.consensus.seal(self, block)
 
-        # 현재 거래 목록을 리셋합니다.
-        self.current_transactions = []
+            # 현재 거래 목록을 리셋합니다.
+            self._remember_confirmed(hashes)
+            self.current_transactions = []
+            self.current_tx_hashes = []
 
-        self.chain.append(block)
+        self.append_block(block)
         return block
 
-    def new_transaction(self, sender: str, recipient: str, amount: float) -> int:
+    def new_transaction(self, sender: str, recipient: str, amount: float, nonce: str = None) -> int:
         """
         다음 채굴될 블록에 추가될 새로운 거래를 생성.
         :param sender: 보내는 사람의 주소
         :param recipient: 받는 사람의 주소
         :param amount: 금액
+        :param nonce: 클라이언트가 정한 거래 nonce (None이면 노드가 임의로 정합니다)
         :return: 이 거래가 추가될 블록의 인덱스
+        :raise ValueError: 주소가 문자열이 아니거나 금액이 0보다 큰 유한한 숫자가 아닐 때
+        :raise DuplicateTransaction: nonce까지 같은 거래가 이미 있을 때
         """
-        self.current_transactions.append({
-            'sender': sender,
-            'recipient': recipient,
-            'amount': amount,
-        })
+        return self.new_transactions([{'sender': sender, 'recipient': recipient, 'amount': amount, 'nonce': nonce}])
+
+    def new_transactions(self, transactions: list) -> int:
+        """
+        클라이언트가 묶어서 보낸 거래들을 순서대로 Mempool에 추가합니다.
+        nonce가 없는 거래에는 임의의 nonce를 붙이므로, 내용이 같은 거래도 서로 다른 거래가 됩니다.
+        :param transactions: {sender, recipient, amount, nonce(선택)} 목록 (잘못된 거래가 있으면 ValueError)
+        :return: 이 거래들이 추가될 블록의 인덱스
+        :raise DuplicateTransaction: 클라이언트가 정한 nonce까지 같은 거래가 묶음 안이나 Mempool, 최근 블록에 있을 때
+        """
+        client_nonces = any(tx.get('nonce') is not None for tx in transactions)
+        transactions = [{'sender': tx['sender'], 'recipient': tx['recipient'], 'amount': tx['amount'],
+                         'nonce': uuid4().hex if tx.get('nonce') is None else tx['nonce']}
+                        for tx in transactions]
+        if not all(valid_transaction(tx) for tx in transactions):
+            raise ValueError('Invalid transaction in batch')
+        hashes = [tx_hash(tx) for tx in transactions]
+        with self.mempool_lock:
+            # 노드가 만든 nonce는 겹치지 않으므로, 클라이언트가 nonce를 정했을 때만 중복을 찾습니다.
+            if client_nonces and (len(set(hashes)) != len(hashes)
+                                  or any(h in self.confirmed_tx_hashes for h in hashes)
+                                  or not set(hashes).isdisjoint(self.current_tx_hashes)):
+                raise DuplicateTransaction('Transaction already received')
+            self.current_transactions.extend(transactions)
+            self.current_tx_hashes.extend(hashes)
 
         return self.last_block['index'] + 1
 
+    @staticmethod
+    def valid_batch(values) -> bool:
+        """
+        묶음 제출 요청 본문 {transactions: [...]}의 형식을 확인합니다.
+        """
+        if not isinstance(values, dict) or not isinstance(values.get('transactions'), list):
+            return False
+        transactions = values['transactions']
+        return 0 < len(transactions) <= MAX_BATCH and all(valid_transaction(tx) for tx in transactions)
+
+    @staticmethod
+    def valid_transactions(block: dict) -> bool:
+        """
+        블록의 거래가 모두 상태에 적용할 수 있는 거래인지 확인합니다. 헤더만 있는 블록은 확인할 거래가 없습니다.
+        """
+        return all(valid_transaction(tx) for tx in block.get('transactions', ()))
+
     @property
     def last_block(self) -> dict:
         return self.chain[-1]
 
     @staticmethod
-    def hash(block: dict) -> str:
+    def tip_key(chain: list) -> str:
+        """
+        체인의 끝(tip)을 식별하는 키. 마지막 블록의 해시가 체인 전체를 커밋하므로 ETag로 사용합니다.
+        :param chain: 블록체인
+        :return: '<마지막 블록 해시>-<길이>'
         """
-        블록의 SHA-256 해시를 생성.
+        return f'{Blockchain.hash(chain[-1])}-{len(chain)}'
+
+    @staticmethod
+    def header(block: dict) -> dict:
+        """
+        블록에서 거래 목록을 뺀 헤더를 반환합니다. 거래 목록은 머클 루트로 헤더에 커밋됩니다.
         :param block: 블록
+        :return: 블록 헤더
+        """
+        return {k: v for k, v in block.items() if k != 'transactions'}
+
+    @staticmethod
+    def hash(block: dict) -> str:
+        """
+        블록의 SHA-256 해시를 생성. 헤더만 해시하므로 라이트 노드도 헤더만으로 체인을 검증할 수 있습니다.
+        :param block: 블록 또는 블록 헤더
         :return: 해시 문자열
         """
         # 딕셔너리가 순서대로 정렬되도록 보장해야 합니다. 그렇지 않으면 해시가 일관되지 않습니다.
-        block_string = json.dumps(block, sort_keys=True).encode()
+        block_string = json.dumps(Blockchain.header(block), sort_keys=True).encode()
         return hashlib.sha256(block_string).hexdigest()
 
+    @staticmethod
+    def valid_merkle_root(block: dict, require_body: bool = True) -> bool:
+        """
+        블록 헤더의 머클 루트가 블록의 거래 목록과 일치하는지 확인합니다.
+        피어에게서 받은 블록은 거래 목록이 있어야 합니다. require_body=False이면 가지치기된 블록(헤더만 있는 블록)을
+        해시와 작업 증명으로만 검증합니다. 같은 거래가 두 번 들어 있는 블록은 유효하지 않습니다.
+        :param block: 블록
+        :param require_body: 거래 목록이 없는 블록을 거절할지
+        :return: True or False
+        """
+        if 'transactions' not in block:
+            return not require_body
+        hashes = [tx_hash(tx) for tx in block['transactions']]
+        # 같은 거래가 두 번 들어 있는 블록은 거절합니다. 홀수 층에서 마지막 해시를 복제하므로
+        # [a, b, c]와 [a, b, c, c]는 머클 루트가 같습니다 (CVE-2012-2459).
+        if len(set(hashes)) != len(hashes):
+            return False
+        return block.get('merkle_root') == merkle_root_from_hashes(hashes)
+
+    def headers(self, start: int = 0, count: int = 2000) -> list:
+        """
+        start번째 블록부터 최대 count개의 블록 헤더를 반환합니다.
+        :param start: 시작 위치 (0부터)
+        :param count: 최대 개수
+        :return: 블록 헤더 목록
+        """
+        return [self.header(block) for block in self.chain[start:start + count]]
+
+    def transaction_proof(self, block_index: int, tx_index: int):
+        """
+        블록에 포함된 거래와 그 머클 증명을 반환합니다.
+        :param block_index: 블록의 index (1부터)
+        :param tx_index: 블록 안에서 거래의 위치
+        :return: {'transaction', 'proof', 'merkle_root'} 또는 없으면 None
+        """
+        if not 1 <= block_index <= len(self.chain):
+            return None
+        block = self.full_block(self.chain[block_index - 1])
+        if 'transactions' not in block:
+            return None
+        transactions = block['transactions']
+        if not 0 <= tx_index < len(transactions):
+            return None
+        return {
+            'block_index': block_index,
+            'transaction': transactions[tx_index],
+            'proof': merkle_proof(transactions, tx_index),
+            'merkle_root': block['merkle_root'],
+        }
+
     def proof_of_work(self, last_block: dict) -> int:
         """
         간단한 작업 증명 알고리즘:
          - 이전 증명(last_proof)과 이전 해시(previous_hash)를 포함하는 해시를 찾습니다.
-         - 이 해시는 반드시 앞자리가 0이 4개여야 합니다.
+         - 이 해시는 256비트 정수로 보았을 때 다음 블록의 목표값(target)보다 작아야 합니다.
         :param last_block: 마지막 블록
         :return: 증명 값 (정수)
         """
-        last_proof = last_block['proof']
-        last_hash = self.hash(last_block)
+        template_block, last_hash, prefix_state = self.block_template()
+        if template_block is not last_block:
+            last_hash = self.hash(last_block)
+            prefix_state = hashlib.sha256(str(last_block['proof']).encode())
 
+        # 해시할 문자열은 f'{last_proof}{proof}{last_hash}'이므로 앞부분(last_proof)의 해시 상태를 복사해 씁니다.
+        # 목표값은 32바이트로 바꿔 두고 digest()와 바로 비교합니다.
+        limit = target_bytes(self.next_target(last_block['index']))
+        suffix = last_hash.encode()
         proof = 0
-        while self.valid_proof(last_proof, proof, last_hash) is False:
+        while True:
+            guess = prefix_state.copy()
+            guess.update(str(proof).encode() + suffix)
+            if guess.digest() < limit:
+                return proof
             proof += 1
 
-        return proof
+    def block_template(self) -> tuple:
+        """
+        채굴 템플릿을 반환합니다. 마지막 블록이 바뀔 때만 다시 만들므로,
+        채굴을 시작할 때 마지막 블록을 다시 직렬화하거나 해시하지 않습니다.
+        :return: (마지막 블록, 마지막 블록의 해시, 이전 증명까지 해시한 SHA-256 상태)
+        """
+        last_block = self.last_block
+        if self.template is None or self.template[0] is not last_block:
+            self.template = (
+                last_block,
+                self.hash(last_block),
+                hashlib.sha256(str(last_block['proof']).encode()),
+            )
+        return self.template
+
+    def next_target(self, height: int = None) -> int:
+        """
+        height번째(0부터) 블록이 써야 하는 작업 증명 목표값. 블록 헤더의 타임스탬프와 목표값만 씁니다.
+        :param height: 새 블록의 위치 (None이면 우리 체인의 다음 블록)
+        """
+        chain = self.chain
+        if height is None:
+            height = len(chain)
+        last_target = chain[height - 1]['target'] if height else None
+        return self.difficulty.next_target(height, last_target, lambda h: chain[h]['timestamp'])
+
+    def difficulty_info(self):
+        """
+        현재 난이도와 최근 블록 간격, 네트워크 해시 속도 추정치를 반환합니다.
+        :return: 정보 또는 작업 증명을 쓰지 않으면 None
+        """
+        chain = self.chain
+        adjuster = self.difficulty
+        if adjuster is None:
+            return None
+        # 제네시스 블록의 타임스탬프는 노드가 시작한 시각이므로 뺍니다.
+        window = [(block['timestamp'], block['target'])
+                  for block in chain[max(len(chain) - adjuster.retarget_interval - 1, 1):]]
+        next_target = self.next_target()
+        return {
+            'height': len(chain),
+            'target': chain[-1]['target'],
+            'next_target': next_target,
+            'difficulty': relative_difficulty(next_target),
+            'target_block_time': adjuster.target_block_time,
+            'retarget_interval': adjuster.retarget_interval,
+            'blocks_until_retarget': adjuster.blocks_until_retarget(len(chain)),
+            'average_block_time': (window[-1][0] - window[0][0]) / (len(window) - 1) if len(window) > 1 else None,
+            'hash_rate': estimate_hash_rate(window),
+        }
 
     @staticmethod
-    def valid_proof(last_proof: int, proof: int, last_hash: str) -> bool:
+    def valid_proof(last_proof: int, proof: int, last_hash: str, target: int) -> bool:
         """
-        증명이 유효한지 확인합니다: 해시(last_proof, proof, last_hash)가 0으로 시작하는가?
+        증명이 유효한지 확인합니다: 해시(last_proof, proof, last_hash)가 목표값보다 작은가?
         :param last_proof: 이전 증명
         :param proof: 현재 증명
         :param last_hash: 이전 블록의 해시
+        :param target: 블록 헤더의 목표값
         :return: True or False
         """
-        guess = f'{last_proof}{proof}{last_hash}'.encode()
-        guess_hash = hashlib.sha256(guess).hexdigest()
-        return guess_hash[:4] == "0000"
+        return valid_proof(last_proof, proof, last_hash, target)
+
+    def generate_blocks(self, count: int, transactions_per_block: int = 0, reward_address: str = None,
+                        accounts: int = 1000) -> float:
+        """
+        개발/벤치마크용: 임의의 거래를 담은 블록 count개를 바로 만들어 체인에 추가합니다.
+        권한 증명 모드에서는 작업 증명이 없으므로 큰 체인을 빠르게 만들 수 있습니다.
+        거래는 accounts개의 주소 사이에서만 오가므로 상태(잔액) 크기는 블록 수와 관계없이 일정합니다.
+        :return: 걸린 시간(초)
+        """
+        addresses = [uuid4().hex for _ in range(accounts)]
+        rng = random.Random()
+        started = monotonic()
+        for _ in range(count):
+            for _ in range(transactions_per_block):
+                self.new_transaction(rng.choice(addresses), rng.choice(addresses), rng.randint(1, 100))
+            proof = self.consensus.prove(self, self.last_block)
+            if reward_address is not None:
+                self.new_transaction('0', reward_address, 1)
+            self.new_block(proof)
+        return monotonic() - started
 
 
 # --- API 부분 ---
@@ -186,24 +1103,75 @@ node_identifier = str(uuid4()).replace('-', '')
 # Blockchain 클래스 인스턴스화
 blockchain = Blockchain()
 
+# /chain 응답(JSON 및 압축본)을 tip이 바뀔 때까지 캐시
+chain_cache = TipPayloadCache()
+
+# 원격 채굴 작업자들에게 논스 구간을 나눠 주는 코디네이터
+coordinator = MiningCoordinator(blockchain, node_identifier)
+
+# 거래 수신 입장 제어 (Mempool 크기 제한, 클라이언트별 속도 제한)
+admission = AdmissionController()
+
+# 피어들과 Mempool을 맞추는 집합 조정 (주기적 조정은 __main__에서 시작)
+mempool_sync = MempoolSync(blockchain, max_pending=admission.max_pending)
+
+
+def negotiated(payload, status: int = 200):
+    """
+    요청의 Accept 헤더가 바이너리 인코딩을 원하면 wire 형식으로, 아니면 JSON으로 응답합니다.
+    """
+    if wire.accepts(request.headers.get('Accept')):
+        return Response(wire.encode(payload), status=status, content_type=wire.CONTENT_TYPE)
+    return jsonify(payload), status
+
+
+def conditional(tag: str, build):
+    """
+    tag(tip 키 등)로 만든 ETag를 붙여 응답합니다. If-None-Match가 일치하면 build()를 부르지 않고 본문 없이 304를 반환합니다.
+    :param tag: 응답 내용을 식별하는 키
+    :param build: 응답 객체를 만드는 함수
+    """
+    etag = TipPayloadCache.make_etag(tag, wire.accepts(request.headers.get('Accept')))
+    headers = {'ETag': etag, 'Vary': 'Accept'}
+    if_none_match = request.headers.get('If-None-Match')
+    if if_none_match and etag_matches(if_none_match, etag):
+        return Response(status=304, headers=headers)
+    response = make_response(negotiated(build()))
+    response.headers.update(headers)
+    return response
+
+
+def request_values():
+    """
+    요청 본문을 Content-Type에 따라 바이너리 또는 JSON으로 파싱합니다.
+    """
+    if wire.is_wire(request.content_type):
+        try:
+            return wire.decode(request.get_data())
+        except ValueError:
+            return None
+    return request.get_json()
+
 
 @app.route('/mine', methods=['GET'])
 def mine():
-    # 다음 증명을 얻기 위해 작업 증명 알고리즘을 실행합니다.
-    last_block = blockchain.last_block
-    proof = blockchain.proof_of_work(last_block)
-
-    # 채굴에 대한 보상을 받아야 합니다.
-    # 보낸 사람이 "0"인 것은 이 노드가 새 코인을 채굴했다는 것을 의미합니다.
-    blockchain.new_transaction(
-        sender="0",
-        recipient=node_identifier,
-        amount=1,
-    )
+    # 다음 증명을 얻기 위해 합의 방식의 증명(작업 증명 등)을 실행합니다.
+    # 작업 증명을 하는 동안 피어가 릴레이한 블록이 추가되면 새 마지막 블록으로 다시 시도합니다.
+    # 블록은 block_lock 안에서 만들어, 풀 작업자의 해답이나 릴레이된 블록과 동시에 체인에 붙이지 않습니다.
+    while True:
+        if not blockchain.can_mine():
+            return 'Cannot mine a checkpoint block without the chain state', 503
+        last_block = blockchain.last_block
+        try:
+            proof = blockchain.consensus.prove(blockchain, last_block)
+        except ValueError as e:
+            return str(e), 403
+        block = blockchain.forge_block(last_block, proof, node_identifier)
+        if block is not None:
+            break
 
-    # 체인에 새 블록을 추가하여 위조합니다.
-    previous_hash = blockchain.hash(last_block)
-    block = blockchain.new_block(proof, previous_hash)
+    # 피어들에게 새 블록을 압축 블록으로 알립니다.
+    blockchain.relay_block(block)
 
     response = {
         'message': "New Block Forged",
@@ -215,31 +1183,277 @@ def mine():
     return jsonify(response), 200
 
 
+@app.route('/work', methods=['GET'])
+def get_work():
+    if blockchain.difficulty is None:
+        return 'Pool mining needs proof of work', 400
+    if not blockchain.can_mine():
+        return 'Cannot mine a checkpoint block without the chain state', 503
+    job = coordinator.get_work(request.args.get('worker', ''))
+    return jsonify(job), 200
+
+
+@app.route('/work/status', methods=['GET'])
+def work_status():
+    job_id = request.args.get('job_id', '')
+    return jsonify({'current': coordinator.is_current(job_id)}), 200
+
+
+@app.route('/work/submit', methods=['POST'])
+def submit_work():
+    values = request.get_json()
+
+    required = ['job_id', 'proof']
+    if not isinstance(values, dict) or not all(k in values for k in required):
+        return 'Missing values', 400
+    if blockchain.difficulty is None:
+        return 'Pool mining needs proof of work', 400
+
+    # 증명 값은 0 이상의 정수여야 합니다 (숫자 문자열도 받습니다).
+    proof = values['proof']
+    if isinstance(proof, str) and proof.isdigit():
+        proof = int(proof)
+    if not isinstance(proof, int) or isinstance(proof, bool) or proof < 0:
+        return 'Invalid proof', 400
+
+    result, block = coordinator.submit(str(values['job_id']), proof)
+    response = {'result': result}
+    if result == 'accepted':
+        blockchain.relay_block(block)
+    if block is not None:
+        response['index'] = block['index']
+        response['previous_hash'] = block['previous_hash']
+    return jsonify(response), 200 if result == 'accepted' else 409
+
+
+@app.route('/work/stats', methods=['GET'])
+def work_stats():
+    return jsonify(coordinator.stats), 200
+
+
 @app.route('/transactions/new', methods=['POST'])
 def new_transaction():
-    values = request.get_json()
+    # Mempool이 가득 찼거나 클라이언트가 너무 빨리 보내면 429로 거절합니다.
+    admitted, retry_after = admission.admit(request.remote_addr, len(blockchain.current_transactions))
+    if not admitted:
+        return Response('Too many transactions, try again later', status=429,
+                        headers={'Retry-After': str(retry_after)})
+
+    values = request_values()
 
     # 필요한 필드 (sender, recipient, amount)가 POST된 데이터에 있는지 확인합니다.
     required = ['sender', 'recipient', 'amount']
-    if not all(k in values for k in required):
+    if not isinstance(values, dict) or not all(k in values for k in required):
         return 'Missing values', 400
+    # 금액은 0보다 큰 유한한 숫자여야 합니다.
+    if not valid_transaction(values):
+        return 'Invalid sender, recipient or amount', 400
 
-    # 새로운 거래를 생성합니다.
-    index = blockchain.new_transaction(values['sender'], values['recipient'], values['amount'])
+    # 새로운 거래를 생성합니다. 클라이언트가 nonce를 보내면 같은 거래를 다시 보냈을 때 409로 거절합니다.
+    try:
+        index = blockchain.new_transaction(values['sender'], values['recipient'], values['amount'],
+                                           values.get('nonce'))
+    except DuplicateTransaction as e:
+        return str(e), 409
+    admission.record_accepted()
 
     response = {'message': f'Transaction will be added to Block {index}'}
     return jsonify(response), 201
 
 
+@app.route('/transactions/batch', methods=['POST'])
+def new_transactions():
+    # 거래 여러 개를 한 요청으로 받습니다. 입장 제어는 묶음 안의 거래 수만큼 계산합니다.
+    values = request_values()
+    if not blockchain.valid_batch(values):
+        return f'Expected 1 to {MAX_BATCH} transactions with sender, recipient and a positive amount', 400
+
+    count = len(values['transactions'])
+    admitted, retry_after = admission.admit(request.remote_addr, len(blockchain.current_transactions), count)
+    if not admitted:
+        return Response('Too many transactions, try again later', status=429,
+                        headers={'Retry-After': str(retry_after)})
+
+    try:
+        index = blockchain.new_transactions(values['transactions'])
+    except DuplicateTransaction as e:
+        return str(e), 409
+    admission.record_accepted(count)
+
+    response = {'message': f'{count} transactions will be added to Block {index}', 'count': count, 'index': index}
+    return jsonify(response), 201
+
+
+@app.route('/metrics/admission', methods=['GET'])
+def admission_metrics():
+    return jsonify(admission.metrics(len(blockchain.current_transactions))), 200
+
+
 @app.route('/chain', methods=['GET'])
 def full_chain():
+    chain = blockchain.chain
+    status, headers, body = chain_cache.respond(
+        blockchain.tip_key(chain),
+        lambda: {'chain': blockchain.full_blocks(chain), 'length': len(chain)},
+        if_none_match=request.headers.get('If-None-Match'),
+        accept_encoding=request.headers.get('Accept-Encoding'),
+        accept=request.headers.get('Accept'),
+    )
+    return Response(body, status=status, headers=headers)
+
+
+@app.route('/chain/tip', methods=['GET'])
+def chain_tip():
+    chain = blockchain.chain
+    return conditional(blockchain.tip_key(chain), lambda: {
+        'length': len(chain),
+        'hash': blockchain.hash(chain[-1]),
+    })
+
+
+@app.route('/blocks/range', methods=['GET'])
+def block_range():
+    start = max(request.args.get('start', default=0, type=int), 0)
+    count = min(request.args.get('count', default=500, type=int), 2000)
+    chain = blockchain.chain
+    # 응답에 체인 길이가 들어가므로 ETag는 tip과 구간으로 만듭니다.
+    return conditional(f'{blockchain.tip_key(chain)}-{start}-{count}', lambda: {
+        'blocks': blockchain.full_blocks(chain[start:start + count]),
+        'length': len(chain),
+    })
+
+
+@app.route('/headers', methods=['GET'])
+def block_headers():
+    start = request.args.get('start', default=0, type=int)
+    count = request.args.get('count', default=2000, type=int)
     response = {
-        'chain': blockchain.chain,
+        'headers': blockchain.headers(start, min(count, 2000)),
         'length': len(blockchain.chain),
     }
+    return negotiated(response)
+
+
+@app.route('/transactions/proof', methods=['GET'])
+def transaction_proof():
+    block_index = request.args.get('block', type=int)
+    tx_index = request.args.get('tx', type=int)
+    if block_index is None or tx_index is None:
+        return 'Missing values', 400
+
+    proof = blockchain.transaction_proof(block_index, tx_index)
+    if proof is None:
+        return 'Transaction not found', 404
+
+    return negotiated(proof)
+
+
+@app.route('/snapshot', methods=['GET'])
+def state_snapshot():
+    state = blockchain.snapshot(request.args.get('height', type=int))
+    if state is None:
+        return 'Snapshot not found', 404
+    return negotiated(state.to_dict())
+
+
+@app.route('/difficulty', methods=['GET'])
+def difficulty():
+    info = blockchain.difficulty_info()
+    if info is None:
+        return 'This node does not use proof of work', 404
+    return jsonify(info), 200
+
+
+@app.route('/state', methods=['GET'])
+def chain_state():
+    summary = blockchain.state_summary(request.args.get('address'))
+    if summary is None:
+        return 'State is not available', 503
+    return jsonify(summary), 200
+
+
+@app.route('/blocks/compact', methods=['POST'])
+def compact_block():
+    values = request_values()
+    if not isinstance(values, dict) or not all(k in values for k in ('header', 'short_ids', 'prefilled')):
+        return 'Missing values', 400
+
+    try:
+        status, missing = blockchain.receive_compact(values)
+    except (KeyError, TypeError, ValueError):
+        return 'Invalid compact block', 400
+
+    # 피어의 체인이 우리 체인보다 앞서 있으면 합의 알고리즘으로 따라잡습니다.
+    if status == 'orphan':
+        blockchain.relay_executor.submit(blockchain.resolve_conflicts)
+
+    return negotiated({'status': status, 'missing': missing})
+
+
+@app.route('/blocks/compact/transactions', methods=['POST'])
+def compact_block_transactions():
+    values = request_values()
+    if not isinstance(values, dict) or not all(k in values for k in ('hash', 'transactions')):
+        return 'Missing values', 400
+
+    try:
+        status, missing = blockchain.complete_compact(values['hash'], values['transactions'])
+    except (KeyError, TypeError, ValueError):
+        return 'Invalid transactions', 400
+
+    return negotiated({'status': status, 'missing': missing})
+
+
+@app.route('/metrics/relay', methods=['GET'])
+def relay_metrics():
+    return jsonify(blockchain.relay_stats), 200
+
+
+@app.route('/mempool', methods=['GET'])
+def mempool_digest():
+    return jsonify(mempool_sync.mempool_digest()), 200
+
+
+@app.route('/mempool/reconcile', methods=['POST'])
+def mempool_reconcile():
+    try:
+        return negotiated(mempool_sync.answer_reconcile(request_values()))
+    except (KeyError, TypeError, ValueError):
+        return 'Invalid values', 400
+
+
+@app.route('/mempool/fetch', methods=['POST'])
+def mempool_fetch():
+    try:
+        return negotiated(mempool_sync.answer_fetch(request_values()))
+    except (KeyError, TypeError, ValueError):
+        return 'Invalid values', 400
+
+
+@app.route('/mempool/transactions', methods=['POST'])
+def mempool_transactions():
+    try:
+        return negotiated(mempool_sync.receive(request_values()))
+    except (KeyError, TypeError, ValueError):
+        return 'Invalid values', 400
+
+
+@app.route('/mempool/sync', methods=['GET'])
+def mempool_sync_now():
+    # 다음 주기를 기다리지 않고 지금 모든 피어와 Mempool을 맞춥니다.
+    results = mempool_sync.sync_all()
+    response = {
+        'peers': {node: {'received': r[0], 'sent': r[1]} for node, r in results.items()},
+        'stats': mempool_sync.stats,
+    }
     return jsonify(response), 200
 
 
+@app.route('/metrics/mempool-sync', methods=['GET'])
+def mempool_sync_metrics():
+    return jsonify(mempool_sync.stats), 200
+
+
 @app.route('/nodes/register', methods=['POST'])
 def register_nodes():
     values = request.get_json()
@@ -258,6 +1472,14 @@ def register_nodes():
     return jsonify(response), 201
 
 
+@app.route('/nodes/peers', methods=['GET'])
+def peer_table():
+    response = {
+        'peers': blockchain.nodes.to_list(),
+    }
+    return jsonify(response), 200
+
+
 @app.route('/nodes/resolve', methods=['GET'])
 def consensus():
     replaced = blockchain.resolve_conflicts()
@@ -281,7 +1503,64 @@ if __name__ == '__main__':
     from argparse import ArgumentParser
     parser = ArgumentParser()
     parser.add_argument('-p', '--port', default=5000, type=int, help='port to listen on')
+    parser.add_argument('--server', default='flask', choices=['flask', 'async'], help='server mode')
+    parser.add_argument('--prune', type=int, help='keep transaction lists only for the last N blocks')
+    parser.add_argument('--memory-budget', type=float, help='memory budget for block bodies in MB')
+    parser.add_argument('--block-store', help='SQLite file to keep all blocks on disk')
+    parser.add_argument('--max-pending', default=10000, type=int, help='maximum transactions waiting in the mempool')
+    parser.add_argument('--rate-limit', default=50.0, type=float, help='transactions per second allowed per client')
+    parser.add_argument('--mempool-sync', default=5.0, type=float,
+                        help='seconds between mempool reconciliation rounds with peers (0 to disable)')
+    parser.add_argument('--snapshot-dir', help='directory to keep state snapshots in')
+    parser.add_argument('--bootstrap', metavar='PEER', help='start from the latest state snapshot of this peer')
+    parser.add_argument('--block-time', type=float,
+                        help=f'target seconds between blocks (default {TARGET_BLOCK_TIME:g}, same on all nodes)')
+    parser.add_argument('--retarget-interval', type=int,
+                        help=f'blocks between difficulty retargets (default {RETARGET_INTERVAL}, same on all nodes)')
+    parser.add_argument('--consensus', default='pow', choices=['pow', 'poa'],
+                        help='proof of work, or proof of authority for development and benchmarks')
+    parser.add_argument('--authority-keys', help='JSON file of authority keys (see consensus.py)')
+    parser.add_argument('--authority', help='authority name this node signs blocks as')
+    parser.add_argument('--generate', default=0, type=int, metavar='N', help='create N blocks before serving')
+    parser.add_argument('--generate-txs', default=0, type=int, metavar='K',
+                        help='random transactions per generated block')
     args = parser.parse_args()
     port = args.port
 
-    app.run(host='0.0.0.0', port=port)
\ No newline at end of file
+    admission = AdmissionController(max_pending=args.max_pending, rate=args.rate_limit,
+                                    burst=max(int(args.rate_limit * 2), 1))
+
+    if args.prune is not None or args.memory_budget is not None or args.block_store or args.snapshot_dir \
+            or args.block_time or args.retarget_interval or args.consensus != 'pow':
+        blockchain = Blockchain(
+            prune_depth=args.prune,
+            memory_budget=int(args.memory_budget * 1024 * 1024) if args.memory_budget is not None else None,
+            block_store=BlockStore(args.block_store) if args.block_store else None,
+            snapshot_store=SnapshotStore(args.snapshot_dir) if args.snapshot_dir else None,
+            consensus=make_consensus(
+                args.consensus,
+                DifficultyAdjuster(args.block_time or TARGET_BLOCK_TIME, args.retarget_interval or RETARGET_INTERVAL),
+                args.authority_keys,
+                args.authority,
+            ),
+        )
+        coordinator = MiningCoordinator(blockchain, node_identifier)
+
+    if args.generate:
+        elapsed = blockchain.generate_blocks(args.generate, args.generate_txs, node_identifier)
+        print(f"Generated {args.generate} blocks in {elapsed:.2f}s ({args.generate / elapsed:,.0f} blocks/s)")
+
+    if args.bootstrap:
+        blockchain.register_node(args.bootstrap)
+        blockchain.bootstrap(urlparse(args.bootstrap).netloc or args.bootstrap)
+
+    mempool_sync = MempoolSync(blockchain, interval=args.mempool_sync, max_pending=args.max_pending)
+    mempool_sync.start()
+
+    if args.server == 'async':
+        # asyncio 서버 모드 (aiohttp 필요)
+        from async_node import run
+        run(blockchain, node_identifier, port=port, admission=admission, mempool_sync=mempool_sync,
+            coordinator=coordinator)
+    else:
+        app.run(host='0.0.0.0', port=port)
\ No newline at end of file
@@ -0,0 +1,116 @@
+import gzip
+import json
+import threading
+import zlib
+
+import wire
+
+
+# 이보다 작은 응답은 압축해도 이득이 거의 없으므로 그대로 보냅니다.
+MIN_COMPRESS_SIZE = 1024
+
+
+class TipPayloadCache:
+    """
+    체인 응답(JSON 또는 바이너리)과 그 압축본을 체인의 끝(tip)이 바뀔 때까지 캐시합니다.
+    tip 해시는 그 앞의 모든 블록을 커밋하므로, tip이 같으면 응답 본문도 같습니다.
+    """
+
+    def __init__(self, min_compress_size: int = MIN_COMPRESS_SIZE):
+        self.min_compress_size = min_compress_size
+        self.lock = threading.Lock()
+        self.tip_key = None
+        self.bodies = {}
+
+    def get(self, tip_key: str, build, encoding: str = None, binary: bool = False):
+        """
+        tip_key에 해당하는 (etag, 본문)을 반환합니다. 캐시가 비었거나 tip이 바뀌었으면 build()로 다시 만듭니다.
+        :param tip_key: tip 블록의 해시와 체인 길이로 만든 키
+        :param build: 응답 객체(dict/list)를 만드는 함수
+        :param encoding: 'gzip', 'deflate' 또는 None(압축 안 함)
+        :param binary: True면 JSON 대신 바이너리 인코딩(wire)으로 만듭니다
+        """
+        with self.lock:
+            if tip_key != self.tip_key:
+                self.tip_key = tip_key
+                self.bodies = {}
+
+            body = self.bodies.get((binary, encoding))
+            if body is None:
+                raw = self.bodies.get((binary, None))
+                if raw is None:
+                    raw = wire.encode(build()) if binary else json.dumps(build()).encode()
+                    self.bodies[binary, None] = raw
+                if encoding is None:
+                    body = raw
+                elif encoding == 'gzip':
+                    body = gzip.compress(raw, compresslevel=6)
+                else:
+                    body = zlib.compress(raw, 6)
+                self.bodies[binary, encoding] = body
+
+            return self.make_etag(tip_key, binary), body
+
+    @staticmethod
+    def make_etag(tip_key: str, binary: bool = False) -> str:
+        # 같은 체인이라도 표현(JSON/바이너리)이 다르면 다른 ETag를 씁니다.
+        return f'W/"{tip_key}.wire"' if binary else f'W/"{tip_key}"'
+
+    def respond(self, tip_key: str, build, if_none_match: str = None, accept_encoding: str = None,
+                accept: str = None):
+        """
+        조건부 GET, 압축, 표현(JSON/바이너리) 협상을 처리한 (상태 코드, 헤더, 본문)을 반환합니다.
+        피어가 이미 같은 체인을 가지고 있으면(If-None-Match 일치) 본문 없이 304를 반환합니다.
+        """
+        binary = wire.accepts(accept)
+        etag = self.make_etag(tip_key, binary)
+        headers = {'ETag': etag, 'Vary': 'Accept, Accept-Encoding'}
+
+        if if_none_match and etag_matches(if_none_match, etag):
+            return 304, headers, b''
+
+        # 압축 여부는 원본 크기를 보고 결정합니다.
+        etag, raw = self.get(tip_key, build, binary=binary)
+        encoding = choose_encoding(accept_encoding) if len(raw) >= self.min_compress_size else None
+        if encoding:
+            etag, body = self.get(tip_key, build, encoding, binary=binary)
+            headers['Content-Encoding'] = encoding
+        else:
+            body = raw
+
+        headers['Content-Type'] = wire.CONTENT_TYPE if binary else 'application/json'
+        return 200, headers, body
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """
+    If-None-Match 헤더에 etag가 포함되어 있는지 약한 비교(weak comparison)로 확인합니다.
+    """
+    if if_none_match.strip() == '*':
+        return True
+    opaque = etag[2:] if etag.startswith('W/') else etag
+    for candidate in if_none_match.split(','):
+        candidate = candidate.strip()
+        if candidate.startswith('W/'):
+            candidate = candidate[2:]
+        if candidate == opaque:
+            return True
+    return False
+
+
+def choose_encoding(accept_encoding: str):
+    """
+    Accept-Encoding 헤더에서 gzip, deflate 순으로 지원하는 인코딩을 고릅니다.
+    """
+    if not accept_encoding:
+        return None
+    accepted = set()
+    for token in accept_encoding.split(','):
+        name, _, params = token.strip().partition(';')
+        if params.replace(' ', '') in ('q=0', 'q=0.0'):
+            continue
+        accepted.add(name.strip().lower())
+    for encoding in ('gzip', 'deflate'):
+        if encoding in accepted:
+            return encoding
+    return None
@@ -0,0 +1,486 @@
+import asyncio
+import codecs
+import json
+import random
+import re
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+
+import requests
+from aiohttp import ClientError, ClientSession, ClientTimeout, TCPConnector
+from requests.adapters import HTTPAdapter
+
+import wire
+
+
+# 잠시 뒤 다시 보내면 성공할 수 있는 응답 (입장 제어 거절, 게이트웨이/과부하 오류)
+RETRY_STATUS = {429, 502, 503, 504}
+
+# 묶음 하나에 넣는 거래 수 (노드의 MAX_BATCH 이하)
+BATCH_SIZE = 500
+# 묶음이 다 차지 않아도 첫 거래가 들어온 뒤 이 시간(초)이 지나면 보냅니다.
+LINGER = 0.01
+
+
+class NodeError(Exception):
+    """
+    노드가 오류로 응답했거나 재시도 끝에 연결하지 못했을 때 일어납니다.
+    :ivar status: HTTP 상태 코드 (연결 실패면 None)
+    """
+
+    def __init__(self, status, message: str):
+        super().__init__(f'{status}: {message}' if status is not None else message)
+        self.status = status
+
+
+class RetryPolicy:
+    """
+    지수 백오프 재시도. attempt번째 재시도 전에 backoff * 2**attempt초(최대 max_backoff초)를 기다리며,
+    여러 클라이언트가 같은 순간에 다시 몰리지 않도록 대기 시간을 jitter 비율만큼 무작위로 줄입니다.
+    노드가 Retry-After를 주면 그 시간 이상 (마찬가지로 무작위로 늘려) 기다립니다.
+    """
+
+    def __init__(self, retries: int = 5, backoff: float = 0.1, max_backoff: float = 5.0, jitter: float = 0.5):
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+
+    def delay(self, attempt: int, retry_after: str = None) -> float:
+        if retry_after:
+            try:
+                return float(retry_after) * (1 + self.jitter * random.random())
+            except ValueError:
+                pass
+        delay = min(self.max_backoff, self.backoff * 2 ** attempt)
+        return delay * (1 - self.jitter * random.random())
+
+
+class JsonArrayReader:
+    """
+    JSON 객체 본문을 조각으로 받으면서 key 배열의 원소를 하나씩 꺼냅니다.
+    /chain 응답 전체를 메모리에 올려 파싱하지 않고, 블록을 받는 대로 처리할 수 있습니다.
+    """
+
+    def __init__(self, key: str):
+        self.start = re.compile(r'"%s"\s*:\s*\[' % re.escape(key))
+        self.key = key
+        self.decoder = json.JSONDecoder()
+        self.text = codecs.getincrementaldecoder('utf-8')()
+        self.buffer = ''
+        self.started = False
+        self.finished = False
+
+    def feed(self, data: bytes) -> list:
+        """
+        :return: 이번 조각까지 받아서 완성된 배열 원소들
+        """
+        if self.finished:
+            return []
+        self.buffer += self.text.decode(data)
+        if not self.started:
+            match = self.start.search(self.buffer)
+            if match is None:
+                return []
+            self.buffer = self.buffer[match.end():]
+            self.started = True
+
+        values = []
+        buffer = self.buffer
+        pos = 0
+        while True:
+            while pos < len(buffer) and buffer[pos] in ' \t\r\n,':
+                pos += 1
+            if pos == len(buffer):
+                break
+            if buffer[pos] == ']':
+                self.finished = True
+                break
+            try:
+                value, pos_after = self.decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                # 원소가 다음 조각까지 이어집니다.
+                break
+            values.append(value)
+            pos = pos_after
+        self.buffer = buffer[pos:]
+        return values
+
+    def close(self):
+        if not self.finished:
+            raise ValueError(f'Response ended before the end of the "{self.key}" array')
+
+
+class NodeClient:
+    """
+    blockchain.py 노드 API의 동기 클라이언트.
+     - keep-alive 커넥션 풀(pool_size개)을 재사용합니다.
+     - submit()으로 넣은 거래는 batch_size개씩(또는 linger초마다) 묶어 /transactions/batch로 보내고,
+       묶음 여러 개를 pool_size개의 스레드로 동시에(파이프라인으로) 보냅니다.
+     - 연결 실패와 RETRY_STATUS 응답은 RetryPolicy에 따라 다시 보냅니다.
+       응답만 잃어버린 요청을 다시 보내면 같은 거래가 두 번 들어갈 수 있습니다.
+     - iter_chain()은 /chain을 스트리밍으로 읽어 블록을 하나씩 돌려줍니다.
+    """
+
+    def __init__(self, base_url: str = 'http://127.0.0.1:5000', timeout: float = 10.0, pool_size: int = 8,
+                 batch_size: int = BATCH_SIZE, linger: float = LINGER, retry: RetryPolicy = None,
+                 binary: bool = False):
+        """
+        :param binary: True이면 요청과 응답을 바이너리 wire 형식으로 주고받습니다.
+        """
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.batch_size = batch_size
+        self.linger = linger
+        self.retry = retry or RetryPolicy()
+        self.binary = binary
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.executor = ThreadPoolExecutor(max_workers=pool_size)
+
+        self.lock = threading.Lock()
+        self.pending = []
+        self.timer = None
+        self.in_flight = set()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # --- 요청 ---
+
+    def request(self, method: str, path: str, payload=None, **kwargs) -> requests.Response:
+        """
+        요청을 보내고, 실패하면 재시도합니다.
+        :raise NodeError: 오류 응답을 받았거나 재시도 끝에 연결하지 못했을 때
+        """
+        headers = kwargs.pop('headers', {})
+        if payload is not None:
+            if self.binary:
+                kwargs['data'] = wire.encode(payload)
+                headers['Content-Type'] = wire.CONTENT_TYPE
+            else:
+                kwargs['json'] = payload
+        if self.binary:
+            headers.setdefault('Accept', wire.ACCEPT)
+
+        attempt = 0
+        while True:
+            try:
+                response = self.session.request(method, self.base_url + path, headers=headers,
+                                                timeout=self.timeout, **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                if attempt >= self.retry.retries:
+                    raise NodeError(None, f'Could not reach {self.base_url}: {e}')
+                time.sleep(self.retry.delay(attempt))
+            else:
+                if response.status_code < 400:
+                    return response
+                # 본문을 읽어야 연결이 풀로 돌아갑니다.
+                message = response.text
+                if response.status_code not in RETRY_STATUS or attempt >= self.retry.retries:
+                    raise NodeError(response.status_code, message)
+                time.sleep(self.retry.delay(attempt, response.headers.get('Retry-After')))
+            attempt += 1
+
+    def get(self, path: str, **kwargs):
+        return wire.parse_response(self.request('GET', path, **kwargs))
+
+    def post(self, path: str, payload):
+        return wire.parse_response(self.request('POST', path, payload))
+
+    # --- 읽기 ---
+
+    def tip(self) -> dict:
+        return self.get('/chain/tip')
+
+    def chain(self) -> dict:
+        return self.get('/chain')
+
+    def mempool(self) -> dict:
+        return self.get('/mempool')
+
+    def iter_chain(self, chunk_size: int = 1 << 16):
+        """
+        /chain 응답을 스트리밍으로 읽어 블록을 하나씩 돌려줍니다.
+        """
+        response = self.request('GET', '/chain', stream=True, headers={'Accept': 'application/json'})
+        reader = JsonArrayReader('chain')
+        with response:
+            for data in response.iter_content(chunk_size):
+                yield from reader.feed(data)
+                if reader.finished:
+                    return
+        reader.close()
+
+    def mine(self) -> dict:
+        return self.get('/mine')
+
+    # --- 거래 제출 ---
+
+    def send_transaction(self, sender: str, recipient: str, amount) -> dict:
+        """
+        거래 하나를 바로 보냅니다 (묶지 않음).
+        """
+        return self.post('/transactions/new', {'sender': sender, 'recipient': recipient, 'amount': amount})
+
+    def send_batch(self, transactions: list) -> int:
+        """
+        거래 묶음 하나(batch_size개 이하)를 한 요청으로 보냅니다.
+        :return: 거래들이 추가될 블록의 인덱스
+        """
+        return self.post('/transactions/batch', {'transactions': transactions})['index']
+
+    def send_transactions(self, transactions: list) -> int:
+        """
+        거래 목록을 batch_size개씩 나누어 동시에 보내고, 모두 받아질 때까지 기다립니다.
+        :return: 보낸 거래 수
+        """
+        batches = [transactions[i:i + self.batch_size] for i in range(0, len(transactions), self.batch_size)]
+        for _ in self.executor.map(self.send_batch, batches):
+            pass
+        return len(transactions)
+
+    def submit(self, sender: str, recipient: str, amount) -> Future:
+        """
+        거래를 다음 묶음에 넣습니다. 묶음은 batch_size개가 차거나 linger초가 지나면 보냅니다.
+        :return: 거래가 추가될 블록의 인덱스로 완료되는 Future (실패하면 NodeError)
+        """
+        future = Future()
+        with self.lock:
+            self.pending.append(({'sender': sender, 'recipient': recipient, 'amount': amount}, future))
+            if len(self.pending) >= self.batch_size:
+                self._send_pending()
+            elif self.timer is None:
+                self.timer = threading.Timer(self.linger, self._linger_expired)
+                self.timer.daemon = True
+                self.timer.start()
+        return future
+
+    def _linger_expired(self):
+        with self.lock:
+            self.timer = None
+            self._send_pending()
+
+    def _send_pending(self):
+        # self.lock을 잡은 상태에서 호출합니다.
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        if not self.pending:
+            return
+        batch, self.pending = self.pending, []
+        task = self.executor.submit(self._deliver, batch)
+        self.in_flight.add(task)
+        task.add_done_callback(self.in_flight.discard)
+
+    def _deliver(self, batch: list):
+        try:
+            index = self.send_batch([tx for tx, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+        else:
+            for _, future in batch:
+                future.set_result(index)
+
+    def flush(self):
+        """
+        쌓여 있는 거래를 보내고, 보내는 중인 묶음이 모두 끝날 때까지 기다립니다.
+        """
+        with self.lock:
+            self._send_pending()
+            tasks = list(self.in_flight)
+        wait(tasks)
+
+    def close(self):
+        self.flush()
+        self.executor.shutdown()
+        self.session.close()
+
+
+class AsyncNodeClient:
+    """
+    NodeClient의 asyncio(aiohttp) 버전. 같은 메서드를 코루틴으로 제공합니다.
+    묶음은 이벤트 루프에서 보내며, 동시에 보내는 묶음 수는 pool_size개로 제한합니다.
+    """
+
+    def __init__(self, base_url: str = 'http://127.0.0.1:5000', timeout: float = 10.0, pool_size: int = 8,
+                 batch_size: int = BATCH_SIZE, linger: float = LINGER, retry: RetryPolicy = None,
+                 binary: bool = False):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self.batch_size = batch_size
+        self.linger = linger
+        self.retry = retry or RetryPolicy()
+        self.binary = binary
+
+        self.session = None
+        self.slots = None
+        self.pending = []
+        self.timer = None
+        self.in_flight = set()
+
+    async def __aenter__(self):
+        await self.open()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def open(self):
+        # aiohttp는 이벤트 루프 안에서 세션을 만들어야 합니다.
+        if self.session is None:
+            self.session = ClientSession(timeout=ClientTimeout(total=self.timeout),
+                                         connector=TCPConnector(limit=self.pool_size))
+            self.slots = asyncio.Semaphore(self.pool_size)
+
+    # --- 요청 ---
+
+    async def request(self, method: str, path: str, payload=None, headers: dict = None):
+        """
+        요청을 보내고, 실패하면 재시도합니다. 본문을 읽지 않은 응답을 돌려주므로 호출하는 쪽에서 release()해야 합니다.
+        :raise NodeError: 오류 응답을 받았거나 재시도 끝에 연결하지 못했을 때
+        """
+        await self.open()
+        headers = dict(headers or {})
+        kwargs = {}
+        if payload is not None:
+            if self.binary:
+                kwargs['data'] = wire.encode(payload)
+                headers['Content-Type'] = wire.CONTENT_TYPE
+            else:
+                kwargs['json'] = payload
+        if self.binary:
+            headers.setdefault('Accept', wire.ACCEPT)
+
+        attempt = 0
+        while True:
+            try:
+                response = await self.session.request(method, self.base_url + path, headers=headers, **kwargs)
+            except (ClientError, asyncio.TimeoutError) as e:
+                if attempt >= self.retry.retries:
+                    raise NodeError(None, f'Could not reach {self.base_url}: {e}')
+                await asyncio.sleep(self.retry.delay(attempt))
+            else:
+                if response.status < 400:
+                    return response
+                text = await response.text()
+                if response.status not in RETRY_STATUS or attempt >= self.retry.retries:
+                    raise NodeError(response.status, text)
+                await asyncio.sleep(self.retry.delay(attempt, response.headers.get('Retry-After')))
+            attempt += 1
+
+    async def _values(self, method: str, path: str, payload=None):
+        response = await self.request(method, path, payload)
+        async with response:
+            if wire.is_wire(response.headers.get('Content-Type')):
+                return wire.decode(await response.read())
+            return await response.json()
+
+    async def get(self, path: str):
+        return await self._values('GET', path)
+
+    async def post(self, path: str, payload):
+        return await self._values('POST', path, payload)
+
+    # --- 읽기 ---
+
+    async def tip(self) -> dict:
+        return await self.get('/chain/tip')
+
+    async def chain(self) -> dict:
+        return await self.get('/chain')
+
+    async def mempool(self) -> dict:
+        return await self.get('/mempool')
+
+    async def iter_chain(self, chunk_size: int = 1 << 16):
+        """
+        /chain 응답을 스트리밍으로 읽어 블록을 하나씩 돌려줍니다 (async for).
+        """
+        response = await self.request('GET', '/chain', headers={'Accept': 'application/json'})
+        reader = JsonArrayReader('chain')
+        async with response:
+            async for data in response.content.iter_chunked(chunk_size):
+                for block in reader.feed(data):
+                    yield block
+                if reader.finished:
+                    return
+        reader.close()
+
+    async def mine(self) -> dict:
+        return await self.get('/mine')
+
+    # --- 거래 제출 ---
+
+    async def send_transaction(self, sender: str, recipient: str, amount) -> dict:
+        return await self.post('/transactions/new', {'sender': sender, 'recipient': recipient, 'amount': amount})
+
+    async def send_batch(self, transactions: list) -> int:
+        await self.open()
+        async with self.slots:
+            return (await self.post('/transactions/batch', {'transactions': transactions}))['index']
+
+    async def send_transactions(self, transactions: list) -> int:
+        batches = [transactions[i:i + self.batch_size] for i in range(0, len(transactions), self.batch_size)]
+        await asyncio.gather(*(self.send_batch(batch) for batch in batches))
+        return len(transactions)
+
+    def submit(self, sender: str, recipient: str, amount) -> asyncio.Future:
+        """
+        거래를 다음 묶음에 넣습니다 (이벤트 루프 안에서 호출). 묶음은 batch_size개가 차거나 linger초가 지나면 보냅니다.
+        :return: 거래가 추가될 블록의 인덱스로 완료되는 Future
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self.pending.append(({'sender': sender, 'recipient': recipient, 'amount': amount}, future))
+        if len(self.pending) >= self.batch_size:
+            self._send_pending()
+        elif self.timer is None:
+            self.timer = loop.call_later(self.linger, self._send_pending)
+        return future
+
+    def _send_pending(self):
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        if not self.pending:
+            return
+        batch, self.pending = self.pending, []
+        task = asyncio.ensure_future(self._deliver(batch))
+        self.in_flight.add(task)
+        task.add_done_callback(self.in_flight.discard)
+
+    async def _deliver(self, batch: list):
+        try:
+            index = await self.send_batch([tx for tx, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+        else:
+            for _, future in batch:
+                if not future.done():
+                    future.set_result(index)
+
+    async def flush(self):
+        """
+        쌓여 있는 거래를 보내고, 보내는 중인 묶음이 모두 끝날 때까지 기다립니다.
+        """
+        self._send_pending()
+        if self.in_flight:
+            await asyncio.wait(list(self.in_flight))
+
+    async def close(self):
+        await self.flush()
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
@@ -0,0 +1,106 @@
+import hashlib
+
+from merkle import tx_hash
+
+
+# 짧은 거래 ID의 길이(바이트). 블록마다 다른 salt를 쓰므로 48비트면 충돌이 사실상 없습니다.
+SHORT_ID_BYTES = 6
+
+# 완성되지 않은 블록을 최대 몇 개까지 들고 있을지
+MAX_PARTIAL_BLOCKS = 16
+
+
+def short_id(salt: str, transaction_hash: str) -> str:
+    """
+    블록별 salt와 거래 해시로 짧은 거래 ID를 만듭니다.
+    salt가 블록마다 달라서, 일부러 충돌하는 거래를 만들어 릴레이를 방해하기 어렵습니다.
+    :param salt: 블록마다 다른 값 (블록 헤더의 해시 등)
+    :param transaction_hash: merkle.tx_hash()로 만든 거래 해시
+    :return: SHORT_ID_BYTES 바이트의 16진수 문자열
+    """
+    return hashlib.sha256((salt + transaction_hash).encode()).hexdigest()[:SHORT_ID_BYTES * 2]
+
+
+def make_compact(header: dict, transactions: list, salt: str, prefill: tuple = ()) -> dict:
+    """
+    블록을 헤더 + 짧은 거래 ID 목록으로 줄인 압축 블록(compact block)을 만듭니다.
+    받는 쪽이 가지고 있을 수 없는 거래(채굴 보상 등)는 prefill로 지정하여 그대로 넣어 보냅니다.
+    :param header: 블록 헤더
+    :param transactions: 블록의 거래 목록
+    :param salt: short_id()에 쓸 salt
+    :param prefill: 그대로 보낼 거래의 위치들 (음수 가능)
+    :return: {'header', 'short_ids', 'prefilled': [[위치, 거래], ...]}
+             short_ids는 짧은 ID들을 이어 붙인 16진수 문자열입니다 (바이너리 인코딩에서 거래당 SHORT_ID_BYTES 바이트).
+    """
+    prefilled = sorted({i % len(transactions) for i in prefill}) if transactions else []
+    prefilled_set = set(prefilled)
+    return {
+        'header': header,
+        'short_ids': ''.join(short_id(salt, tx_hash(tx)) for i, tx in enumerate(transactions) if i not in prefilled_set),
+        'prefilled': [[i, transactions[i]] for i in prefilled],
+    }
+
+
+class PartialBlock:
+    """
+    압축 블록을 받아 우리 Mempool의 거래로 거래 목록을 복원합니다.
+    Mempool에 없는 거래의 위치는 missing에 남으며, 보낸 피어에게 요청해 fill()로 채웁니다.
+    """
+
+    def __init__(self, compact: dict, salt: str, mempool: list, mempool_hashes: list = None):
+        self.header = compact['header']
+        self.salt = salt
+        prefilled = {i: tx for i, tx in compact['prefilled']}
+        width = SHORT_ID_BYTES * 2
+        packed = compact['short_ids']
+        if len(packed) % width:
+            raise ValueError('Malformed short transaction ids')
+        short_ids = iter([packed[i:i + width] for i in range(0, len(packed), width)])
+        size = len(packed) // width + len(prefilled)
+        if any(not 0 <= i < size for i in prefilled):
+            raise ValueError('Prefilled transaction index out of range')
+
+        if mempool_hashes is None:
+            mempool_hashes = [tx_hash(tx) for tx in mempool]
+        by_short_id = {short_id(salt, h): tx for tx, h in zip(mempool, mempool_hashes)}
+
+        self.transactions = [None] * size
+        self.from_mempool = []
+        for i in range(size):
+            if i in prefilled:
+                self.transactions[i] = prefilled[i]
+                continue
+            tx = by_short_id.get(next(short_ids))
+            if tx is not None:
+                self.transactions[i] = tx
+                self.from_mempool.append(i)
+
+        self.missing = [i for i, tx in enumerate(self.transactions) if tx is None]
+
+    @property
+    def complete(self) -> bool:
+        return not self.missing
+
+    def fill(self, transactions: list):
+        """
+        피어에게 받은 거래들로 빈 자리를 채웁니다.
+        :param transactions: [[위치, 거래], ...]
+        """
+        missing = set(self.missing)
+        for i, tx in transactions:
+            if i in missing:
+                self.transactions[i] = tx
+        self.missing = [i for i, tx in enumerate(self.transactions) if tx is None]
+
+    def distrust_mempool(self):
+        """
+        복원한 블록이 검증에 실패하면 (짧은 ID 충돌 등) Mempool에서 가져온 거래도 모두 다시 요청합니다.
+        :return: 새로 요청할 위치가 있으면 True
+        """
+        if not self.from_mempool:
+            return False
+        for i in self.from_mempool:
+            self.transactions[i] = None
+        self.from_mempool = []
+        self.missing = [i for i, tx in enumerate(self.transactions) if tx is None]
+        return True
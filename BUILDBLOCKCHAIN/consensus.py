@@ -0,0 +1,143 @@
+import hashlib
+import hmac
+import json
+import secrets
+
+from difficulty import DifficultyAdjuster, meets_target
+
+
+def valid_proof(last_proof: int, proof: int, last_hash: str, target: int) -> bool:
+    """
+    작업 증명이 유효한지 확인합니다: 해시(last_proof, proof, last_hash)가 목표값보다 작은가?
+    """
+    guess = f'{last_proof}{proof}{last_hash}'.encode()
+    return meets_target(hashlib.sha256(guess).hexdigest(), target)
+
+
+class ProofOfWork:
+    """
+    작업 증명 합의. 블록 헤더의 목표값(target)은 난이도 재조정 규칙으로 정하고,
+    증명 값(proof)은 해시(이전 증명, 증명, 이전 해시)가 목표값보다 작아야 합니다.
+
+    합의 방식은 모두 같은 메서드를 가집니다:
+     - prove(blockchain, last_block): 다음 블록을 만들 증명 값을 구합니다
+     - seal(blockchain, block): new_block이 만든 블록 헤더에 합의 필드를 채웁니다
+     - valid_seal(last_block, last_hash, block, timestamp_at): valid_chain과 블록 릴레이에서 블록을 검증합니다
+     - lookback: 블록 하나를 검증하는 데 필요한 앞 블록 수
+    """
+
+    name = 'pow'
+
+    def __init__(self, difficulty: DifficultyAdjuster = None):
+        self.difficulty = difficulty or DifficultyAdjuster()
+        self.lookback = self.difficulty.retarget_interval + 1
+
+    def prove(self, blockchain, last_block: dict) -> int:
+        return blockchain.proof_of_work(last_block)
+
+    def seal(self, blockchain, block: dict):
+        block['target'] = blockchain.next_target()
+
+    def valid_seal(self, last_block: dict, last_hash: str, block: dict, timestamp_at) -> bool:
+        """
+        :param timestamp_at: 위치(0부터)를 받아 그 블록의 타임스탬프를 돌려주는 함수.
+                             그 블록이 없으면 LookupError를 일으킵니다.
+        """
+        target = block.get('target')
+        try:
+            if target != self.difficulty.next_target(block['index'] - 1, last_block['target'], timestamp_at):
+                return False
+        except LookupError:
+            # 재조정에 필요한 앞 블록이 없으면 (이미 검증한 체인 앞부분) 목표값은 확인하지 않습니다.
+            pass
+        return isinstance(target, int) and valid_proof(last_block['proof'], block['proof'], last_hash, target)
+
+
+class ProofOfAuthority:
+    """
+    권한 증명 합의 (개발/벤치마크용). 작업 증명 없이, 설정된 권한자(authority)의 키로 서명한 블록만 받습니다.
+    서명은 HMAC-SHA256이므로 키를 가진 노드는 모두 서명할 수 있습니다. 서로 믿는 노드끼리의 테스트 네트워크에서만 씁니다.
+    """
+
+    name = 'poa'
+    lookback = 0
+
+    def __init__(self, authorities: dict, signer: str = None):
+        """
+        :param authorities: {권한자 이름: 16진수 키}
+        :param signer: 이 노드가 서명할 때 쓰는 권한자 이름 (None이면 검증만 합니다)
+        """
+        if not authorities:
+            raise ValueError('Proof of authority needs at least one authority key')
+        if signer is not None and signer not in authorities:
+            raise ValueError(f'Unknown authority {signer}')
+        self.keys = {name: bytes.fromhex(key) for name, key in authorities.items()}
+        self.signer = signer
+
+    @staticmethod
+    def message(block: dict) -> bytes:
+        # 서명을 뺀 블록 헤더. 거래 목록은 머클 루트로 커밋됩니다.
+        header = {k: v for k, v in block.items() if k not in ('transactions', 'signature')}
+        return json.dumps(header, sort_keys=True).encode()
+
+    def sign(self, authority: str, message: bytes) -> str:
+        return hmac.new(self.keys[authority], message, hashlib.sha256).hexdigest()
+
+    def verify(self, authority: str, message: bytes, signature) -> bool:
+        if authority not in self.keys or not isinstance(signature, str):
+            return False
+        return hmac.compare_digest(self.sign(authority, message), signature)
+
+    def prove(self, blockchain, last_block: dict) -> int:
+        if self.signer is None:
+            raise ValueError('This node is not an authority')
+        return 0
+
+    def seal(self, blockchain, block: dict):
+        # 검증만 하는 노드의 제네시스 블록은 서명하지 않습니다 (제네시스 블록은 검증하지 않습니다).
+        if self.signer is None:
+            return
+        block['authority'] = self.signer
+        block['signature'] = self.sign(self.signer, self.message(block))
+
+    def valid_seal(self, last_block: dict, last_hash: str, block: dict, timestamp_at) -> bool:
+        return self.verify(block.get('authority'), self.message(block), block.get('signature'))
+
+
+def load_authorities(path: str) -> dict:
+    """
+    권한자 키 파일(JSON: {이름: 16진수 키})을 읽습니다.
+    """
+    with open(path) as f:
+        authorities = json.load(f)
+    if not isinstance(authorities, dict) or not all(isinstance(k, str) for k in authorities.values()):
+        raise ValueError(f'Malformed authority key file {path}')
+    return authorities
+
+
+def make_consensus(kind: str = 'pow', difficulty: DifficultyAdjuster = None, authority_keys: str = None,
+                   authority: str = None):
+    """
+    명령행 옵션으로 합의 방식을 만듭니다.
+    :param kind: 'pow' 또는 'poa'
+    :param authority_keys: PoA 권한자 키 파일
+    :param authority: 이 노드가 서명할 권한자 이름
+    """
+    if kind == 'poa':
+        if not authority_keys:
+            raise ValueError('--authority-keys is required for proof of authority')
+        return ProofOfAuthority(load_authorities(authority_keys), authority)
+    return ProofOfWork(difficulty)
+
+
+if __name__ == '__main__':
+
+    from argparse import ArgumentParser
+    parser = ArgumentParser(description='Generate an authority key file for proof-of-authority mode')
+    parser.add_argument('names', nargs='+', help='authority names')
+    parser.add_argument('-o', '--out', default='authorities.json', help='file to write')
+    args = parser.parse_args()
+
+    with open(args.out, 'w') as f:
+        json.dump({name: secrets.token_hex(32) for name in args.names}, f, indent=2)
+    print(f"Wrote {len(args.names)} authority keys to {args.out}")
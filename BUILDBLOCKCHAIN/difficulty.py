@@ -0,0 +1,156 @@
+# 작업 증명의 목표값(target): 해시를 256비트 정수로 보았을 때 target보다 작아야 합니다.
+# 앞자리 0의 개수(16배 단위) 대신 정수로 표현하므로 난이도를 잘게 조정할 수 있습니다.
+HASH_SPACE = 1 << 256
+# 기존 규칙(16진수 해시의 앞자리가 0이 4개)과 같은 난이도
+INITIAL_TARGET = 1 << 240
+# 가장 쉬운 목표값 (앞자리 0이 2개). 채굴이 드물어도 난이도가 이보다 낮아지지는 않습니다.
+MAX_TARGET = 1 << 248
+
+# 목표 블록 간격(초)과 재조정 주기(블록 수)
+TARGET_BLOCK_TIME = 10.0
+RETARGET_INTERVAL = 10
+# 한 번의 재조정에서 목표값이 바뀔 수 있는 최대 배수 (타임스탬프 조작 방지)
+MAX_ADJUSTMENT = 4
+
+
+def meets_target(hash_hex: str, target: int) -> bool:
+    """
+    16진수 해시가 목표값보다 작은지 확인합니다.
+    """
+    return int(hash_hex, 16) < target
+
+
+def target_bytes(target: int) -> bytes:
+    """
+    목표값을 32바이트 빅엔디언으로 바꿉니다. 길이가 같은 bytes 비교는 정수 비교와 같으므로,
+    채굴 루프에서 hexdigest()와 int() 변환 없이 digest() < target_bytes(target)로 비교할 수 있습니다.
+    """
+    return min(target, HASH_SPACE - 1).to_bytes(32, 'big')
+
+
+def expected_hashes(target: int) -> float:
+    """
+    목표값을 만족하는 해시 하나를 찾는 데 필요한 평균 해시 횟수.
+    """
+    return HASH_SPACE / target
+
+
+def relative_difficulty(target: int) -> float:
+    """
+    초기 난이도(앞자리 0이 4개) 대비 난이도. 2.0이면 블록 하나에 평균 두 배의 해시가 필요합니다.
+    """
+    return INITIAL_TARGET / target
+
+
+def estimate_hash_rate(blocks: list) -> float:
+    """
+    최근 블록들의 목표값과 타임스탬프로 네트워크 해시 속도를 추정합니다.
+    :param blocks: (타임스탬프(초), 목표값) 목록, 오래된 것부터
+    :return: 초당 해시 수 (추정할 수 없으면 0.0)
+    """
+    if len(blocks) < 2:
+        return 0.0
+    elapsed = blocks[-1][0] - blocks[0][0]
+    if elapsed <= 0:
+        return 0.0
+    # 첫 블록은 구간의 시작점이므로 그 블록을 찾는 데 든 작업은 세지 않습니다.
+    return sum(expected_hashes(target) for _, target in blocks[1:]) / elapsed
+
+
+class DifficultyAdjuster:
+    """
+    블록 타임스탬프를 보고 retarget_interval 블록마다 목표값을 다시 정합니다.
+    직전 retarget_interval개 블록이 걸린 시간이 목표보다 짧으면 목표값을 줄이고(어렵게), 길면 늘립니다(쉽게).
+    재조정 높이가 아닌 블록은 직전 블록과 같은 목표값을 써야 합니다. 모든 노드가 같은 설정을 써야 하는 합의 규칙입니다.
+    """
+
+    def __init__(self, target_block_time: float = TARGET_BLOCK_TIME, retarget_interval: int = RETARGET_INTERVAL,
+                 initial_target: int = INITIAL_TARGET, max_target: int = MAX_TARGET):
+        self.target_block_time = target_block_time
+        self.retarget_interval = retarget_interval
+        self.initial_target = initial_target
+        self.max_target = max_target
+
+    def is_retarget_height(self, height: int) -> bool:
+        """
+        :param height: 새 블록 앞에 있는 블록 수 (0부터 센 새 블록의 위치)
+        """
+        # 제네시스 블록의 타임스탬프는 노드가 시작한 시각이므로, 첫 주기는 건너뛰고 두 번째 주기부터 잽니다.
+        return height >= 2 * self.retarget_interval and height % self.retarget_interval == 0
+
+    def retarget(self, target: int, elapsed: float) -> int:
+        """
+        retarget_interval개 블록이 elapsed초 걸렸을 때의 새 목표값.
+        """
+        expected = self.retarget_interval * self.target_block_time
+        # 한 번에 MAX_ADJUSTMENT배 넘게 바뀌지 않도록 자릅니다.
+        elapsed = min(max(elapsed, expected / MAX_ADJUSTMENT), expected * MAX_ADJUSTMENT)
+        new_target = target * int(elapsed * 1000) // int(expected * 1000)
+        return max(1, min(new_target, self.max_target))
+
+    def next_target(self, height: int, last_target: int, timestamp_at) -> int:
+        """
+        height번째(0부터) 블록이 써야 하는 목표값.
+        :param height: 새 블록의 위치 (= 그 앞의 블록 수)
+        :param last_target: 직전 블록의 목표값 (height가 0이면 쓰지 않음)
+        :param timestamp_at: 위치를 받아 그 블록의 타임스탬프(초)를 돌려주는 함수
+        """
+        if height == 0:
+            return self.initial_target
+        if not self.is_retarget_height(height):
+            return last_target
+        elapsed = timestamp_at(height - 1) - timestamp_at(height - 1 - self.retarget_interval)
+        return self.retarget(last_target, elapsed)
+
+    def blocks_until_retarget(self, height: int) -> int:
+        """
+        :param height: 다음 블록의 위치
+        :return: 다음 재조정 높이까지 남은 블록 수
+        """
+        first = 2 * self.retarget_interval
+        if height <= first:
+            return first - height
+        return -height % self.retarget_interval
+
+
+# =============================================================================
+# 시뮬레이션: 채굴 능력이 바뀌어도 블록 간격이 목표로 돌아오는지 확인합니다.
+# =============================================================================
+
+def simulate(hash_rates: list, blocks_per_phase: int, adjuster: DifficultyAdjuster, seed: int = 1):
+    import random
+    rng = random.Random(seed)
+
+    timestamps = [0.0]
+    targets = [adjuster.initial_target]
+    print(f"target block time {adjuster.target_block_time}s, retarget every {adjuster.retarget_interval} blocks")
+    print(f"{'hash rate':>12} {'blocks':>7} {'mean block time':>16} {'last window':>12} {'difficulty':>11}"
+          f" {'estimated rate':>15}")
+    for rate in hash_rates:
+        phase_start = len(timestamps)
+        for _ in range(blocks_per_phase):
+            target = adjuster.next_target(len(timestamps), targets[-1], timestamps.__getitem__)
+            # 해시 하나가 성공할 확률은 target / 2**256 이므로 블록 간격은 지수 분포를 따릅니다.
+            timestamps.append(timestamps[-1] + rng.expovariate(rate / expected_hashes(target)))
+            targets.append(target)
+
+        window = adjuster.retarget_interval * 3
+        mean = (timestamps[-1] - timestamps[phase_start - 1]) / blocks_per_phase
+        last = (timestamps[-1] - timestamps[-1 - window]) / window
+        estimate = estimate_hash_rate(list(zip(timestamps, targets))[-window:])
+        print(f"{rate:>12,.0f} {blocks_per_phase:>7} {mean:>15.2f}s {last:>11.2f}s {relative_difficulty(targets[-1]):>11.2f}"
+              f" {estimate:>15,.0f}")
+
+
+if __name__ == '__main__':
+
+    from argparse import ArgumentParser
+    parser = ArgumentParser(description='Simulate difficulty retargeting as mining capacity changes')
+    parser.add_argument('-r', '--rates', default='6554,26214,104858,6554', help='comma-separated hash rates (H/s)')
+    parser.add_argument('-n', '--blocks', default=300, type=int, help='blocks mined at each hash rate')
+    parser.add_argument('-t', '--block-time', default=TARGET_BLOCK_TIME, type=float, help='target block time (s)')
+    parser.add_argument('-i', '--interval', default=RETARGET_INTERVAL, type=int, help='retarget interval (blocks)')
+    args = parser.parse_args()
+
+    simulate([float(r) for r in args.rates.split(',')], args.blocks,
+             DifficultyAdjuster(args.block_time, args.interval))
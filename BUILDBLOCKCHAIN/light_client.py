@@ -0,0 +1,135 @@
+import requests
+
+import wire
+from blockchain import Blockchain
+from consensus import ProofOfWork, make_consensus
+from difficulty import RETARGET_INTERVAL, TARGET_BLOCK_TIME, DifficultyAdjuster
+from merkle import verify_proof
+
+
+class LightClient:
+    """
+    블록 헤더만 동기화하고 검증하는 라이트 노드입니다.
+    거래 목록은 보관하지 않으므로 메모리 사용량은 헤더 수에 비례합니다.
+    필요한 거래는 풀 노드에서 머클 증명과 함께 받아 헤더의 머클 루트로 검증합니다.
+    헤더 체인은 제네시스 해시에 고정됩니다. genesis_hash를 주지 않으면 처음 동기화한 제네시스를 고정합니다.
+    """
+
+    def __init__(self, node_url: str, batch_size: int = 2000, timeout: float = 10.0,
+                 consensus=None, genesis_hash: str = None):
+        self.node_url = node_url.rstrip('/')
+        self.batch_size = batch_size
+        self.timeout = timeout
+        self.session = requests.Session()
+        # 노드가 지원하면 헤더와 증명을 바이너리 인코딩으로 받습니다.
+        self.session.headers['Accept'] = wire.ACCEPT
+        self.headers = []
+        # 풀 노드와 같은 합의 규칙 (기본은 작업 증명과 기본 난이도 재조정 규칙)
+        self.consensus = consensus or ProofOfWork()
+        # 믿을 수 있는 제네시스 블록의 해시 (이 블록에서 시작하지 않는 헤더 체인은 받아들이지 않습니다)
+        self.genesis_hash = genesis_hash
+
+    def valid_link(self, headers: list, header: dict) -> bool:
+        """
+        header가 headers(제네시스부터의 헤더 목록)의 마지막 헤더 바로 다음 블록으로 올바른지
+        (해시 연결, 합의 규칙) 확인합니다.
+        """
+        last_header = headers[-1]
+        last_hash = Blockchain.hash(last_header)
+        if header['previous_hash'] != last_hash:
+            return False
+        return self.consensus.valid_seal(last_header, last_hash, header, Blockchain.timestamp_lookup(headers))
+
+    def fetch_headers(self, start: int) -> tuple:
+        response = self.session.get(
+            f'{self.node_url}/headers',
+            params={'start': start, 'count': self.batch_size},
+            timeout=self.timeout,
+        )
+        response.raise_for_status()
+        values = wire.parse_response(response)
+        return values['headers'], values['length']
+
+    def sync(self) -> int:
+        """
+        풀 노드에서 새 헤더를 받아 검증하고 추가합니다.
+        우리 헤더 체인과 이어지지 않으면(체인 교체) 처음부터 다시 받아 더 긴 경우에만 교체합니다.
+        :return: 동기화 후의 헤더 수
+        """
+        headers = list(self.headers)
+        resynced = False
+
+        while True:
+            batch, length = self.fetch_headers(len(headers))
+            if not batch:
+                break
+
+            for header in batch:
+                if not headers:
+                    if self.genesis_hash is not None and Blockchain.hash(header) != self.genesis_hash:
+                        raise ValueError('Genesis header does not match the pinned genesis hash')
+                elif not self.valid_link(headers, header):
+                    if resynced:
+                        raise ValueError(f"Invalid header at index {header['index']}")
+                    # 풀 노드의 체인이 바뀌었으므로 제네시스부터 다시 받습니다.
+                    headers = []
+                    resynced = True
+                    break
+                headers.append(header)
+
+            if len(headers) >= length:
+                break
+
+        if len(headers) > len(self.headers) or not resynced:
+            self.headers = headers
+        if self.genesis_hash is None and self.headers:
+            self.genesis_hash = Blockchain.hash(self.headers[0])
+        return len(self.headers)
+
+    def get_transaction(self, block_index: int, tx_index: int) -> dict:
+        """
+        블록의 거래 하나를 머클 증명과 함께 받아 검증한 뒤 반환합니다.
+        :param block_index: 블록의 index (1부터)
+        :param tx_index: 블록 안에서 거래의 위치
+        :return: 검증된 거래
+        """
+        if not 1 <= block_index <= len(self.headers):
+            raise ValueError(f'Block {block_index} is not in our header chain')
+
+        response = self.session.get(
+            f'{self.node_url}/transactions/proof',
+            params={'block': block_index, 'tx': tx_index},
+            timeout=self.timeout,
+        )
+        response.raise_for_status()
+        values = wire.parse_response(response)
+
+        root = self.headers[block_index - 1]['merkle_root']
+        if not verify_proof(values['transaction'], values['proof'], root):
+            raise ValueError(f'Invalid inclusion proof for transaction {tx_index} in block {block_index}')
+
+        return values['transaction']
+
+
+if __name__ == '__main__':
+
+    from argparse import ArgumentParser
+    parser = ArgumentParser(description='Headers-only light client')
+    parser.add_argument('node', help='full node to sync from (e.g. http://localhost:5000)')
+    parser.add_argument('--tx', nargs=2, type=int, metavar=('BLOCK', 'TX'), help='fetch and verify one transaction')
+    parser.add_argument('--block-time', default=TARGET_BLOCK_TIME, type=float, help="the node's target block time")
+    parser.add_argument('--retarget-interval', default=RETARGET_INTERVAL, type=int,
+                        help="the node's difficulty retarget interval")
+    parser.add_argument('--consensus', default='pow', choices=['pow', 'poa'], help="the node's consensus mode")
+    parser.add_argument('--authority-keys', help='JSON file of authority keys for proof of authority')
+    parser.add_argument('--genesis', help="hash of the network's genesis block (default: trust the node's)")
+    args = parser.parse_args()
+
+    consensus = make_consensus(args.consensus, DifficultyAdjuster(args.block_time, args.retarget_interval),
+                               args.authority_keys)
+    client = LightClient(args.node, consensus=consensus, genesis_hash=args.genesis)
+    height = client.sync()
+    print(f'Synced {height} headers, genesis: {client.genesis_hash}, tip: {Blockchain.hash(client.headers[-1])}')
+
+    if args.tx:
+        print(client.get_transaction(*args.tx))
@@ -0,0 +1,222 @@
+import json
+import math
+import random
+import threading
+import time
+from datetime import datetime
+from itertools import count
+
+import requests
+
+
+# 노드 종류별 API 경로 (blockchain.py / snakecoin.py)
+ENDPOINTS = {
+    'blockchain': {
+        'tx': ('POST', '/transactions/new'),
+        'mine': ('GET', '/mine'),
+        'chain': ('GET', '/chain'),
+        'consensus': ('GET', '/nodes/resolve'),
+    },
+    'snakecoin': {
+        'tx': ('POST', '/txion'),
+        'mine': ('GET', '/mine'),
+        'chain': ('GET', '/blocks'),
+        'consensus': ('GET', '/consensus'),
+    },
+}
+
+
+def parse_mix(mix: str) -> dict:
+    """
+    'tx=90,chain=8,mine=1,consensus=1' 형태의 요청 비율을 파싱합니다.
+    """
+    weights = {}
+    for part in mix.split(','):
+        name, _, weight = part.partition('=')
+        name = name.strip()
+        if name not in ENDPOINTS['blockchain']:
+            raise ValueError(f'Unknown operation: {name}')
+        weights[name] = float(weight or 1)
+    return weights
+
+
+def percentile(sorted_values: list, p: float) -> float:
+    """
+    정렬된 값들의 p 백분위수 (nearest-rank 방식).
+    """
+    if not sorted_values:
+        return 0.0
+    rank = max(math.ceil(p / 100 * len(sorted_values)), 1)
+    return sorted_values[rank - 1]
+
+
+class LoadGenerator:
+    """
+    여러 노드에 정해진 비율(거래 제출, 채굴, 체인 조회, 합의)로 요청을 보내고 지연 시간을 기록합니다.
+    """
+
+    def __init__(self, nodes: list, kind: str, mix: dict, concurrency: int,
+                 duration: float = None, total_requests: int = None, timeout: float = 30.0):
+        self.nodes = [node.rstrip('/') for node in nodes]
+        self.endpoints = ENDPOINTS[kind]
+        self.kind = kind
+        self.mix = mix
+        self.concurrency = concurrency
+        self.duration = duration
+        self.total_requests = total_requests
+        self.timeout = timeout
+        self.lock = threading.Lock()
+        self.samples = {name: [] for name in mix}
+        self.errors = {name: 0 for name in mix}
+        self.rejected = {name: 0 for name in mix}
+        self.issued = count()
+
+    def request_payload(self, op: str, i: int):
+        if op != 'tx':
+            return None
+        if self.kind == 'snakecoin':
+            return {'from': f'loadgen-{i}', 'to': 'loadgen', 'amount': 1}
+        return {'sender': f'loadgen-{i}', 'recipient': 'loadgen', 'amount': 1}
+
+    def worker(self, deadline: float):
+        session = requests.Session()
+        names = list(self.mix)
+        weights = [self.mix[name] for name in names]
+
+        while True:
+            i = next(self.issued)
+            if self.total_requests is not None and i >= self.total_requests:
+                return
+            if deadline is not None and time.perf_counter() >= deadline:
+                return
+
+            op = random.choices(names, weights)[0]
+            method, path = self.endpoints[op]
+            url = self.nodes[i % len(self.nodes)] + path
+
+            started = time.perf_counter()
+            try:
+                response = session.request(method, url, json=self.request_payload(op, i), timeout=self.timeout)
+                response.content
+                status = response.status_code
+            except requests.exceptions.RequestException:
+                status = None
+            elapsed = time.perf_counter() - started
+
+            with self.lock:
+                if status is None or status >= 500 or (status >= 400 and status != 429):
+                    self.errors[op] += 1
+                elif status == 429:
+                    self.rejected[op] += 1
+                else:
+                    self.samples[op].append(elapsed)
+
+    def run(self) -> dict:
+        started = time.perf_counter()
+        deadline = started + self.duration if self.duration is not None else None
+        threads = [threading.Thread(target=self.worker, args=(deadline,)) for _ in range(self.concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        return self.report(elapsed)
+
+    def report(self, elapsed: float) -> dict:
+        operations = {}
+        all_samples = []
+        for op, samples in self.samples.items():
+            samples = sorted(samples)
+            all_samples.extend(samples)
+            operations[op] = self.summarize(samples, elapsed, self.errors[op], self.rejected[op])
+
+        return {
+            'timestamp': datetime.now().isoformat(),
+            'config': {
+                'nodes': self.nodes,
+                'kind': self.kind,
+                'mix': self.mix,
+                'concurrency': self.concurrency,
+                'duration': self.duration,
+                'requests': self.total_requests,
+            },
+            'elapsed': elapsed,
+            'overall': self.summarize(sorted(all_samples), elapsed,
+                                      sum(self.errors.values()), sum(self.rejected.values())),
+            'operations': operations,
+        }
+
+    @staticmethod
+    def summarize(samples: list, elapsed: float, errors: int, rejected: int) -> dict:
+        return {
+            'ok': len(samples),
+            'errors': errors,
+            'rejected': rejected,
+            'throughput': len(samples) / elapsed if elapsed else 0.0,
+            'mean_ms': sum(samples) / len(samples) * 1000 if samples else 0.0,
+            'p50_ms': percentile(samples, 50) * 1000,
+            'p95_ms': percentile(samples, 95) * 1000,
+            'p99_ms': percentile(samples, 99) * 1000,
+            'max_ms': samples[-1] * 1000 if samples else 0.0,
+        }
+
+
+def print_report(result: dict):
+    print(f"{'operation':<10} {'ok':>8} {'err':>6} {'429':>6} {'req/s':>10} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    rows = list(result['operations'].items()) + [('overall', result['overall'])]
+    for op, stats in rows:
+        print(f"{op:<10} {stats['ok']:>8} {stats['errors']:>6} {stats['rejected']:>6} {stats['throughput']:>10.1f} "
+              f"{stats['p50_ms']:>9.2f} {stats['p95_ms']:>9.2f} {stats['p99_ms']:>9.2f}")
+
+
+def print_comparison(paths: list):
+    """
+    저장해 둔 결과 파일들의 처리량과 지연 시간을 나란히 비교합니다.
+    """
+    results = []
+    for path in paths:
+        with open(path) as f:
+            results.append(json.load(f))
+
+    operations = sorted({op for result in results for op in result['operations']}) + ['overall']
+    print(f"{'operation':<10} {'run':<30} {'req/s':>10} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for op in operations:
+        for path, result in zip(paths, results):
+            stats = result['overall'] if op == 'overall' else result['operations'].get(op)
+            if stats is None:
+                continue
+            print(f"{op:<10} {path[-30:]:<30} {stats['throughput']:>10.1f} "
+                  f"{stats['p50_ms']:>9.2f} {stats['p95_ms']:>9.2f} {stats['p99_ms']:>9.2f}")
+
+
+if __name__ == '__main__':
+
+    from argparse import ArgumentParser
+    parser = ArgumentParser(description='Load generator for blockchain.py / snakecoin.py nodes')
+    parser.add_argument('nodes', nargs='*', default=['http://localhost:5000'], help='node URLs to drive')
+    parser.add_argument('-k', '--kind', default='blockchain', choices=sorted(ENDPOINTS), help='node API flavour')
+    parser.add_argument('-m', '--mix', default='tx=90,chain=8,mine=1,consensus=1',
+                        help='operation weights, e.g. tx=90,chain=8,mine=1,consensus=1')
+    parser.add_argument('-c', '--concurrency', default=16, type=int, help='number of concurrent clients')
+    parser.add_argument('-d', '--duration', default=None, type=float, help='seconds to run')
+    parser.add_argument('-n', '--requests', default=None, type=int, help='total requests to send')
+    parser.add_argument('-o', '--out', help='write results as JSON to this file')
+    parser.add_argument('--compare', nargs='+', metavar='RESULT', help='compare saved JSON results and exit')
+    args = parser.parse_args()
+
+    if args.compare:
+        print_comparison(args.compare)
+    else:
+        if args.duration is None and args.requests is None:
+            args.duration = 10.0
+
+        generator = LoadGenerator(args.nodes, args.kind, parse_mix(args.mix), args.concurrency,
+                                  duration=args.duration, total_requests=args.requests)
+        result = generator.run()
+        print_report(result)
+
+        if args.out:
+            with open(args.out, 'w') as f:
+                json.dump(result, f, indent=2)
+            print(f"Results written to {args.out}")
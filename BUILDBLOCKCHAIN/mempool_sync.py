@@ -0,0 +1,229 @@
+import math
+import threading
+import time
+
+import requests
+
+import wire
+
+
+# 조정(reconciliation)에 쓰는 거래 ID의 길이(바이트). 거래 해시의 앞부분입니다.
+ID_BYTES = 8
+ID_HEX = ID_BYTES * 2
+
+# 버킷 요약값의 길이(바이트). 다른 버킷을 같다고 잘못 볼 확률은 2**-32입니다.
+DIGEST_BYTES = 4
+DIGEST_HEX = DIGEST_BYTES * 2
+
+# 버킷 수는 2**bits개. 버킷 하나에 평균 몇 개의 거래가 들어가도록 나눌지
+MIN_BITS = 4
+MAX_BITS = 14
+TXS_PER_BUCKET = 8
+
+# 한 번에 주고받는 거래 수의 상한
+MAX_TRANSFER = 5000
+
+
+def choose_bits(count: int) -> int:
+    """
+    Mempool 크기에 맞는 버킷 수(2**bits)를 고릅니다. 버킷 하나에 TXS_PER_BUCKET개 정도가 들어갑니다.
+    """
+    if count <= TXS_PER_BUCKET:
+        return MIN_BITS
+    return max(MIN_BITS, min(MAX_BITS, math.ceil(math.log2(count / TXS_PER_BUCKET))))
+
+
+def bucket_of(short_id: str, bits: int) -> int:
+    return int(short_id[:4], 16) >> (16 - bits)
+
+
+def bucket_digests(short_ids, bits: int) -> list:
+    """
+    거래 ID들을 앞 bits 비트로 버킷에 나누고, 버킷마다 ID들의 XOR을 계산합니다.
+    두 노드의 버킷 값이 같으면 그 버킷의 거래 집합도 (거의 확실히) 같습니다.
+    :return: 2**bits개의 정수 (빈 버킷은 0)
+    """
+    digests = [0] * (1 << bits)
+    for short_id in short_ids:
+        digests[bucket_of(short_id, bits)] ^= int(short_id[-DIGEST_HEX:], 16)
+    return digests
+
+
+def pack_digests(digests: list) -> str:
+    return ''.join(f'{d:0{DIGEST_HEX}x}' for d in digests)
+
+
+def unpack_digests(packed: str, bits: int) -> list:
+    if len(packed) != DIGEST_HEX << bits:
+        raise ValueError('Digest size does not match bucket count')
+    return [int(packed[i:i + DIGEST_HEX], 16) for i in range(0, len(packed), DIGEST_HEX)]
+
+
+def pack_ids(short_ids) -> str:
+    return ''.join(short_ids)
+
+
+def unpack_ids(packed: str) -> list:
+    if len(packed) % ID_HEX:
+        raise ValueError('Malformed transaction ids')
+    return [packed[i:i + ID_HEX] for i in range(0, len(packed), ID_HEX)]
+
+
+class MempoolSync:
+    """
+    피어들과 Mempool을 집합 조정(set reconciliation)으로 맞춥니다.
+    전체 Mempool을 주고받는 대신, 버킷별 요약값(XOR)을 보내 다른 버킷만 찾고,
+    그 버킷의 거래 ID를 비교하여 서로 없는 거래만 주고받습니다.
+    주기적으로(interval초마다) 또는 요청이 있을 때(sync_all) 한 번씩 조정합니다.
+    """
+
+    def __init__(self, blockchain, interval: float = 5.0, max_pending: int = None, timeout: float = 10.0):
+        self.blockchain = blockchain
+        self.interval = interval
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.round_lock = threading.Lock()
+        self.stats_lock = threading.Lock()
+        self.stats = {
+            'rounds': 0,
+            'in_sync': 0,
+            'bytes_sent': 0,
+            'bytes_received': 0,
+            'transactions_received': 0,
+            'transactions_sent': 0,
+            'last_round_ms': 0.0,
+        }
+
+    def _count(self, **amounts):
+        with self.stats_lock:
+            for key, amount in amounts.items():
+                self.stats[key] += amount
+
+    def mempool_ids(self) -> dict:
+        """
+        :return: {거래 ID: 거래}
+        """
+        transactions, hashes = self.blockchain.mempool_snapshot()
+        return {h[:ID_HEX]: tx for tx, h in zip(transactions, hashes)}
+
+    # --- 조정을 시작하는 쪽 ---
+
+    def _post(self, node: str, path: str, payload: dict) -> dict:
+        body = wire.encode(payload)
+        response = self.session.post(
+            f'http://{node}{path}', data=body, timeout=self.timeout,
+            headers={'Content-Type': wire.CONTENT_TYPE, 'Accept': wire.ACCEPT},
+        )
+        response.raise_for_status()
+        self._count(bytes_sent=len(body), bytes_received=len(response.content))
+        return wire.parse_response(response)
+
+    def reconcile(self, node: str) -> tuple:
+        """
+        피어 하나와 Mempool을 맞춥니다.
+        :return: (받은 거래 수, 보낸 거래 수)
+        """
+        ids = self.mempool_ids()
+        bits = choose_bits(len(ids))
+        values = self._post(node, '/mempool/reconcile', {
+            'bits': bits,
+            'buckets': pack_digests(bucket_digests(ids, bits)),
+        })
+
+        differing = set(values['buckets'])
+        if not differing:
+            self._count(in_sync=1)
+            return 0, 0
+
+        # 다른 버킷 안에서만 ID를 비교합니다.
+        theirs = set(unpack_ids(values['ids']))
+        ours = {short_id for short_id in ids if bucket_of(short_id, bits) in differing}
+        need = list(theirs - ours)[:MAX_TRANSFER]
+        give = list(ours - theirs)[:MAX_TRANSFER]
+
+        received = 0
+        if need:
+            values = self._post(node, '/mempool/fetch', {'ids': pack_ids(need)})
+            received = self.blockchain.add_transactions(values['transactions'], self.max_pending)
+        if give:
+            self._post(node, '/mempool/transactions', {'transactions': [ids[short_id] for short_id in give]})
+
+        self._count(transactions_received=received, transactions_sent=len(give))
+        return received, len(give)
+
+    def sync_all(self) -> dict:
+        """
+        모든 피어와 한 번씩 조정합니다 (한 번에 한 라운드만 실행).
+        :return: 피어별 (받은 거래 수, 보낸 거래 수)
+        """
+        with self.round_lock:
+            started = time.perf_counter()
+            results = {}
+            for node in list(self.blockchain.nodes):
+                try:
+                    results[node] = self.reconcile(node)
+                except (requests.exceptions.RequestException, ValueError, KeyError, TypeError) as e:
+                    print(f"Could not reconcile mempool with node {node}: {e}")
+            with self.stats_lock:
+                self.stats['rounds'] += 1
+                self.stats['last_round_ms'] = (time.perf_counter() - started) * 1000
+            return results
+
+    def run(self):
+        while True:
+            time.sleep(self.interval)
+            self.sync_all()
+
+    def start(self):
+        """
+        interval초마다 조정하는 백그라운드 스레드를 시작합니다.
+        """
+        if self.interval and self.interval > 0:
+            threading.Thread(target=self.run, daemon=True).start()
+
+    # --- 조정 요청에 답하는 쪽 ---
+
+    def answer_reconcile(self, values: dict) -> dict:
+        """
+        상대의 버킷 요약값과 비교하여, 값이 다른 버킷의 번호와 그 버킷에 든 우리 거래 ID를 돌려줍니다.
+        """
+        bits = int(values['bits'])
+        if not MIN_BITS <= bits <= MAX_BITS:
+            raise ValueError('Unsupported bucket count')
+        theirs = unpack_digests(values['buckets'], bits)
+        ids = self.mempool_ids()
+        ours = bucket_digests(ids, bits)
+
+        differing = [b for b, (mine, other) in enumerate(zip(ours, theirs)) if mine != other]
+        wanted = set(differing)
+        return {
+            'buckets': differing,
+            'ids': pack_ids(short_id for short_id in ids if bucket_of(short_id, bits) in wanted),
+        }
+
+    def answer_fetch(self, values: dict) -> dict:
+        """
+        요청받은 ID의 거래들을 돌려줍니다.
+        """
+        ids = self.mempool_ids()
+        wanted = unpack_ids(values['ids'])[:MAX_TRANSFER]
+        return {'transactions': [ids[short_id] for short_id in wanted if short_id in ids]}
+
+    def receive(self, values: dict) -> dict:
+        """
+        상대가 보낸(우리에게 없던) 거래들을 Mempool에 추가합니다.
+        """
+        added = self.blockchain.add_transactions(values['transactions'][:MAX_TRANSFER], self.max_pending)
+        self._count(transactions_received=added)
+        return {'added': added}
+
+    def mempool_digest(self) -> dict:
+        """
+        Mempool 전체의 요약값. 두 노드의 값이 같으면 Mempool이 (거의 확실히) 같습니다.
+        """
+        ids = self.mempool_ids()
+        digest = 0
+        for short_id in ids:
+            digest ^= int(short_id, 16)
+        return {'count': len(ids), 'digest': f'{digest:0{ID_HEX}x}'}
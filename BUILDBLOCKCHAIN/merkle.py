@@ -0,0 +1,82 @@
+import hashlib
+import json
+
+
+def tx_hash(transaction: dict) -> str:
+    """
+    거래의 SHA-256 해시를 생성합니다 (키 순서를 정렬하여 항상 같은 값이 나오도록 합니다).
+    :param transaction: 거래
+    :return: 해시 문자열
+    """
+    tx_string = json.dumps(transaction, sort_keys=True).encode()
+    return hashlib.sha256(tx_string).hexdigest()
+
+
+def _hash_pair(left: str, right: str) -> str:
+    return hashlib.sha256((left + right).encode()).hexdigest()
+
+
+def merkle_root(transactions: list) -> str:
+    """
+    거래 목록의 머클 루트를 계산합니다. 홀수 개인 층은 마지막 해시를 복제해 짝을 맞춥니다.
+    그래서 [a, b, c]와 [a, b, c, c]의 루트가 같으므로, 블록 검증에서 중복 거래가 있는 블록을 거절해야 합니다.
+    :param transactions: 거래 목록
+    :return: 머클 루트 (거래가 없으면 빈 문자열의 해시)
+    """
+    return merkle_root_from_hashes([tx_hash(tx) for tx in transactions])
+
+
+def merkle_root_from_hashes(tx_hashes: list) -> str:
+    """
+    미리 계산해 둔 거래 해시(잎)들로 머클 루트를 계산합니다.
+    :param tx_hashes: 거래 해시 목록
+    :return: 머클 루트
+    """
+    level = list(tx_hashes)
+    if not level:
+        return hashlib.sha256(b'').hexdigest()
+
+    while len(level) > 1:
+        if len(level) % 2 == 1:
+            level.append(level[-1])
+        level = [_hash_pair(level[i], level[i + 1]) for i in range(0, len(level), 2)]
+
+    return level[0]
+
+
+def merkle_proof(transactions: list, index: int) -> list:
+    """
+    index번째 거래가 머클 루트에 포함되어 있음을 보이는 증명(형제 해시 경로)을 만듭니다.
+    :param transactions: 블록의 거래 목록
+    :param index: 증명할 거래의 위치
+    :return: [[형제 해시, 'left' 또는 'right'], ...] (잎에서 루트 방향)
+    """
+    level = [tx_hash(tx) for tx in transactions]
+    proof = []
+
+    while len(level) > 1:
+        if len(level) % 2 == 1:
+            level.append(level[-1])
+        sibling = index ^ 1
+        proof.append([level[sibling], 'left' if sibling < index else 'right'])
+        level = [_hash_pair(level[i], level[i + 1]) for i in range(0, len(level), 2)]
+        index //= 2
+
+    return proof
+
+
+def verify_proof(transaction: dict, proof: list, root: str) -> bool:
+    """
+    머클 증명을 따라 올라가 계산한 루트가 블록 헤더의 머클 루트와 같은지 확인합니다.
+    :param transaction: 거래
+    :param proof: merkle_proof()로 만든 증명
+    :param root: 블록 헤더의 머클 루트
+    :return: True or False
+    """
+    current = tx_hash(transaction)
+    for sibling, side in proof:
+        if side == 'left':
+            current = _hash_pair(sibling, current)
+        else:
+            current = _hash_pair(current, sibling)
+    return current == root
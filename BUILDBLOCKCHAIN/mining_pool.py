@@ -0,0 +1,181 @@
+import time
+from uuid import uuid4
+
+import requests
+
+
+class MiningCoordinator:
+    """
+    마이닝 풀 방식의 작업 분배기입니다. 노드가 블록 템플릿(마지막 블록의 증명과 해시)을 만들고,
+    원격 작업자들에게 서로 겹치지 않는 논스 구간을 나눠 준 뒤 찾은 해답을 받아 블록을 만듭니다.
+    체인의 끝(tip)이 바뀌면 나눠 준 작업은 모두 무효가 됩니다.
+    """
+
+    def __init__(self, blockchain, node_identifier: str, range_size: int = 200000):
+        self.blockchain = blockchain
+        self.node_identifier = node_identifier
+        self.range_size = range_size
+        # 노드의 /mine, 릴레이된 블록과 같은 락으로 블록 생성을 직렬화합니다.
+        self.lock = blockchain.block_lock
+        self.tip = None
+        self.last_proof = None
+        self.target = None
+        self.next_nonce = 0
+        self.jobs = {}
+        self.stats = {'jobs': 0, 'solutions': 0, 'stale': 0, 'invalid': 0}
+
+    def _refresh_template(self):
+        """
+        tip이 바뀌었으면 새 템플릿을 만들고 이전 tip에 대해 나눠 준 작업을 모두 무효로 합니다.
+        """
+        last_block, tip, _ = self.blockchain.block_template()
+        if tip != self.tip:
+            self.tip = tip
+            self.last_proof = last_block['proof']
+            self.target = self.blockchain.next_target()
+            self.next_nonce = 0
+            self.jobs = {}
+        return tip
+
+    def get_work(self, worker: str) -> dict:
+        """
+        작업자에게 다음 논스 구간을 배정합니다.
+        :param worker: 작업자 식별자 (보상을 받을 주소)
+        :return: 작업 (job_id, last_proof, last_hash, target, start, end)
+        """
+        with self.lock:
+            tip = self._refresh_template()
+            job = {
+                'job_id': uuid4().hex,
+                'last_proof': self.last_proof,
+                'last_hash': tip,
+                'target': self.target,
+                'start': self.next_nonce,
+                'end': self.next_nonce + self.range_size,
+            }
+            self.next_nonce += self.range_size
+            self.jobs[job['job_id']] = dict(job, worker=worker)
+            self.stats['jobs'] += 1
+            return job
+
+    def submit(self, job_id: str, proof: int):
+        """
+        작업자가 찾은 증명 값을 받아 검증하고, 올바르면 새 블록을 만듭니다.
+        :param job_id: 작업 ID
+        :param proof: 찾은 증명 값
+        :return: (결과 메시지, 새 블록 또는 None)
+        """
+        with self.lock:
+            self._refresh_template()
+            job = self.jobs.get(job_id)
+            if job is None:
+                # 그 사이 tip이 바뀌어 무효가 된 작업입니다.
+                self.stats['stale'] += 1
+                return 'stale', None
+
+            if not (job['start'] <= proof < job['end']) or \
+                    not self.blockchain.valid_proof(job['last_proof'], proof, job['last_hash'], job['target']):
+                self.stats['invalid'] += 1
+                return 'invalid', None
+
+            # 체크포인트 높이인데 상태를 모르면 상태 루트를 커밋할 수 없어 블록을 만들지 않습니다.
+            if not self.blockchain.can_mine():
+                return 'unavailable', None
+
+            # 채굴 보상은 해답을 찾은 작업자에게 지급합니다.
+            self.blockchain.new_transaction(
+                sender="0",
+                recipient=job['worker'] or self.node_identifier,
+                amount=1,
+            )
+            block = self.blockchain.new_block(proof, job['last_hash'])
+            self.stats['solutions'] += 1
+            self._refresh_template()
+            return 'accepted', block
+
+    def is_current(self, job_id: str) -> bool:
+        with self.lock:
+            self._refresh_template()
+            return job_id in self.jobs
+
+
+class MiningWorker:
+    """
+    코디네이터 노드에서 작업을 받아 논스 구간을 탐색하는 원격 작업자입니다.
+    구간을 조금씩 나눠 탐색하면서 작업이 아직 유효한지 확인하고, 무효가 되면 즉시 새 작업을 받습니다.
+    """
+
+    def __init__(self, node_url: str, address: str, check_every: int = 20000, timeout: float = 10.0):
+        self.node_url = node_url.rstrip('/')
+        self.address = address
+        self.check_every = check_every
+        self.timeout = timeout
+        self.session = requests.Session()
+        # blockchain.py가 이 모듈을 불러오므로, 순환 import를 피하려고 작업자를 만들 때 불러옵니다.
+        from blockchain import Blockchain
+        self.valid_proof = Blockchain.valid_proof
+
+    def mine_job(self, job: dict):
+        """
+        작업의 논스 구간을 탐색합니다.
+        :return: 찾은 증명 값, 구간 안에 없거나 작업이 무효가 되면 None
+        """
+        last_proof, last_hash, target = job['last_proof'], job['last_hash'], job['target']
+        for chunk_start in range(job['start'], job['end'], self.check_every):
+            chunk_end = min(chunk_start + self.check_every, job['end'])
+            for proof in range(chunk_start, chunk_end):
+                if self.valid_proof(last_proof, proof, last_hash, target):
+                    return proof
+
+            response = self.session.get(f'{self.node_url}/work/status',
+                                        params={'job_id': job['job_id']}, timeout=self.timeout)
+            if not response.json()['current']:
+                return None
+        return None
+
+    def run(self, max_blocks: int = None):
+        found = 0
+        while max_blocks is None or found < max_blocks:
+            try:
+                job = self.session.get(f'{self.node_url}/work',
+                                       params={'worker': self.address}, timeout=self.timeout).json()
+                proof = self.mine_job(job)
+                if proof is None:
+                    continue
+
+                response = self.session.post(f'{self.node_url}/work/submit',
+                                             json={'job_id': job['job_id'], 'proof': proof}, timeout=self.timeout)
+                result = response.json()['result']
+                print(f"[{self.address}] Submitted proof {proof}: {result}")
+                if result == 'accepted':
+                    found += 1
+            except (requests.exceptions.RequestException, ValueError, KeyError) as e:
+                print(f"[{self.address}] Error talking to node {self.node_url}: {e}")
+                time.sleep(1)
+
+
+def run_worker(node_url: str, address: str, max_blocks: int = None):
+    MiningWorker(node_url, address).run(max_blocks)
+
+
+if __name__ == '__main__':
+
+    from argparse import ArgumentParser
+    from multiprocessing import Process
+
+    parser = ArgumentParser(description='Pool mining worker')
+    parser.add_argument('node', help='coordinator node (e.g. http://localhost:5000)')
+    parser.add_argument('-w', '--workers', default=1, type=int, help='number of local worker processes')
+    parser.add_argument('-a', '--address', default=None, help='reward address (default: random)')
+    parser.add_argument('-n', '--blocks', default=None, type=int, help='stop each worker after N accepted blocks')
+    args = parser.parse_args()
+
+    address = args.address or str(uuid4()).replace('-', '')
+    processes = [
+        Process(target=run_worker, args=(args.node, f'{address}-{i}' if args.workers > 1 else address, args.blocks))
+        for i in range(args.workers)
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
@@ -0,0 +1,301 @@
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from time import monotonic, time
+
+import requests
+
+import wire
+
+
+class PeerStats:
+    """
+    피어 하나의 통계 (지연 시간, 처리량, 실패 및 잘못된 데이터 횟수).
+    """
+
+    # 지수 이동 평균의 가중치
+    ALPHA = 0.3
+
+    def __init__(self, address: str):
+        self.address = address
+        self.latency = None      # 초
+        self.throughput = None   # 초당 블록 수
+        self.successes = 0
+        self.failures = 0
+        self.invalid = 0
+        self.consecutive_failures = 0
+        self.last_seen = None
+
+    def record_success(self, elapsed: float, blocks: int = 0):
+        self.successes += 1
+        self.consecutive_failures = 0
+        self.last_seen = time()
+        self.latency = elapsed if self.latency is None else (1 - self.ALPHA) * self.latency + self.ALPHA * elapsed
+        if blocks:
+            rate = blocks / max(elapsed, 1e-6)
+            self.throughput = rate if self.throughput is None else (1 - self.ALPHA) * self.throughput + self.ALPHA * rate
+
+    def record_failure(self):
+        self.failures += 1
+        self.consecutive_failures += 1
+
+    def record_invalid(self):
+        self.invalid += 1
+
+    @property
+    def score(self) -> float:
+        """
+        높을수록 좋은 피어입니다. 처리량이 높고 지연이 짧을수록 점수가 오르고,
+        실패와 잘못된 데이터는 점수를 절반씩 깎습니다.
+        """
+        throughput = self.throughput if self.throughput is not None else 100.0
+        latency = self.latency if self.latency is not None else 0.5
+        return throughput / (1.0 + latency) * 0.5 ** (self.consecutive_failures + 2 * self.invalid)
+
+    def to_dict(self) -> dict:
+        return {
+            'address': self.address,
+            'score': round(self.score, 3),
+            'latency': self.latency,
+            'throughput': self.throughput,
+            'successes': self.successes,
+            'failures': self.failures,
+            'invalid': self.invalid,
+            'last_seen': self.last_seen,
+        }
+
+
+class PeerTable:
+    """
+    피어 주소와 통계를 관리하는 테이블. 기존의 set처럼 add / in / len / 순회를 지원합니다.
+    잘못된 데이터를 여러 번 보내거나 연속으로 응답하지 않는 피어는 테이블에서 제거됩니다.
+    """
+
+    def __init__(self, max_invalid: int = 3, max_consecutive_failures: int = 5):
+        self.max_invalid = max_invalid
+        self.max_consecutive_failures = max_consecutive_failures
+        self.lock = threading.Lock()
+        self.peers = {}
+
+    def add(self, address: str):
+        with self.lock:
+            if address not in self.peers:
+                self.peers[address] = PeerStats(address)
+
+    def discard(self, address: str):
+        with self.lock:
+            self.peers.pop(address, None)
+
+    def __contains__(self, address) -> bool:
+        return address in self.peers
+
+    def __iter__(self):
+        with self.lock:
+            return iter(list(self.peers))
+
+    def __len__(self) -> int:
+        return len(self.peers)
+
+    def stats(self, address: str) -> PeerStats:
+        return self.peers.get(address)
+
+    def ranked(self, addresses=None) -> list:
+        """
+        점수가 높은 순으로 정렬한 피어 주소 목록을 반환합니다.
+        """
+        with self.lock:
+            candidates = [self.peers[a] for a in (addresses if addresses is not None else self.peers) if a in self.peers]
+        return [p.address for p in sorted(candidates, key=lambda p: p.score, reverse=True)]
+
+    def record_success(self, address: str, elapsed: float, blocks: int = 0):
+        stats = self.peers.get(address)
+        if stats:
+            stats.record_success(elapsed, blocks)
+
+    def record_failure(self, address: str):
+        stats = self.peers.get(address)
+        if stats:
+            stats.record_failure()
+            if stats.consecutive_failures >= self.max_consecutive_failures:
+                print(f"Dropping unresponsive peer {address}")
+                self.discard(address)
+
+    def record_invalid(self, address: str):
+        stats = self.peers.get(address)
+        if stats:
+            stats.record_invalid()
+            if stats.invalid >= self.max_invalid:
+                print(f"Dropping peer {address} for sending invalid data")
+                self.discard(address)
+
+    def to_list(self) -> list:
+        with self.lock:
+            peers = list(self.peers.values())
+        return [p.to_dict() for p in sorted(peers, key=lambda p: p.score, reverse=True)]
+
+
+class RangeCache:
+    """
+    피어별로 최근에 내려받은 블록 구간과 그 ETag. 같은 구간을 다시 받을 때 If-None-Match로 물어보고,
+    피어의 체인이 바뀌지 않았으면(304) 본문 없이 캐시된 블록을 씁니다.
+    """
+
+    def __init__(self, max_ranges: int = 8):
+        self.max_ranges = max_ranges
+        self.lock = threading.Lock()
+        self.ranges = OrderedDict()
+
+    def get(self, peer: str, r: tuple):
+        """
+        :return: (ETag, 블록 목록) 또는 없으면 None
+        """
+        with self.lock:
+            entry = self.ranges.get((peer, r))
+            if entry is not None:
+                self.ranges.move_to_end((peer, r))
+            return entry
+
+    def put(self, peer: str, r: tuple, etag: str, blocks: list):
+        with self.lock:
+            self.ranges[peer, r] = (etag, blocks)
+            self.ranges.move_to_end((peer, r))
+            while len(self.ranges) > self.max_ranges:
+                self.ranges.popitem(last=False)
+
+
+class RangeDownloader:
+    """
+    블록 높이 구간을 여러 피어에서 병렬로 내려받습니다.
+    피어마다 작업 스레드가 하나씩 있어 빠른 피어가 더 많은 구간을 가져가고,
+    실패하거나 잘못된 구간은 다른 피어에게 다시 배정됩니다.
+    남은 구간이 느린 피어에게 묶여 있으면 놀고 있는 피어가 같은 구간을 중복 요청합니다.
+    """
+
+    def __init__(self, blockchain, peers: list, start: int, end: int,
+                 range_size: int = 500, timeout: float = 10.0):
+        self.blockchain = blockchain
+        self.table = blockchain.nodes
+        self.peers = peers
+        self.range_size = range_size
+        self.timeout = timeout
+        self.lock = threading.Lock()
+        self.ranges = [(s, min(s + range_size, end)) for s in range(start, end, range_size)]
+        self.in_flight = {}
+        self.completed = {}
+        # 구간별로 채택한 블록을 보낸 피어 (검증에 실패한 블록의 출처를 찾을 때 씁니다)
+        self.sources = {}
+
+    def next_range(self, peer: str):
+        """
+        아직 아무도 받지 않은 구간을 먼저 배정하고, 없으면 다른 피어가 받고 있는 가장 오래된 구간을 배정합니다.
+        """
+        with self.lock:
+            pending = [r for r in self.ranges if r not in self.completed]
+            if not pending:
+                return None
+            for r in pending:
+                if r not in self.in_flight:
+                    self.in_flight[r] = {peer}
+                    return r
+            for r in pending:
+                if peer not in self.in_flight[r]:
+                    self.in_flight[r].add(peer)
+                    return r
+            return None
+
+    def release(self, r: tuple, peer: str):
+        with self.lock:
+            owners = self.in_flight.get(r)
+            if owners:
+                owners.discard(peer)
+                if not owners:
+                    del self.in_flight[r]
+
+    def valid_range(self, blocks: list, r: tuple) -> bool:
+        """
+        구간 안의 블록들이 올바른 위치에 있고 서로 올바르게 연결되어 있는지 확인합니다.
+        구간 사이의 연결은 다운로드가 끝난 뒤 전체 체인 검증에서 확인합니다.
+        """
+        if len(blocks) != r[1] - r[0]:
+            return False
+        timestamp_at = self.blockchain.timestamp_lookup(blocks, r[0])
+        for offset, block in enumerate(blocks):
+            if block.get('index') != r[0] + offset + 1 or not self.blockchain.valid_merkle_root(block):
+                return False
+            if offset:
+                last_block = blocks[offset - 1]
+                last_hash = self.blockchain.hash(last_block)
+                if block['previous_hash'] != last_hash:
+                    return False
+                if not self.blockchain.consensus.valid_seal(last_block, last_hash, block, timestamp_at):
+                    return False
+        return True
+
+    def worker(self, peer: str):
+        session = requests.Session()
+        while peer in self.table:
+            r = self.next_range(peer)
+            if r is None:
+                return
+            started = monotonic()
+            cached = self.blockchain.range_cache.get(peer, r)
+            headers = {'Accept': wire.ACCEPT}
+            if cached is not None:
+                headers['If-None-Match'] = cached[0]
+            try:
+                response = session.get(
+                    f'http://{peer}/blocks/range',
+                    params={'start': r[0], 'count': r[1] - r[0]},
+                    headers=headers,
+                    timeout=self.timeout,
+                )
+                # 304: 지난번에 받은 뒤 피어의 체인이 바뀌지 않았습니다.
+                if response.status_code == 304 and cached is not None:
+                    etag, blocks = cached
+                else:
+                    response.raise_for_status()
+                    etag, blocks = response.headers.get('ETag'), wire.parse_response(response)['blocks']
+            except (requests.exceptions.RequestException, ValueError, KeyError) as e:
+                print(f"Could not download blocks {r[0]}-{r[1]} from node {peer}: {e}")
+                self.table.record_failure(peer)
+                self.release(r, peer)
+                continue
+
+            if not self.valid_range(blocks, r):
+                print(f"Node {peer} sent invalid blocks {r[0]}-{r[1]}")
+                self.table.record_invalid(peer)
+                self.release(r, peer)
+                continue
+
+            self.table.record_success(peer, monotonic() - started, len(blocks))
+            if etag is not None:
+                self.blockchain.range_cache.put(peer, r, etag, blocks)
+            with self.lock:
+                if r not in self.completed:
+                    self.completed[r] = blocks
+                    self.sources[r] = peer
+                self.in_flight.pop(r, None)
+
+    def source(self, height: int):
+        """
+        height(0부터) 위치의 블록이 든 구간을 보낸 피어. 내려받은 구간이 아니면 None.
+        """
+        for r, peer in self.sources.items():
+            if r[0] <= height < r[1]:
+                return peer
+        return None
+
+    def run(self):
+        """
+        모든 구간을 내려받아 순서대로 이어 붙인 블록 목록을 반환합니다. 끝내 받지 못한 구간이 있으면 None.
+        """
+        with ThreadPoolExecutor(max_workers=max(len(self.peers), 1)) as executor:
+            list(executor.map(self.worker, self.peers))
+
+        if len(self.completed) != len(self.ranges):
+            return None
+
+        blocks = []
+        for r in self.ranges:
+            blocks.extend(self.completed[r])
+        return blocks
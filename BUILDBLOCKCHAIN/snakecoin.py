@@ -2,60 +2,105 @@ import hashlib as hasher
 import datetime as date
 import json
 import requests
-from flask import Flask, request
-import sys
+from flask import Flask, Response, request
+import threading
+
+import wire
+from admission import AdmissionController
+from chain_cache import TipPayloadCache
+from compact_block import MAX_PARTIAL_BLOCKS, PartialBlock, make_compact
+from consensus import make_consensus
+from difficulty import DifficultyAdjuster, estimate_hash_rate, meets_target, relative_difficulty, target_bytes
+from merkle import tx_hash
 
 # =============================================================================
 # ## 1. 블록체인 기본 설정
 # =============================================================================
 
-# 작업증명(PoW) 난이도. 숫자가 높을수록 채굴이 오래 걸립니다.
-# (테스트를 위해 2~4 정도로 낮게 설정하세요.)
-DIFFICULTY = 4 
+# 작업증명(PoW) 난이도 규칙. 해시를 정수로 보았을 때 목표값(target)보다 작아야 하며,
+# 블록 타임스탬프를 보고 일정 블록마다 목표값을 다시 정해 채굴 능력이 바뀌어도 블록 간격을 유지합니다.
+# 각 블록의 data에 그 블록이 쓴 목표값이 들어갑니다. (처음 목표값은 해시 앞자리가 0이 4개인 난이도)
+difficulty = DifficultyAdjuster()
+# 권한 증명(PoA) 모드 (개발/벤치마크용): ProofOfAuthority이면 작업증명 없이 권한자의 키로 서명한 블록만 받습니다.
+# 이때 블록 data는 {transactions, authority, signature} 형태입니다.
+authority = None
 
 class Block:
-    def __init__(self, index, timestamp, data, previous_hash):
+    def __init__(self, index, timestamp, data, previous_hash, hash=None):
         self.index = index
         self.timestamp = timestamp
-        self.data = data # data는 이제 {transactions: [...], nonce: ...} 형태
+        self.data = data # data는 이제 {transactions: [...], nonce: ..., target: ...} 형태
         self.previous_hash = previous_hash
-        self.hash = self.calculate_hash()
+        # 해시는 처음 필요할 때 계산합니다 (이미 계산한 값이 있으면 그대로 사용)
+        self._hash = hash
+
+    @property
+    def hash(self):
+        if self._hash is None:
+            self._hash = self.calculate_hash()
+        return self._hash
 
     def calculate_hash(self):
         """
         블록의 모든 데이터를 기반으로 해시를 계산합니다.
         (Nonce 값도 해시 계산에 포함됩니다)
         """
-        sha = hasher.sha256()
-        
-        # Nonce를 포함한 모든 데이터를 문자열로 결합 후 인코딩
-        block_string = (str(self.index) + 
-                        str(self.timestamp) + 
-                        str(self.data) +  # data 딕셔너리 자체를 문자열로
-                        str(self.previous_hash))
-        
-        sha.update(block_string.encode('utf-8'))
-        return sha.hexdigest()
+        return calculate_block_hash(self.index, self.timestamp, self.data, self.previous_hash)
+
+
+def calculate_block_hash(index, timestamp, data, previous_hash):
+    """
+    Block 객체를 만들지 않고 블록 데이터만으로 해시를 계산합니다 (Block.calculate_hash와 같은 값).
+    """
+    sha = hasher.sha256()
+
+    # Nonce를 포함한 모든 데이터를 문자열로 결합 후 인코딩
+    block_string = (str(index) +
+                    str(timestamp) +
+                    str(data) +  # data 딕셔너리 자체를 문자열로
+                    str(previous_hash))
+
+    sha.update(block_string.encode('utf-8'))
+    return sha.hexdigest()
 
 
 # =============================================================================
 # ## 2. 작업증명(PoW) 및 블록 생성 (보안 강화)
 # =============================================================================
 
-def proof_of_work(last_block_hash, transactions):
+def timestamp_seconds(timestamp):
+    """
+    블록 타임스탬프(datetime 또는 피어에게 받은 str(datetime))를 초 단위 숫자로 바꿉니다.
+    """
+    if isinstance(timestamp, str):
+        timestamp = date.datetime.fromisoformat(timestamp)
+    return timestamp.timestamp()
+
+
+def next_block_target(chain):
+    """
+    chain(Block 리스트) 다음 블록이 써야 하는 작업증명 목표값 (PoA 모드에서는 None)
+    """
+    if authority is not None:
+        return None
+    last_target = chain[-1].data['target'] if chain else None
+    return difficulty.next_target(len(chain), last_target, lambda h: timestamp_seconds(chain[h].timestamp))
+
+
+def proof_of_work(last_block_hash, transactions, target):
     """
     비트코인과 유사한 작업증명(PoW)
-    'DIFFICULTY' 값 만큼의 0으로 시작하는 해시를 찾는 Nonce를 발견할 때까지 무한 반복합니다.
+    정수로 보았을 때 목표값(target)보다 작은 해시를 찾는 Nonce를 발견할 때까지 무한 반복합니다.
     
     Args:
         last_block_hash (str): 이전 블록의 해시
         transactions (list): 현재 블록에 담을 거래 내역
+        target (int): 작업증명 목표값
 
     Returns:
         (int, str): (찾아낸 Nonce 값, 조건을 만족하는 해시 값)
     """
     nonce = 0
-    target = '0' * DIFFICULTY
     
     while True:
         # 1. Nonce와 데이터를 결합하여 추측(guess) 문자열 생성
@@ -66,8 +111,8 @@ def proof_of_work(last_block_hash, transactions):
         # 2. 해시 계산
         guess_hash = hasher.sha256(data_to_hash.encode('utf-8')).hexdigest()
         
-        # 3. 목표(target)와 일치하는지 확인
-        if guess_hash.startswith(target):
+        # 3. 목표(target)보다 작은지 확인
+        if meets_target(guess_hash, target):
             # print(f"PoW Found! Nonce: {nonce}, Hash: {guess_hash}") # (디버깅용)
             return nonce, guess_hash # 정답을 찾으면 Nonce와 해시 반환
         
@@ -75,13 +120,81 @@ def proof_of_work(last_block_hash, transactions):
         nonce += 1
 
 
+def proof_of_work_from_state(prefix_state, target):
+    """
+    proof_of_work와 같은 작업증명이지만, (이전 해시 + 거래 내역)까지 해시한 상태에서 시작합니다.
+    매 Nonce마다 앞부분을 다시 직렬화하거나 해시할 필요가 없어, 거래 수와 관계없이 바로 탐색을 시작합니다.
+
+    Args:
+        prefix_state: str(last_block_hash) + str(transactions)를 update한 hashlib.sha256 객체
+        target (int): 작업증명 목표값
+
+    Returns:
+        (int, str): (찾아낸 Nonce 값, 조건을 만족하는 해시 값)
+    """
+    nonce = 0
+    # 32바이트 digest를 목표값의 바이트와 바로 비교 (hexdigest와 int 변환 없이)
+    limit = target_bytes(target)
+
+    while True:
+        guess = prefix_state.copy()
+        guess.update(str(nonce).encode('utf-8'))
+
+        if guess.digest() < limit:
+            return nonce, guess.hexdigest()
+
+        nonce += 1
+
+
+class BlockTemplate:
+    """
+    바로 채굴할 수 있는 블록 템플릿을 유지합니다.
+    PoW가 해시하는 문자열은 str(last_block_hash) + str(거래 목록) + str(nonce)이므로,
+    이전 해시와 Mempool의 거래를 받을 때마다 SHA-256 상태에 이어서 넣어 둡니다.
+    채굴을 시작할 때는 이 상태를 복사해 보상 트랜잭션만 덧붙이면 되므로, Mempool 크기와 관계없이 일정한 시간이 걸립니다.
+    """
+
+    def __init__(self, miner_address):
+        self.reward_tx = { "from": "network", "to": miner_address, "amount": 1 }
+        self.last_hash = None
+
+    def reset(self, last_hash, transactions):
+        """
+        체인의 마지막 블록이 바뀌었을 때 템플릿을 새로 만듭니다.
+        """
+        self.last_hash = last_hash
+        self.tx_count = 0
+        # str(list)는 '[' + ', '.join(repr(tx) ...) + ']' 형태이므로 같은 순서로 해시합니다.
+        self.state = hasher.sha256((str(last_hash) + '[').encode('utf-8'))
+        for tx in transactions:
+            self.add_transaction(tx)
+
+    def add_transaction(self, tx):
+        """
+        Mempool에 새로 들어온 거래를 템플릿에 추가합니다.
+        """
+        separator = ', ' if self.tx_count else ''
+        self.state.update((separator + str(tx)).encode('utf-8'))
+        self.tx_count += 1
+
+    def prefix_state(self):
+        """
+        보상 트랜잭션까지 포함한 (이전 해시 + 거래 목록)의 해시 상태를 반환합니다.
+        """
+        state = self.state.copy()
+        separator = ', ' if self.tx_count else ''
+        state.update((separator + str(self.reward_tx) + ']').encode('utf-8'))
+        return state
+
+
 def create_genesis_block():
     """
     첫 번째 제네시스 블록을 생성합니다.
     """
     genesis_data = {
         "transactions": [],
-        "nonce": 0 # 제네시스 블록은 PoW가 필요 없으므로 0
+        "nonce": 0, # 제네시스 블록은 PoW가 필요 없으므로 0
+        "target": difficulty.initial_target
     }
     genesis_block = Block(0, date.datetime.now(), genesis_data, "0")
     
@@ -97,7 +210,7 @@ def is_chain_valid(chain):
     """
     전달받은 블록체인이 유효한지 검증합니다.
     1. 각 블록의 'previous_hash'가 이전 블록의 'hash'와 일치하는가?
-    2. 각 블록의 해시가 'DIFFICULTY' 조건을 만족(PoW)하는가?
+    2. 각 블록의 목표값이 난이도 재조정 규칙과 맞고, 해시가 목표값보다 작은가(PoW)?
     """
     
     # 1. 제네시스 블록 검증 (간단히 통과)
@@ -106,8 +219,6 @@ def is_chain_valid(chain):
     
     last_block = chain[0]
     current_index = 1
-    
-    target = '0' * DIFFICULTY
 
     while current_index < len(chain):
         block = chain[current_index]
@@ -117,15 +228,11 @@ def is_chain_valid(chain):
             print(f"Validation Error: Block {current_index} previous_hash mismatch.")
             return False
         
-        # (검증 2) 작업증명(PoW) 검증
-        # 블록에 저장된 Nonce와 데이터로 해시를 다시 계산해봄
-        data_to_hash = (str(last_block.hash) + 
-                        str(block.data['transactions']) + 
-                        str(block.data['nonce']))
-        
-        recalculated_hash = hasher.sha256(data_to_hash.encode('utf-8')).hexdigest()
-        
-        if not recalculated_hash.startswith(target):
+        # (검증 2) 작업증명(PoW) 검증: 목표값이 재조정 규칙과 맞고, Nonce와 데이터로 다시 계산한 해시가 목표값보다 작은가
+        # (PoA 모드에서는 권한자 서명 검증)
+        target = None if authority is not None else \
+            difficulty.next_target(current_index, last_block.data['target'], lambda h: timestamp_seconds(chain[h].timestamp))
+        if not valid_seal(last_block.hash, block.data, target, block.index, block.timestamp):
             print(f"Validation Error: Block {current_index} PoW is invalid.")
             return False
             
@@ -138,6 +245,93 @@ def is_chain_valid(chain):
         
     return True # 모든 검증 통과
 
+
+def seal_message(index, timestamp, previous_hash, data):
+    """
+    PoA 모드에서 권한자가 서명하는 내용: 서명을 뺀 블록 전체 (index, 타임스탬프, 거래 내역, 권한자, 이전 해시).
+    블록 해시와 같은 방식으로 문자열을 만들므로, 서명 뒤에 index나 타임스탬프를 바꾼 블록은 서명이 맞지 않습니다.
+    """
+    unsigned = {k: v for k, v in data.items() if k != 'signature'}
+    return (str(index) + str(timestamp) + str(unsigned) + str(previous_hash)).encode('utf-8')
+
+
+def valid_seal(last_block_hash, data, target, index, timestamp):
+    """
+    블록 data가 합의 규칙을 만족하는지 확인합니다.
+    작업증명: data의 목표값이 target과 같고, (이전 해시 + 거래 내역 + Nonce)의 해시가 목표값보다 작은가?
+    PoA 모드: 설정된 권한자가 서명을 뺀 블록 전체(seal_message)에 서명했는가?
+    """
+    if authority is not None:
+        return authority.verify(data.get('authority'), seal_message(index, timestamp, last_block_hash, data),
+                                data.get('signature'))
+    if data.get('target') != target:
+        return False
+
+    data_to_hash = (str(last_block_hash) +
+                    str(data['transactions']) +
+                    str(data['nonce']))
+    recalculated_hash = hasher.sha256(data_to_hash.encode('utf-8')).hexdigest()
+    return meets_target(recalculated_hash, target)
+
+
+def valid_block_link(last_block_hash, block_data, target):
+    """
+    block_data(JSON 딕셔너리)가 해시가 last_block_hash인 블록 바로 다음 블록으로 올바른지
+    (이전 해시 연결, 목표값, 작업증명) 확인합니다.
+    """
+    if block_data['previous_hash'] != last_block_hash:
+        return False
+    return valid_seal(last_block_hash, block_data['data'], target, block_data['index'], block_data['timestamp'])
+
+
+def chain_data_target(chain_data, height):
+    """
+    chain_data(JSON 딕셔너리 리스트)의 height번째 블록이 써야 하는 목표값 (PoA 모드에서는 None)
+    """
+    if authority is not None:
+        return None
+    return difficulty.next_target(height, chain_data[height - 1]['data']['target'],
+                                  lambda h: timestamp_seconds(chain_data[h]['timestamp']))
+
+
+def validate_chain_data(chain_data):
+    """
+    피어에게서 받은 체인(JSON 딕셔너리 리스트)을 Block 객체로 바꾸지 않고 검증합니다.
+    마지막 블록부터 확인하여 가짜 긴 체인을 싸게 거절하고, 그다음 앞에서부터 검증하다
+    처음 잘못된 블록에서 멈춥니다. 블록 해시는 비교에 필요할 때만 한 번씩 계산합니다.
+
+    Returns:
+        list: 검증 중 계산한 블록 해시들 (마지막 블록 제외). 유효하지 않으면 None
+    """
+    try:
+        # (검증 0) 구조: 각 블록의 index가 위치와 맞는가? (해시 계산 없음)
+        if any(b['index'] != i for i, b in enumerate(chain_data)):
+            print("Validation Error: block indexes are out of order.")
+            return None
+
+        # (검증 1) 마지막 블록(tip)부터: 해시 한 번으로 가짜 체인 대부분을 거절
+        if len(chain_data) > 1:
+            before_tip = chain_data[-2]
+            tip_parent_hash = calculate_block_hash(before_tip['index'], before_tip['timestamp'],
+                                                   before_tip['data'], before_tip['previous_hash'])
+            if not valid_block_link(tip_parent_hash, chain_data[-1], chain_data_target(chain_data, len(chain_data) - 1)):
+                print("Validation Error: tip block is invalid.")
+                return None
+
+        # (검증 2) 앞에서부터 차례로 연결과 작업증명 검증, 처음 잘못된 블록에서 중단
+        hashes = []
+        for i in range(1, len(chain_data)):
+            last = chain_data[i - 1]
+            last_hash = calculate_block_hash(last['index'], last['timestamp'], last['data'], last['previous_hash'])
+            hashes.append(last_hash)
+            if not valid_block_link(last_hash, chain_data[i], chain_data_target(chain_data, i)):
+                print(f"Validation Error: Block {i} is invalid.")
+                return None
+        return hashes
+    except (KeyError, TypeError, ValueError):
+        print("Validation Error: malformed block data.")
+        return None
+
 # =============================================================================
 # ## 4. Flask 서버 및 API 설정
 # =============================================================================
@@ -150,8 +344,36 @@ miner_address = "q3nf394hjg-random-miner-address-34nf3i4nflkn3oi"
 peer_nodes = []
 # 이 노드의 임시 거래 내역 (Mempool)
 this_nodes_transactions = []
+# Mempool과 블록 템플릿은 Flask 요청 스레드들이 함께 바꾸므로 mempool_lock 안에서만 바꿈
+# (블록 템플릿은 Mempool의 거래 순서 그대로 해시하므로 둘을 한 번에 바꿔야 함)
+mempool_lock = threading.Lock()
+# 체인 끝을 바꾸는 작업(채굴한 블록 추가, 릴레이된 블록 추가, 체인 교체)을 하나씩 처리.
+# mempool_lock과 함께 잡을 때는 block_lock을 먼저 잡음
+block_lock = threading.Lock()
+# /mine 요청은 한 번에 하나씩 (동시에 채굴하면 서로의 Mempool을 떼어 가고 같은 높이의 블록을 만듦)
+mine_lock = threading.Lock()
 # 블록체인 (리스트)
 blockchain = [create_genesis_block()]
+# 바로 채굴할 수 있도록 Mempool과 함께 갱신되는 블록 템플릿
+block_template = BlockTemplate(miner_address)
+block_template.reset(blockchain[-1].hash, this_nodes_transactions)
+# /blocks 응답(JSON 및 압축본)을 마지막 블록이 바뀔 때까지 캐시
+blocks_cache = TipPayloadCache()
+# 피어별로 마지막으로 받은 체인의 ETag (변경이 없으면 304로 응답받습니다)
+peer_etags = {}
+# 거래 수신 입장 제어 (Mempool 크기 제한, 클라이언트별 속도 제한)
+admission = AdmissionController()
+# 압축 블록 릴레이: 부족한 거래를 기다리는 블록들과 릴레이 통계
+partial_blocks = {}
+relay_lock = threading.Lock()
+relay_stats = {
+    'blocks_relayed': 0,
+    'full_bytes': 0,
+    'relay_bytes': 0,
+    'blocks_received': 0,
+    'reconstructed_from_mempool': 0,
+    'transactions_requested': 0,
+}
 
 
 @node.route('/txion', methods=['POST'])
@@ -160,55 +382,120 @@ def transaction():
     새로운 거래를 POST로 받아 Mempool에 추가
     """
     if request.method == 'POST':
-        new_txion = request.get_json()
-        this_nodes_transactions.append(new_txion)
+        # Mempool이 가득 찼거나 클라이언트가 너무 빨리 보내면 429로 거절
+        admitted, retry_after = admission.admit(request.remote_addr, len(this_nodes_transactions))
+        if not admitted:
+            return Response("Too many transactions, try again later\n", status=429,
+                            headers={'Retry-After': str(retry_after)})
+
+        # 바이너리 인코딩(wire)으로 보낸 거래도 받음
+        if wire.is_wire(request.content_type):
+            try:
+                new_txion = wire.decode(request.get_data())
+            except ValueError:
+                return "Invalid transaction\n", 400
+        else:
+            new_txion = request.get_json()
+        with mempool_lock:
+            this_nodes_transactions.append(new_txion)
+            block_template.add_transaction(new_txion)
+        admission.record_accepted()
         
         print(f"New transaction added: {new_txion}")
         return "Transaction submission successful\n", 201
 
+@node.route('/metrics/admission', methods=['GET'])
+def admission_metrics():
+    """
+    거래 수신 큐의 깊이와 수락/거절 횟수를 반환
+    """
+    return json.dumps(admission.metrics(len(this_nodes_transactions))), 200
+
 @node.route('/mine', methods=['GET'])
 def mine():
     """
-    '/mine' 요청 시, Mempool의 거래내역으로 새 블록을 채굴 (PoW 수행)
+    '/mine' 요청 시, Mempool의 거래내역으로 새 블록을 채굴 (PoW 수행, PoA 모드에서는 서명)
+    """
+    if authority is not None and authority.signer is None:
+        return "This node is not an authority\n", 403
+    with mine_lock:
+        return mine_block()
+
+def mine_block():
+    """
+    Mempool의 거래로 블록 하나를 채굴하여 체인에 추가 (mine_lock 안에서 호출)
     """
     global this_nodes_transactions
-    
+
     # 1. 마지막 블록 정보 가져오기
     last_block = blockchain[-1]
     last_hash = last_block.hash
-    
-    # 2. 채굴 보상 트랜잭션 추가
-    reward_tx = { "from": "network", "to": miner_address, "amount": 1 }
-    # (중요) Mempool의 복사본을 만들어 보상 트랜잭션을 추가
-    transactions_for_new_block = list(this_nodes_transactions)
-    transactions_for_new_block.append(reward_tx)
-    
+
+    # 2. 템플릿에서 (보상 트랜잭션까지 포함한) 해시 상태를 가져옴
+    # (중요) 지금까지의 Mempool을 이 블록의 거래 목록으로 떼어 내고 보상 트랜잭션을 추가.
+    # 채굴 중에 들어오는 거래는 새 Mempool에 쌓여 다음 블록에 담깁니다.
+    # 해시 상태와 떼어 내는 거래 목록이 같도록, 그 사이에 거래가 들어오지 못하게 함
+    with mempool_lock:
+        if block_template.last_hash != last_hash:
+            block_template.reset(last_hash, this_nodes_transactions)
+        prefix_state = block_template.prefix_state()
+        transactions_for_new_block = this_nodes_transactions
+        transactions_for_new_block.append(block_template.reward_tx)
+        this_nodes_transactions = []
+        block_template.reset(last_hash, this_nodes_transactions)
+
     # 3. 작업증명(PoW) 수행
-    # (여기서 서버가 잠시 멈춥니다. DIFFICULTY가 높으면 몇 초~몇 분)
-    print("Mining new block...")
-    nonce, new_hash = proof_of_work(last_hash, transactions_for_new_block)
-    print(f"Mining complete. Found Nonce: {nonce}")
-
-    # 4. 새 블록 데이터 구성
-    new_block_data = {
-        "transactions": transactions_for_new_block,
-        "nonce": nonce
-    }
-    
-    # 5. 새 블록 생성 및 체인에 추가
-    new_block = Block(
-        index=last_block.index + 1,
-        timestamp=date.datetime.now(),
-        data=new_block_data,
-        previous_hash=last_hash
-    )
-    # (참고: 실제로는 new_hash와 new_block.hash가 일치하는지 한번 더 검증해야 함)
-    blockchain.append(new_block)
-    
-    # 6. Mempool 비우기
-    this_nodes_transactions = []
-    
-    # 7. 클라이언트에 결과 반환
+    # (여기서 서버가 잠시 멈춥니다. 목표값이 작을수록(난이도가 높을수록) 오래 걸림)
+    # PoA 모드에서는 작업증명 대신 권한자 키로 서명
+    # (PoA 서명은 타임스탬프를 포함한 블록 전체에 하므로 타임스탬프를 먼저 정함)
+    if authority is not None:
+        timestamp = date.datetime.now()
+        unsigned = {"transactions": transactions_for_new_block, "authority": authority.signer}
+        signature = authority.sign(authority.signer, seal_message(last_block.index + 1, timestamp, last_hash, unsigned))
+        seal = {"authority": authority.signer, "signature": signature}
+    else:
+        print("Mining new block...")
+        target = next_block_target(blockchain)
+        nonce, new_hash = proof_of_work_from_state(prefix_state, target)
+        print(f"Mining complete. Found Nonce: {nonce}")
+        seal = {"nonce": nonce, "target": target}
+        timestamp = date.datetime.now()
+
+    with block_lock:
+        # 채굴하는 동안 피어가 릴레이한 블록이 먼저 추가되었으면 이 블록은 버리고,
+        # 새 블록들에 들어가지 않은 거래를 Mempool로 되돌림 (보상 트랜잭션 제외)
+        if blockchain[-1] is not last_block:
+            included = {tx_hash(tx) for block in blockchain[last_block.index + 1:] for tx in block.data['transactions']}
+            with mempool_lock:
+                this_nodes_transactions = [tx for tx in transactions_for_new_block[:-1]
+                                           if tx_hash(tx) not in included] + this_nodes_transactions
+                block_template.reset(blockchain[-1].hash, this_nodes_transactions)
+            return "Mining interrupted: a new block arrived first\n", 409
+
+        # 4. 새 블록 데이터 구성
+        new_block_data = {
+            "transactions": transactions_for_new_block,
+            **seal
+        }
+
+        # 5. 새 블록 생성 및 체인에 추가
+        new_block = Block(
+            index=last_block.index + 1,
+            timestamp=timestamp,
+            data=new_block_data,
+            previous_hash=last_hash
+        )
+        # (참고: 실제로는 new_hash와 new_block.hash가 일치하는지 한번 더 검증해야 함)
+        blockchain.append(new_block)
+
+        # 6. 새 마지막 블록 위에 템플릿을 다시 만듦 (Mempool은 채굴 시작 시 이미 비움)
+        with mempool_lock:
+            block_template.reset(new_block.hash, this_nodes_transactions)
+
+    # 7. 피어들에게 새 블록을 압축 블록으로 알림 (백그라운드)
+    threading.Thread(target=relay_block, args=(new_block,), daemon=True).start()
+
+    # 8. 클라이언트에 결과 반환
     return json.dumps({
         "index": new_block.index,
         "timestamp": str(new_block.timestamp),
@@ -216,22 +503,219 @@ def mine():
         "hash": new_block.hash
     }), 200
 
+def compact_header(block):
+    """
+    압축 블록에 넣을 헤더. 블록 해시가 거래 목록까지 커밋하므로, 받는 쪽은 복원한 블록의 해시로 검증합니다.
+    seal은 거래 목록을 뺀 블록 data (Nonce와 목표값, 또는 권한자 서명)입니다.
+    """
+    return {
+        "index": block.index,
+        "timestamp": str(block.timestamp),
+        "seal": {k: v for k, v in block.data.items() if k != 'transactions'},
+        "hash": block.hash,
+        "previous_hash": block.previous_hash
+    }
+
+def relay_block(block):
+    """
+    새 블록을 모든 피어에게 헤더 + 짧은 거래 ID로 릴레이하고, 피어의 Mempool에 없던 거래만 추가로 보냄
+    """
+    transactions = block.data['transactions']
+    # 채굴 보상 거래(마지막 거래)는 피어의 Mempool에 있을 수 없으므로 그대로 보냄
+    compact = make_compact(compact_header(block), transactions, block.hash, prefill=(-1,))
+    full_bytes = len(wire.encode({
+        "index": block.index,
+        "timestamp": str(block.timestamp),
+        "data": block.data,
+        "hash": block.hash,
+        "previous_hash": block.previous_hash
+    }))
+    headers = {'Content-Type': wire.CONTENT_TYPE, 'Accept': wire.ACCEPT}
+
+    for node_url in peer_nodes:
+        body = wire.encode(compact)
+        sent = len(body)
+        try:
+            response = requests.post(node_url + "/blocks/compact", data=body, headers=headers, timeout=10)
+            response.raise_for_status()
+            values = wire.parse_response(response)
+            if values['status'] == 'missing':
+                body = wire.encode({
+                    'hash': block.hash,
+                    'transactions': [[i, transactions[i]] for i in values['missing'] if 0 <= i < len(transactions)],
+                })
+                sent += len(body)
+                response = requests.post(node_url + "/blocks/compact/transactions", data=body, headers=headers,
+                                         timeout=10)
+                response.raise_for_status()
+        except (requests.exceptions.RequestException, ValueError, KeyError) as e:
+            print(f"Could not relay block {block.index} to node {node_url}: {e}")
+            continue
+
+        with relay_lock:
+            relay_stats['blocks_relayed'] += 1
+            relay_stats['full_bytes'] += full_bytes
+            relay_stats['relay_bytes'] += sent
+
+def finish_partial_block(partial):
+    """
+    거래 목록이 채워진 압축 블록을 검증하여 체인에 추가
+    :return: (상태, 부족한 거래 위치 목록)
+    """
+    global this_nodes_transactions
+
+    header = partial.header
+    if partial.complete:
+        data = {"transactions": partial.transactions, **header['seal']}
+        # 블록 해시(거래 목록 포함)와 목표값, 작업증명이 맞는지 확인. 틀리면 Mempool에서 가져온 거래도 다시 요청
+        valid = (calculate_block_hash(header['index'], header['timestamp'], data, header['previous_hash']) == header['hash']
+                 and valid_block_link(header['previous_hash'],
+                                      {"index": header['index'], "timestamp": header['timestamp'],
+                                       "previous_hash": header['previous_hash'], "data": data},
+                                      next_block_target(blockchain)))
+        if not valid and not partial.distrust_mempool():
+            return 'invalid', []
+
+    if not partial.complete:
+        with relay_lock:
+            partial_blocks[header['hash']] = partial
+            while len(partial_blocks) > MAX_PARTIAL_BLOCKS:
+                del partial_blocks[next(iter(partial_blocks))]
+            relay_stats['transactions_requested'] += len(partial.missing)
+        return 'missing', partial.missing
+
+    with block_lock:
+        # 거래를 기다리는(또는 검증하는) 동안 우리 체인이 바뀌었을 수 있음
+        last_block = blockchain[-1]
+        if header['previous_hash'] != last_block.hash or header['index'] != last_block.index + 1:
+            return 'orphan', []
+
+        blockchain.append(Block(header['index'], header['timestamp'], data, header['previous_hash'], header['hash']))
+
+        # 블록에 들어간 거래를 Mempool에서 지우고 새 마지막 블록 위에 템플릿을 다시 만듦
+        included = {tx_hash(tx) for tx in data['transactions']}
+        with mempool_lock:
+            this_nodes_transactions = [tx for tx in this_nodes_transactions if tx_hash(tx) not in included]
+            block_template.reset(header['hash'], this_nodes_transactions)
+    return 'accepted', []
+
+@node.route('/blocks/compact', methods=['POST'])
+def receive_compact_block():
+    """
+    피어가 릴레이한 압축 블록을 우리 Mempool의 거래로 복원
+    """
+    try:
+        compact = wire.decode(request.get_data()) if wire.is_wire(request.content_type) else request.get_json()
+        header = compact['header']
+        index = header['index']
+
+        if index < len(blockchain):
+            status = 'known' if blockchain[index].hash == header['hash'] else 'stale'
+            result = (status, [])
+        elif index != len(blockchain) or header['previous_hash'] != blockchain[-1].hash:
+            # 피어의 체인이 우리보다 앞서 있으면 합의 알고리즘으로 따라잡음
+            threading.Thread(target=run_consensus, daemon=True).start()
+            result = ('orphan', [])
+        else:
+            with relay_lock:
+                relay_stats['blocks_received'] += 1
+            with mempool_lock:
+                mempool = list(this_nodes_transactions)
+            partial = PartialBlock(compact, header['hash'], mempool)
+            if partial.complete:
+                with relay_lock:
+                    relay_stats['reconstructed_from_mempool'] += 1
+            result = finish_partial_block(partial)
+    except (KeyError, TypeError, ValueError):
+        return "Invalid compact block\n", 400
+
+    body = {'status': result[0], 'missing': result[1]}
+    if wire.accepts(request.headers.get('Accept')):
+        return Response(wire.encode(body), status=200, content_type=wire.CONTENT_TYPE)
+    return json.dumps(body), 200
+
+@node.route('/blocks/compact/transactions', methods=['POST'])
+def receive_compact_transactions():
+    """
+    압축 블록을 복원하는 데 부족했던 거래들을 받아 블록을 완성
+    """
+    try:
+        values = wire.decode(request.get_data()) if wire.is_wire(request.content_type) else request.get_json()
+        with relay_lock:
+            partial = partial_blocks.pop(values['hash'], None)
+        if partial is None:
+            result = ('unknown', [])
+        else:
+            partial.fill(values['transactions'])
+            result = finish_partial_block(partial)
+    except (KeyError, TypeError, ValueError):
+        return "Invalid transactions\n", 400
+
+    body = {'status': result[0], 'missing': result[1]}
+    if wire.accepts(request.headers.get('Accept')):
+        return Response(wire.encode(body), status=200, content_type=wire.CONTENT_TYPE)
+    return json.dumps(body), 200
+
+@node.route('/metrics/relay', methods=['GET'])
+def relay_metrics():
+    """
+    압축 블록 릴레이로 보낸 바이트와 전체 블록 크기 비교
+    """
+    return json.dumps(relay_stats), 200
+
+@node.route('/difficulty', methods=['GET'])
+def difficulty_info():
+    """
+    현재 목표값과 최근 블록 간격, 네트워크 해시 속도 추정치를 반환 (PoA 모드에서는 404)
+    """
+    if authority is not None:
+        return "This node does not use proof of work\n", 404
+    chain = blockchain
+    # 제네시스 블록의 타임스탬프는 노드가 시작한 시각이므로 뺌
+    window = [(timestamp_seconds(block.timestamp), block.data['target'])
+              for block in chain[max(len(chain) - difficulty.retarget_interval - 1, 1):]]
+    target = next_block_target(chain)
+    return json.dumps({
+        "height": len(chain),
+        "target": chain[-1].data['target'],
+        "next_target": target,
+        "difficulty": relative_difficulty(target),
+        "target_block_time": difficulty.target_block_time,
+        "retarget_interval": difficulty.retarget_interval,
+        "blocks_until_retarget": difficulty.blocks_until_retarget(len(chain)),
+        "average_block_time": (window[-1][0] - window[0][0]) / (len(window) - 1) if len(window) > 1 else None,
+        "hash_rate": estimate_hash_rate(window),
+    }), 200
+
 @node.route('/blocks', methods=['GET'])
 def get_blocks():
     """
     현재 노드의 전체 블록체인을 JSON으로 반환
     """
-    # Block 객체를 JSON으로 변환하기 위해 딕셔너리로 변환
-    chain_to_send = []
-    for block in blockchain:
-        chain_to_send.append({
-            "index": block.index,
-            "timestamp": str(block.timestamp),
-            "data": block.data,
-            "hash": block.hash,
-            "previous_hash": block.previous_hash
-        })
-    return json.dumps(chain_to_send), 200
+    chain = blockchain
+
+    def build():
+        # Block 객체를 JSON으로 변환하기 위해 딕셔너리로 변환
+        chain_to_send = []
+        for block in chain:
+            chain_to_send.append({
+                "index": block.index,
+                "timestamp": str(block.timestamp),
+                "data": block.data,
+                "hash": block.hash,
+                "previous_hash": block.previous_hash
+            })
+        return chain_to_send
+
+    # 마지막 블록의 해시가 체인 전체를 커밋하므로 ETag 키로 사용
+    status, headers, body = blocks_cache.respond(
+        f"{chain[-1].hash}-{len(chain)}",
+        build,
+        if_none_match=request.headers.get('If-None-Match'),
+        accept_encoding=request.headers.get('Accept-Encoding'),
+        accept=request.headers.get('Accept'),
+    )
+    return Response(body, status=status, headers=headers)
 
 @node.route('/consensus', methods=['GET'])
 def run_consensus():
@@ -247,22 +731,35 @@ def run_consensus():
     longest_chain = list(blockchain) # 일단 내 체인을 가장 긴 체인으로
     chain_replaced = False
 
-    for chain_data in other_chains:
-        # JSON 딕셔너리 리스트를 Block 객체 리스트로 변환
-        chain = [Block(b['index'], b['timestamp'], b['data'], b['previous_hash']) for b in chain_data]
-        
-        # (검증 1) 내 체인보다 긴가?
-        if len(chain) > current_len:
-            # (검증 2) 유효한 체인인가? (PoW, 해시 연결)
-            if is_chain_valid(chain):
-                current_len = len(chain)
-                longest_chain = chain
-                chain_replaced = True
-            else:
-                print(f"Received chain from peer is longer but INVALID.")
-    
+    # 긴 체인부터 확인하면, 유효한 체인을 찾은 뒤 나머지는 길이만 보고 건너뜀
+    for chain_data in sorted(other_chains, key=len, reverse=True):
+        # (검증 1) 내 체인보다 긴가? (Block 객체를 만들기 전에 길이부터 확인)
+        if len(chain_data) <= current_len:
+            continue
+
+        # (검증 2) 유효한 체인인가? (PoW, 해시 연결) - JSON 딕셔너리 상태로 검증
+        hashes = validate_chain_data(chain_data)
+        if hashes is None:
+            print(f"Received chain from peer is longer but INVALID.")
+            continue
+
+        # 검증을 통과한 체인만 Block 객체로 변환 (검증 중 계산한 해시 재사용, 마지막 블록은 필요할 때 계산)
+        hashes.append(None)
+        chain = [Block(b['index'], b['timestamp'], b['data'], b['previous_hash'], h)
+                 for b, h in zip(chain_data, hashes)]
+        current_len = len(chain)
+        longest_chain = chain
+        chain_replaced = True
+
+    if chain_replaced:
+        with block_lock:
+            # 검증하는 동안 우리 체인이 새 체인만큼 길어졌으면 교체하지 않음
+            chain_replaced = len(longest_chain) > len(blockchain)
+            if chain_replaced:
+                blockchain = longest_chain # 유효하고 가장 긴 체인으로 교체
+                with mempool_lock:
+                    block_template.reset(blockchain[-1].hash, this_nodes_transactions)
     if chain_replaced:
-        blockchain = longest_chain # 유효하고 가장 긴 체인으로 교체
         return "Consensus run: Chain was replaced with the longest valid chain.\n", 200
     else:
         return "Consensus run: Our chain remains authoritative.\n", 200
@@ -274,11 +771,18 @@ def find_new_chains():
     other_chains = []
     for node_url in peer_nodes:
         try:
-            response = requests.get(node_url + "/blocks")
+            # 피어가 지원하면 JSON 대신 바이너리 인코딩으로 받음
+            headers = {'Accept': wire.ACCEPT}
+            if node_url in peer_etags:
+                headers['If-None-Match'] = peer_etags[node_url]
+            response = requests.get(node_url + "/blocks", headers=headers)
+            # 304: 지난번 이후 피어의 체인이 바뀌지 않았으므로 다시 확인할 필요가 없음
             if response.status_code == 200:
-                chain_data = response.json()
+                chain_data = wire.parse_response(response)
                 other_chains.append(chain_data)
-        except requests.exceptions.RequestException as e:
+                if 'ETag' in response.headers:
+                    peer_etags[node_url] = response.headers['ETag']
+        except (requests.exceptions.RequestException, ValueError) as e:
             print(f"Error connecting to node {node_url}: {e}")
     return other_chains
 
@@ -288,18 +792,30 @@ def find_new_chains():
 # =============================================================================
 
 if __name__ == '__main__':
-    if len(sys.argv) > 1:
-        port = int(sys.argv[1])
-    else:
-        port = 5000
-    
+
+    from argparse import ArgumentParser
+    parser = ArgumentParser()
+    parser.add_argument('port', nargs='?', default=5000, type=int, help='port to listen on')
+    parser.add_argument('--consensus', default='pow', choices=['pow', 'poa'],
+                        help='consensus: proof of work or proof of authority (dev/bench networks only)')
+    parser.add_argument('--authority-keys', default=None, help='authority key file for proof of authority')
+    parser.add_argument('--authority', default=None, help='authority name this node signs blocks with')
+    args = parser.parse_args()
+    port = args.port
+
+    if args.consensus == 'poa':
+        authority = make_consensus('poa', authority_keys=args.authority_keys, authority=args.authority)
+
     if port == 5000:
         peer_nodes.append('http://127.0.0.1:5001')
     elif port == 5001:
         peer_nodes.append('http://127.0.0.1:5000')
     
     print(f"Starting SnakeCoin node on port {port}")
-    print(f"PoW Difficulty set to: {DIFFICULTY}")
+    if authority is not None:
+        print(f"Proof of authority: {sorted(authority.keys)}, signing as {authority.signer}")
+    else:
+        print(f"PoW target block time: {difficulty.target_block_time}s, retarget every {difficulty.retarget_interval} blocks")
     print(f"Peer nodes: {peer_nodes}")
     
-    node.run(host='127.0.0.1', port=port)
\ No newline at end of file
+    node.run(host='127.0.0.1', port=port)
@@ -0,0 +1,172 @@
+import hashlib
+import json
+import math
+import os
+
+
+# 이 간격(블록 수)마다 블록 헤더에 상태 루트(state_root)를 넣고 스냅샷을 남깁니다.
+# 모든 노드가 같은 값을 써야 하는 합의 규칙입니다.
+STATE_INTERVAL = 100
+
+# 거래의 필드. nonce는 거래를 만든 쪽이 정하는 임의의 문자열이어서, 같은 사람에게 같은 금액을 두 번 보내도
+# 두 거래의 해시(거래 ID)가 다릅니다. nonce까지 같은 거래는 같은 거래를 다시 보낸 것으로 보고 거절합니다.
+TRANSACTION_FIELDS = frozenset(('sender', 'recipient', 'amount', 'nonce'))
+MAX_NONCE_LENGTH = 64
+
+
+def valid_amount(amount) -> bool:
+    """
+    거래 금액이 0보다 큰 유한한 숫자인지 확인합니다 (True/False는 숫자로 보지 않습니다).
+    """
+    return isinstance(amount, (int, float)) and not isinstance(amount, bool) and math.isfinite(amount) and amount > 0
+
+
+def valid_transaction(tx) -> bool:
+    """
+    상태에 적용할 수 있는 거래인지 확인합니다: 보내는 사람과 받는 사람이 문자열이고 금액이 올바라야 합니다.
+    nonce는 없어도 되지만 (nonce가 생기기 전의 블록), 있으면 MAX_NONCE_LENGTH자 이하의 문자열이어야 합니다.
+    """
+    if not isinstance(tx, dict) or not isinstance(tx.get('sender'), str) or not isinstance(tx.get('recipient'), str):
+        return False
+    nonce = tx.get('nonce', '')
+    return valid_amount(tx.get('amount')) and isinstance(nonce, str) and len(nonce) <= MAX_NONCE_LENGTH
+
+
+class ChainState:
+    """
+    체인의 거래를 처음부터 적용하여 얻는 파생 상태 (주소별 잔액, 거래 수).
+    보낸 사람이 "0"인 거래는 채굴 보상으로 새로 발행된 코인입니다.
+    """
+
+    def __init__(self, height: int = 0, block_hash: str = None, balances: dict = None, tx_count: int = 0):
+        self.height = height
+        self.block_hash = block_hash
+        self.balances = balances if balances is not None else {}
+        self.tx_count = tx_count
+
+    def copy(self) -> 'ChainState':
+        return ChainState(self.height, self.block_hash, dict(self.balances), self.tx_count)
+
+    def apply_transactions(self, transactions: list):
+        """
+        거래들을 적용합니다. 하나라도 잘못된 거래가 있으면 아무것도 바꾸지 않고 ValueError를 일으킵니다.
+        """
+        if not all(valid_transaction(tx) for tx in transactions):
+            raise ValueError('Cannot apply transactions with an invalid sender, recipient or amount')
+        balances = self.balances
+        for tx in transactions:
+            amount = tx['amount']
+            if tx['sender'] != '0':
+                balances[tx['sender']] = balances.get(tx['sender'], 0) - amount
+            balances[tx['recipient']] = balances.get(tx['recipient'], 0) + amount
+        self.tx_count += len(transactions)
+
+    def check_block(self, block: dict):
+        """
+        블록을 이 상태에 적용할 수 있는지 확인합니다. 블록은 거래 목록(본문)을 가지고 있어야 합니다.
+        :raise ValueError: 다음 높이의 블록이 아니거나 잘못된 거래가 있을 때
+        """
+        if block['index'] != self.height + 1:
+            raise ValueError(f"Cannot apply block {block['index']} on state at height {self.height}")
+        if not all(valid_transaction(tx) for tx in block['transactions']):
+            raise ValueError(f"Block {block['index']} has a transaction with an invalid sender, recipient or amount")
+
+    def apply_block(self, block: dict, block_hash: str):
+        """
+        블록 하나를 적용합니다. 적용할 수 없는 블록이면 상태를 바꾸지 않고 ValueError를 일으킵니다.
+        """
+        self.check_block(block)
+        self.apply_transactions(block['transactions'])
+        self.height = block['index']
+        self.block_hash = block_hash
+
+    def root(self) -> str:
+        """
+        상태 루트: 잔액과 거래 수의 SHA-256 해시. 블록 헤더에 커밋되므로 블록 해시는 포함하지 않습니다.
+        """
+        state_string = json.dumps({'balances': self.balances, 'tx_count': self.tx_count},
+                                  sort_keys=True, separators=(',', ':')).encode()
+        return hashlib.sha256(state_string).hexdigest()
+
+    def to_dict(self) -> dict:
+        return {
+            'height': self.height,
+            'block_hash': self.block_hash,
+            'state_root': self.root(),
+            'tx_count': self.tx_count,
+            'balances': self.balances,
+        }
+
+    @classmethod
+    def from_dict(cls, values: dict) -> 'ChainState':
+        """
+        스냅샷 딕셔너리에서 상태를 만들고, 내용이 state_root와 일치하는지 확인합니다.
+        :raise ValueError: 내용이 state_root와 다르거나 형식이 잘못되었을 때
+        """
+        try:
+            state = cls(int(values['height']), values['block_hash'], dict(values['balances']), int(values['tx_count']))
+            expected = values['state_root']
+        except (KeyError, TypeError, ValueError) as e:
+            raise ValueError(f'Malformed snapshot: {e}')
+        if state.root() != expected:
+            raise ValueError(f'Snapshot at height {state.height} does not match its state root')
+        return state
+
+
+class SnapshotStore:
+    """
+    상태 스냅샷을 디렉터리에 파일로 저장합니다 (snapshot-<높이>.json).
+    임시 파일에 쓰고 fsync한 뒤 이름을 바꾸므로, 중간에 멈춰도 반쯤 쓰인 스냅샷이 남지 않습니다.
+    """
+
+    def __init__(self, directory: str, keep: int = 3):
+        self.directory = directory
+        self.keep = keep
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, height: int) -> str:
+        return os.path.join(self.directory, f'snapshot-{height:010d}.json')
+
+    def heights(self) -> list:
+        heights = []
+        for name in os.listdir(self.directory):
+            if name.startswith('snapshot-') and name.endswith('.json'):
+                try:
+                    heights.append(int(name[len('snapshot-'):-len('.json')]))
+                except ValueError:
+                    continue
+        return sorted(heights, reverse=True)
+
+    def write(self, state: ChainState):
+        path = self.path(state.height)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(state.to_dict(), f, separators=(',', ':'))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+        # 이름 바꾸기까지 디스크에 남도록 디렉터리도 fsync합니다 (지원하는 OS에서만).
+        if hasattr(os, 'O_DIRECTORY'):
+            fd = os.open(self.directory, os.O_RDONLY | os.O_DIRECTORY)
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+
+        for height in self.heights()[self.keep:]:
+            os.remove(self.path(height))
+
+    def load(self, height: int) -> ChainState:
+        with open(self.path(height)) as f:
+            return ChainState.from_dict(json.load(f))
+
+    def snapshots(self):
+        """
+        저장된 스냅샷을 최신 것부터 하나씩 읽습니다. 손상된 스냅샷은 건너뜁니다.
+        """
+        for height in self.heights():
+            try:
+                yield self.load(height)
+            except (OSError, ValueError) as e:
+                print(f"Skipping snapshot at height {height}: {e}")
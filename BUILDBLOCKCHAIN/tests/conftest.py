@@ -0,0 +1,33 @@
+import os
+import sys
+
+import pytest
+
+# 노드 모듈들은 설치된 패키지가 아니라 이 디렉터리 옆에 있습니다
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from blockchain import Blockchain  # noqa: E402
+from difficulty import MAX_TARGET, DifficultyAdjuster  # noqa: E402
+
+
+def easy_chain(**kwargs) -> Blockchain:
+    """
+    가장 쉬운 목표값(해시 256번에 한 번꼴)으로 작업 증명을 하는 체인. 테스트에서 블록을 바로 만들 수 있습니다.
+    """
+    kwargs.setdefault('difficulty', DifficultyAdjuster(initial_target=MAX_TARGET))
+    return Blockchain(**kwargs)
+
+
+def mine(chain: Blockchain, transactions: int = 0, reward_address: str = 'miner') -> dict:
+    """
+    거래 transactions개와 채굴 보상을 담은 블록 하나를 만듭니다.
+    """
+    for i in range(transactions):
+        chain.new_transaction(f'sender-{i}', f'recipient-{i}', i + 1)
+    proof = chain.consensus.prove(chain, chain.last_block)
+    return chain.forge_block(chain.last_block, proof, reward_address)
+
+
+@pytest.fixture
+def chain():
+    return easy_chain()
@@ -0,0 +1,143 @@
+import asyncio
+
+import pytest
+
+import blockchain as node
+from admission import AdmissionController
+from blockchain import Blockchain
+from conftest import easy_chain
+from mining_pool import MiningCoordinator
+
+
+@pytest.fixture
+def chain(monkeypatch):
+    chain = easy_chain()
+    monkeypatch.setattr(node, 'blockchain', chain)
+    monkeypatch.setattr(node, 'coordinator', MiningCoordinator(chain, 'node', range_size=1000))
+    monkeypatch.setattr(node, 'admission', AdmissionController(max_pending=10, rate=1, burst=3))
+    return chain
+
+
+@pytest.fixture
+def client(chain):
+    return node.app.test_client()
+
+
+def payment(i: int) -> dict:
+    return {'sender': 'alice', 'recipient': 'bob', 'amount': i + 1}
+
+
+def solve(job: dict, start: int = None) -> int:
+    for proof in range(job['start'] if start is None else start, job['end']):
+        if Blockchain.valid_proof(job['last_proof'], proof, job['last_hash'], job['target']):
+            return proof
+    raise AssertionError('no proof in the job range')
+
+
+def failing_proof(job: dict) -> int:
+    return next(proof for proof in range(job['start'], job['end'])
+                if not Blockchain.valid_proof(job['last_proof'], proof, job['last_hash'], job['target']))
+
+
+def test_rate_limited_client_gets_429_with_retry_after(client):
+    for i in range(3):
+        assert client.post('/transactions/new', json=payment(i)).status_code == 201
+
+    response = client.post('/transactions/new', json=payment(3))
+    assert response.status_code == 429
+    assert int(response.headers['Retry-After']) >= 1
+
+    metrics = client.get('/metrics/admission').get_json()
+    assert metrics['accepted'] == 3
+    assert metrics['rejected_rate_limited'] == 1
+
+
+def test_full_queue_gets_429_with_retry_after(client, chain):
+    node.admission.rate = node.admission.burst = 1000
+    chain.new_transactions([payment(i) for i in range(9)])
+
+    response = client.post('/transactions/batch', json={'transactions': [payment(0), payment(1)]})
+    assert response.status_code == 429
+    assert response.headers['Retry-After'] == str(node.admission.queue_full_retry_after)
+    assert client.post('/transactions/new', json=payment(0)).status_code == 201
+    assert client.post('/transactions/new', json=payment(1)).status_code == 429
+
+
+def test_invalid_and_repeated_transactions_are_rejected(client):
+    node.admission.burst = 10
+    assert client.post('/transactions/new', json={'sender': 'alice', 'recipient': 'bob'}).status_code == 400
+    assert client.post('/transactions/new', json=dict(payment(0), amount=-1)).status_code == 400
+    body = dict(payment(0), nonce='n')
+    assert client.post('/transactions/new', json=body).status_code == 201
+    assert client.post('/transactions/new', json=body).status_code == 409
+
+
+def test_submitted_work_becomes_a_block(client, chain):
+    job = client.get('/work', query_string={'worker': 'pool-worker'}).get_json()
+    assert client.get('/work/status', query_string={'job_id': job['job_id']}).get_json() == {'current': True}
+
+    response = client.post('/work/submit', json={'job_id': job['job_id'], 'proof': str(solve(job))})
+    assert response.status_code == 200
+    assert response.get_json() == {'result': 'accepted', 'index': 2, 'previous_hash': job['last_hash']}
+    assert chain.last_block['transactions'][-1]['recipient'] == 'pool-worker'
+    assert chain.valid_chain(chain.chain)
+    assert client.get('/work/status', query_string={'job_id': job['job_id']}).get_json() == {'current': False}
+
+
+def test_submit_rejects_invalid_proofs(client, chain):
+    job = client.get('/work').get_json()
+
+    for proof in (failing_proof(job), job['end'] + solve(job) - job['start']):
+        response = client.post('/work/submit', json={'job_id': job['job_id'], 'proof': proof})
+        assert response.status_code == 409
+        assert response.get_json() == {'result': 'invalid'}
+    for proof in (-1, True, 1.5, 'abc', None):
+        assert client.post('/work/submit', json={'job_id': job['job_id'], 'proof': proof}).status_code == 400
+    assert client.post('/work/submit', json={'job_id': job['job_id']}).status_code == 400
+
+    assert len(chain.chain) == 1
+    assert client.get('/work/stats').get_json()['invalid'] == 2
+
+
+def test_submit_rejects_stale_work(client, chain):
+    job = client.get('/work').get_json()
+    proof = solve(job)
+
+    # 다른 블록이 먼저 체인에 붙으면 그 전에 나눠 준 작업은 모두 무효가 됩니다
+    assert client.get('/mine').status_code == 200
+    response = client.post('/work/submit', json={'job_id': job['job_id'], 'proof': proof})
+    assert response.status_code == 409
+    assert response.get_json() == {'result': 'stale'}
+    assert client.post('/work/submit', json={'job_id': 'unknown', 'proof': proof}).get_json() == {'result': 'stale'}
+
+    assert len(chain.chain) == 2
+    assert client.get('/work/stats').get_json()['stale'] == 2
+
+
+def test_async_node_serves_pool_routes(chain):
+    pytest.importorskip('aiohttp')
+    from aiohttp.test_utils import TestClient, TestServer
+    from async_node import AsyncNode
+
+    async def scenario():
+        async with TestClient(TestServer(AsyncNode(chain, 'node').app)) as client:
+            job = await (await client.get('/work', params={'worker': 'pool-worker'})).json()
+            invalid = await client.post('/work/submit', json={'job_id': job['job_id'], 'proof': failing_proof(job)})
+            negative = await client.post('/work/submit', json={'job_id': job['job_id'], 'proof': -1})
+            accepted = await client.post('/work/submit', json={'job_id': job['job_id'], 'proof': solve(job)})
+            stale = await client.post('/work/submit', json={'job_id': job['job_id'], 'proof': solve(job)})
+            mined = await client.get('/mine')
+            return ([(r.status, await r.json()) for r in (invalid, accepted, stale)],
+                    negative.status, mined.status)
+
+    genesis_hash = Blockchain.hash(chain.chain[0])
+    responses, negative, mined = asyncio.run(scenario())
+    assert responses == [
+        (409, {'result': 'invalid'}),
+        (200, {'result': 'accepted', 'index': 2, 'previous_hash': genesis_hash}),
+        (409, {'result': 'stale'}),
+    ]
+    assert negative == 400
+    assert mined == 200
+    assert len(chain.chain) == 3
+    assert chain.valid_chain(chain.chain)
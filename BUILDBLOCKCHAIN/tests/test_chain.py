@@ -0,0 +1,166 @@
+import pytest
+
+from blockchain import Blockchain, StateRootMismatch
+from conftest import easy_chain, mine
+from consensus import ProofOfAuthority
+from difficulty import MAX_ADJUSTMENT, DifficultyAdjuster
+from state import ChainState
+
+AUTHORITIES = {'alice': '01' * 32, 'bob': '02' * 32}
+
+
+def headers_only(chain: list) -> list:
+    return [Blockchain.header(block) for block in chain]
+
+
+def test_valid_chain_needs_bodies_from_peers(chain):
+    for _ in range(3):
+        mine(chain, transactions=2)
+    assert chain.valid_chain(chain.chain)
+
+    # 피어가 보낸 블록은 거래 목록이 있어야 합니다 (헤더만으로는 머클 루트를 확인할 수 없습니다)
+    peer_chain = chain.chain[:2] + headers_only(chain.chain[2:])
+    assert not chain.valid_chain(peer_chain)
+    assert chain.first_invalid(peer_chain) == 2
+    assert not chain.valid_chain(headers_only(chain.chain))
+
+    # 헤더만 있어도 되는 것은 bodies_from 앞의 블록뿐입니다
+    assert chain.valid_chain(headers_only(chain.chain[:3]) + chain.chain[3:], bodies_from=3)
+    assert not chain.valid_chain(headers_only(chain.chain), bodies_from=3)
+
+
+def test_valid_chain_rejects_tampered_blocks(chain):
+    for _ in range(3):
+        mine(chain, transactions=2)
+
+    forged = [dict(block) for block in chain.chain]
+    forged[2]['transactions'] = forged[2]['transactions'][:-1]
+    assert chain.first_invalid(forged) == 2
+
+    duplicated = [dict(block) for block in chain.chain]
+    duplicated[3]['transactions'] = duplicated[3]['transactions'] + duplicated[3]['transactions'][-1:]
+    assert chain.first_invalid(duplicated) == 3
+
+    unlinked = [dict(block) for block in chain.chain]
+    unlinked[1]['timestamp'] += 1
+    assert chain.first_invalid(unlinked) == 2
+
+
+def test_snapshot_matches_the_checkpoint_state_root():
+    chain = easy_chain(state_interval=3)
+    for _ in range(4):
+        mine(chain, transactions=2)
+
+    checkpoint = chain.chain[2]
+    snapshot = chain.snapshot()
+    assert snapshot.height == 3
+    assert snapshot.block_hash == Blockchain.hash(checkpoint)
+    assert snapshot.root() == checkpoint['state_root']
+    assert 'state_root' not in chain.chain[3]
+    assert chain.snapshot(2) is None
+
+    restored = ChainState.from_dict(snapshot.to_dict())
+    assert restored.root() == snapshot.root()
+    assert restored.balances == snapshot.balances
+
+
+def test_from_dict_rejects_a_snapshot_that_does_not_match_its_root():
+    state = ChainState()
+    state.apply_block({'index': 1, 'transactions': [{'sender': '0', 'recipient': 'miner', 'amount': 1}]}, 'hash')
+    values = state.to_dict()
+
+    with pytest.raises(ValueError, match='state root'):
+        ChainState.from_dict(dict(values, balances={'miner': 1000}))
+    with pytest.raises(ValueError, match='state root'):
+        ChainState.from_dict(dict(values, tx_count=2))
+    for key in values:
+        with pytest.raises(ValueError, match='Malformed'):
+            ChainState.from_dict({k: v for k, v in values.items() if k != key})
+    with pytest.raises(ValueError, match='Malformed'):
+        ChainState.from_dict(dict(values, height='three'))
+
+
+def test_checkpoint_block_with_a_wrong_state_root_is_rejected():
+    chain = easy_chain(state_interval=3)
+    for _ in range(3):
+        mine(chain, transactions=1)
+    forged = [dict(block) for block in chain.chain]
+    forged[2]['transactions'] = [dict(forged[2]['transactions'][0], amount=50)] + forged[2]['transactions'][1:]
+
+    # 체인을 처음 보는 노드는 제네시스부터 다시 적용하며 체크포인트의 상태 루트를 확인합니다
+    verifier = easy_chain(state_interval=3)
+    assert verifier.replay_state(chain.chain)[0].root() == chain.state.root()
+    with pytest.raises(StateRootMismatch):
+        verifier.replay_state(forged)
+    assert not verifier.replace_chain(forged)
+
+
+def test_retarget_is_clamped():
+    adjuster = DifficultyAdjuster(target_block_time=10, retarget_interval=10, initial_target=1 << 200,
+                                  max_target=1 << 210)
+    target = 1 << 200
+    expected = 10 * 10
+
+    assert adjuster.retarget(target, expected) == target
+    # 한 번에 MAX_ADJUSTMENT배보다 많이 바뀌지 않습니다
+    assert adjuster.retarget(target, 0) == target // MAX_ADJUSTMENT
+    assert adjuster.retarget(target, -1000) == target // MAX_ADJUSTMENT
+    assert adjuster.retarget(target, expected * 100) == target * MAX_ADJUSTMENT
+    # max_target보다 쉬워지지 않고, 1보다 어려워지지 않습니다
+    assert adjuster.retarget(1 << 209, expected * 100) == 1 << 210
+    assert adjuster.retarget(1, 0) == 1
+
+
+def test_next_target_only_changes_at_retarget_heights():
+    adjuster = DifficultyAdjuster(target_block_time=10, retarget_interval=10, initial_target=1 << 200)
+    timestamps = [i * 5.0 for i in range(40)]
+
+    assert adjuster.next_target(0, None, timestamps.__getitem__) == 1 << 200
+    # 첫 주기는 건너뜁니다 (제네시스 타임스탬프는 노드가 시작한 시각입니다)
+    assert adjuster.next_target(10, 1 << 200, timestamps.__getitem__) == 1 << 200
+    assert adjuster.next_target(21, 1 << 200, timestamps.__getitem__) == 1 << 200
+    # 블록이 목표의 두 배 빠르게 나왔으면 목표값을 반으로 줄입니다
+    assert adjuster.next_target(20, 1 << 200, timestamps.__getitem__) == 1 << 199
+    assert adjuster.blocks_until_retarget(21) == 9
+
+
+def test_proof_of_authority_seal():
+    chain = Blockchain(consensus=ProofOfAuthority(AUTHORITIES, 'alice'))
+    for _ in range(3):
+        mine(chain, transactions=1)
+    assert chain.valid_chain(chain.chain)
+    assert chain.last_block['authority'] == 'alice'
+
+    # 다른 권한자의 서명으로는 검증되지 않습니다
+    forged = [dict(block) for block in chain.chain]
+    forged[2]['authority'] = 'bob'
+    assert chain.first_invalid(forged) == 2
+
+    # 서명 뒤에 헤더를 바꾸면 서명이 맞지 않습니다
+    forged = [dict(block) for block in chain.chain]
+    forged[3]['timestamp'] += 1
+    assert chain.first_invalid(forged) == 3
+
+    # 모르는 권한자나 서명이 없는 블록도 거절합니다
+    forged = [dict(block) for block in chain.chain]
+    forged[1]['authority'] = 'mallory'
+    assert chain.first_invalid(forged) == 1
+    forged = [dict(block) for block in chain.chain]
+    del forged[1]['signature']
+    assert chain.first_invalid(forged) == 1
+
+    # 키를 모르는 노드가 서명한 블록은 검증하는 노드에서 거절됩니다
+    verifier = Blockchain(consensus=ProofOfAuthority({'alice': '03' * 32}))
+    assert not verifier.valid_chain(chain.chain)
+
+
+def test_proof_of_authority_configuration():
+    with pytest.raises(ValueError):
+        ProofOfAuthority({})
+    with pytest.raises(ValueError):
+        ProofOfAuthority(AUTHORITIES, 'mallory')
+
+    verifier = ProofOfAuthority(AUTHORITIES)
+    chain = Blockchain(consensus=verifier)
+    with pytest.raises(ValueError, match='not an authority'):
+        verifier.prove(chain, chain.last_block)
@@ -0,0 +1,130 @@
+from urllib.parse import urlparse
+
+import pytest
+import requests
+
+import blockchain as node
+from blockchain import Blockchain
+from conftest import easy_chain, mine
+from light_client import LightClient
+from merkle import merkle_proof, merkle_root, verify_proof
+
+
+class FlaskSession:
+    """
+    LightClient의 requests.Session 대신 Flask 테스트 클라이언트로 노드 API를 부릅니다.
+    """
+
+    def __init__(self, client):
+        self.client = client
+        self.headers = {}
+
+    def get(self, url, params=None, timeout=None):
+        return FlaskResponse(self.client.get(urlparse(url).path, query_string=params, headers=self.headers))
+
+
+class FlaskResponse:
+    def __init__(self, response):
+        self.response = response
+        self.headers = response.headers
+        self.content = response.data
+
+    def json(self):
+        return self.response.get_json()
+
+    def raise_for_status(self):
+        if self.response.status_code >= 400:
+            raise requests.HTTPError(f'{self.response.status_code} error')
+
+
+@pytest.fixture
+def full_node(monkeypatch):
+    chain = easy_chain()
+    monkeypatch.setattr(node, 'blockchain', chain)
+    return chain
+
+
+def light_client(full_node, **kwargs) -> LightClient:
+    client = LightClient('http://full-node', consensus=full_node.consensus, **kwargs)
+    client.session = FlaskSession(node.app.test_client())
+    client.session.headers['Accept'] = node.wire.ACCEPT
+    return client
+
+
+@pytest.mark.parametrize('size', [1, 2, 3, 5, 8])
+def test_every_transaction_has_a_valid_proof(size):
+    transactions = [{'sender': 'a', 'recipient': 'b', 'amount': i + 1, 'nonce': str(i)} for i in range(size)]
+    root = merkle_root(transactions)
+    for i, tx in enumerate(transactions):
+        proof = merkle_proof(transactions, i)
+        assert verify_proof(tx, proof, root)
+        # 다른 거래나 다른 루트로는 증명이 맞지 않습니다
+        assert not verify_proof(dict(tx, amount=tx['amount'] + 1), proof, root)
+        assert not verify_proof(tx, proof, '0' * 64)
+
+
+def test_duplicated_transaction_does_not_keep_the_merkle_root(chain):
+    block = mine(chain, transactions=2)
+    # 거래가 홀수 개이면 마지막 해시를 복제하므로 마지막 거래를 한 번 더 넣어도 머클 루트가 같습니다 (CVE-2012-2459)
+    forged = dict(block, transactions=block['transactions'] + block['transactions'][-1:])
+    assert merkle_root(forged['transactions']) == block['merkle_root']
+
+    assert Blockchain.valid_merkle_root(block)
+    assert not Blockchain.valid_merkle_root(forged)
+
+
+def test_light_client_verifies_transactions_against_headers(full_node):
+    for _ in range(3):
+        mine(full_node, transactions=3)
+    client = light_client(full_node)
+
+    assert client.sync() == 4
+    assert client.genesis_hash == Blockchain.hash(full_node.chain[0])
+    assert client.get_transaction(3, 1) == full_node.chain[2]['transactions'][1]
+
+    # 풀 노드가 거래를 바꿔서 보내면 헤더의 머클 루트와 맞지 않습니다
+    full_node.chain[2]['transactions'][1]['amount'] = 1000
+    with pytest.raises(ValueError, match='Invalid inclusion proof'):
+        client.get_transaction(3, 1)
+    with pytest.raises(ValueError):
+        client.get_transaction(9, 0)
+
+
+def test_light_client_follows_new_blocks(full_node):
+    mine(full_node)
+    client = light_client(full_node)
+    client.sync()
+    mine(full_node, transactions=1)
+    assert client.sync() == 3
+    assert client.headers[-1] == Blockchain.header(full_node.last_block)
+
+
+def test_light_client_rejects_another_genesis(full_node):
+    mine(full_node)
+    client = light_client(full_node, genesis_hash=Blockchain.hash(easy_chain().chain[0]))
+    with pytest.raises(ValueError, match='genesis'):
+        client.sync()
+    assert client.headers == []
+
+
+def test_light_client_keeps_its_pinned_genesis(full_node, monkeypatch):
+    mine(full_node)
+    client = light_client(full_node)
+    client.sync()
+
+    # 노드가 제네시스부터 다른 (더 긴) 체인으로 바뀌어도 처음 고정한 제네시스를 지킵니다
+    other = easy_chain()
+    for _ in range(3):
+        mine(other)
+    monkeypatch.setattr(node, 'blockchain', other)
+    with pytest.raises(ValueError, match='genesis'):
+        client.sync()
+    assert len(client.headers) == 2
+
+
+def test_light_client_rejects_a_broken_header(full_node):
+    for _ in range(3):
+        mine(full_node)
+    full_node.chain[2]['proof'] += 1
+    with pytest.raises(ValueError):
+        light_client(full_node).sync()
@@ -0,0 +1,149 @@
+import pytest
+
+import wire
+from compact_block import SHORT_ID_BYTES, PartialBlock, make_compact
+from conftest import easy_chain, mine
+from mempool_sync import MempoolSync
+
+
+def transactions(start: int, stop: int) -> list:
+    return [{'sender': 'alice', 'recipient': 'bob', 'amount': 1, 'nonce': str(i)} for i in range(start, stop)]
+
+
+class PeerSession:
+    """
+    MempoolSync의 HTTP 요청을 다른 MempoolSync의 answer_* 메서드로 바로 보냅니다 (프로세스 안의 두 노드).
+    """
+
+    def __init__(self, peer: MempoolSync):
+        self.routes = {
+            '/mempool/reconcile': peer.answer_reconcile,
+            '/mempool/fetch': peer.answer_fetch,
+            '/mempool/transactions': peer.receive,
+        }
+
+    def post(self, url, data=None, timeout=None, headers=None):
+        path = url.split('/', 3)[3]
+        return WireResponse(self.routes['/' + path](wire.decode(data)))
+
+
+class WireResponse:
+    def __init__(self, payload):
+        self.headers = {'Content-Type': wire.CONTENT_TYPE}
+        self.content = wire.encode(payload)
+
+    def raise_for_status(self):
+        pass
+
+
+def connect(ours: MempoolSync, theirs: MempoolSync):
+    ours.session = PeerSession(theirs)
+    ours.blockchain.register_node('http://peer:5000')
+
+
+def test_partial_block_fills_missing_transactions():
+    block_txs = transactions(0, 6)
+    compact = make_compact({'index': 2}, block_txs, 'salt', prefill=(-1,))
+    assert len(compact['short_ids']) == (len(block_txs) - 1) * SHORT_ID_BYTES * 2
+
+    # Mempool에는 블록의 거래 일부와 관계없는 거래가 있습니다
+    mempool = [block_txs[0], block_txs[2], block_txs[3]] + transactions(10, 12)
+    partial = PartialBlock(compact, 'salt', mempool)
+    assert partial.missing == [1, 4]
+    assert partial.from_mempool == [0, 2, 3]
+    assert not partial.complete
+
+    # 요청하지 않은 위치는 무시합니다
+    partial.fill([[1, block_txs[1]], [0, transactions(20, 21)[0]]])
+    assert partial.missing == [4]
+    partial.fill([[4, block_txs[4]]])
+    assert partial.complete
+    assert partial.transactions == block_txs
+
+    assert partial.distrust_mempool()
+    assert partial.missing == [0, 2, 3]
+    assert not partial.distrust_mempool()
+
+
+def test_partial_block_rejects_malformed_compact_blocks():
+    compact = make_compact({'index': 2}, transactions(0, 3), 'salt', prefill=(-1,))
+    with pytest.raises(ValueError):
+        PartialBlock(dict(compact, short_ids=compact['short_ids'][:-1]), 'salt', [])
+    with pytest.raises(ValueError):
+        PartialBlock(dict(compact, prefilled=[[7, {}]]), 'salt', [])
+
+
+def test_compact_block_relay_between_nodes(chain):
+    mine(chain)
+    peer = easy_chain()
+    assert peer.replace_chain(list(chain.chain))
+
+    block_txs = transactions(0, 5)
+    chain.new_transactions(block_txs)
+    peer.new_transactions(block_txs[:3] + transactions(10, 12))
+    block = mine(chain)
+
+    status, missing = peer.receive_compact(chain.compact_block(block))
+    assert (status, missing) == ('missing', [3, 4])
+    status, missing = peer.complete_compact(chain.hash(block), [[i, block['transactions'][i]] for i in missing])
+    assert status == 'accepted'
+    assert peer.last_block == block
+    # 블록에 들어간 거래는 Mempool에서 빠집니다
+    assert peer.current_transactions == transactions(10, 12)
+
+    assert peer.receive_compact(chain.compact_block(block)) == ('known', [])
+    assert peer.complete_compact(chain.hash(block), []) == ('unknown', [])
+
+
+def test_compact_block_with_a_bad_seal_or_parent_is_refused(chain):
+    mine(chain)
+    peer = easy_chain()
+    assert peer.replace_chain(list(chain.chain))
+    block = mine(chain, transactions=2)
+
+    forged = chain.compact_block(block)
+    # 헤더의 목표값이 합의 규칙과 다르면 거래를 복원하기 전에 거절합니다
+    forged['header'] = dict(forged['header'], target=forged['header']['target'] * 2)
+    assert peer.receive_compact(forged) == ('invalid', [])
+    assert peer.relay_stats['blocks_received'] == 0
+
+    mine(chain)
+    assert peer.receive_compact(chain.compact_block(chain.last_block)) == ('orphan', [])
+
+
+def test_mempool_reconcile_between_two_nodes():
+    ours, theirs = MempoolSync(easy_chain()), MempoolSync(easy_chain())
+    ours.blockchain.new_transactions(transactions(0, 50))
+    theirs.blockchain.new_transactions(transactions(30, 90))
+    connect(ours, theirs)
+
+    assert ours.reconcile('peer:5000') == (40, 30)
+    assert ours.mempool_digest() == theirs.mempool_digest()
+    assert ours.mempool_digest()['count'] == 90
+    assert ours.stats['transactions_received'] == 40
+    assert theirs.stats['transactions_received'] == 30
+
+    # 이미 같은 Mempool이면 버킷 요약값만 주고받습니다
+    assert ours.sync_all() == {'peer:5000': (0, 0)}
+    assert ours.stats['in_sync'] == 1
+
+
+def test_mempool_reconcile_skips_confirmed_transactions():
+    ours, theirs = MempoolSync(easy_chain()), MempoolSync(easy_chain())
+    ours.blockchain.new_transactions(transactions(0, 10))
+    mine(ours.blockchain)
+    theirs.blockchain.new_transactions(transactions(0, 10))
+    connect(ours, theirs)
+
+    # 우리가 이미 블록에 넣은 거래는 다시 받지 않습니다
+    received, sent = ours.reconcile('peer:5000')
+    assert (received, sent) == (0, 0)
+    assert ours.blockchain.current_transactions == []
+
+
+def test_answer_reconcile_rejects_unsupported_bucket_counts():
+    sync = MempoolSync(easy_chain())
+    with pytest.raises(ValueError):
+        sync.answer_reconcile({'bits': 64, 'buckets': ''})
+    with pytest.raises(ValueError):
+        sync.answer_reconcile({'bits': 4, 'buckets': '00'})
@@ -0,0 +1,64 @@
+import pytest
+
+import wire
+from conftest import mine
+
+
+def test_round_trip_keeps_values_and_key_order(chain):
+    mine(chain, transactions=3)
+    payload = {
+        'chain': chain.chain,
+        'length': len(chain.chain),
+        'node': 'a' * 32,
+        'short_ids': '0123456789abcdef' * 3,
+        'timestamp': '2025-10-21 21:40:36.123456',
+        'values': [None, True, False, 0, -1, 2 ** 70, -2 ** 70, 1.5, 'Ünïcode', {}, []],
+        'z': 1, 'a': 2,
+    }
+    decoded = wire.decode(wire.encode(payload))
+
+    assert decoded == payload
+    assert list(decoded) == list(payload)
+    assert list(decoded['chain'][1]) == list(chain.chain[1])
+
+
+def test_binary_is_smaller_than_json(chain):
+    import json
+    mine(chain, transactions=20)
+    assert len(wire.encode(chain.chain)) < len(json.dumps(chain.chain))
+
+
+def test_unencodable_value_raises_type_error():
+    with pytest.raises(TypeError):
+        wire.encode({'set': {1, 2}})
+
+
+@pytest.mark.parametrize('data', [
+    b'',
+    bytes((99,)) + wire.encode([1])[1:],                  # 모르는 버전
+    wire.encode({'sender': 'abc'})[:-1],                    # 잘린 문자열
+    wire.encode('f' * 64)[:-1],                             # 잘린 해시
+    wire.encode(1.5)[:-2],                                  # 잘린 실수
+    bytes((wire.VERSION, wire.LIST, 3, wire.INT, 2)),       # 항목이 모자란 리스트
+    bytes((wire.VERSION, wire.INT, 0x80)),                  # 끝나지 않은 varint
+    bytes((wire.VERSION, 200)),                             # 모르는 태그
+    wire.encode([1, 2]) + b'\x00',                          # 뒤에 남은 바이트
+    bytes((wire.VERSION, wire.STR, 2, 0xff, 0xfe)),         # UTF-8이 아닌 문자열
+])
+def test_malformed_payload_raises_value_error(data):
+    with pytest.raises(ValueError):
+        wire.decode(data)
+
+
+def test_deeply_nested_payload_raises_value_error():
+    data = bytes((wire.VERSION,)) + bytes((wire.LIST, 1)) * 100000 + bytes((wire.NONE,))
+    with pytest.raises(ValueError, match='nested too deeply'):
+        wire.decode(data)
+
+
+def test_content_negotiation():
+    assert wire.accepts(wire.ACCEPT)
+    assert not wire.accepts('application/json')
+    assert not wire.accepts(None)
+    assert wire.is_wire(f'{wire.CONTENT_TYPE}; charset=binary')
+    assert not wire.is_wire('application/json')
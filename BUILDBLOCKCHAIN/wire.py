@@ -0,0 +1,331 @@
+import re
+import struct
+from datetime import datetime, timedelta
+
+
+# 피어끼리 주고받는 블록/헤더/거래를 JSON 대신 보낼 수 있는 바이너리 인코딩입니다.
+# 요청의 Accept 헤더(응답)와 Content-Type 헤더(요청 본문)로 협상합니다.
+CONTENT_TYPE = 'application/x-blockchain-wire'
+# 바이너리를 먼저 원하고, 상대가 모르면 JSON을 받습니다.
+ACCEPT = f'{CONTENT_TYPE}, application/json;q=0.9'
+
+# 2: HEX 태그 추가. 버전 1 페이로드는 HEX를 쓰지 않으므로 그대로 읽을 수 있습니다.
+VERSION = 2
+READABLE_VERSIONS = (1, 2)
+
+# 값 앞에 붙는 타입 태그
+NONE, FALSE, TRUE, INT, FLOAT, STR, HASH, LIST, DICT, DATETIME, ID, HEX = range(12)
+
+# 자주 쓰는 딕셔너리 키는 이름 대신 번호로 보냅니다. 순서를 바꾸면 호환이 깨지므로 뒤에만 추가합니다.
+KEYS = (
+    'index', 'timestamp', 'transactions', 'proof', 'previous_hash', 'merkle_root',
+    'sender', 'recipient', 'amount', 'chain', 'length', 'blocks', 'headers', 'hash',
+    'data', 'nonce', 'from', 'to', 'message',
+)
+KEY_IDS = {key: i + 1 for i, key in enumerate(KEYS)}
+
+# 64자리 소문자 16진수 문자열(SHA-256 해시)은 32바이트 원본으로 보냅니다.
+HEX_HASH = re.compile(r'[0-9a-f]{64}\Z')
+# 32자리 16진수 문자열(uuid4().hex로 만든 노드 주소)은 16바이트로 보냅니다.
+HEX_ID = re.compile(r'[0-9a-f]{32}\Z')
+# 그 밖의 긴 16진수 문자열(짧은 거래 ID 묶음 등)은 길이 + 원본 바이트로 보냅니다.
+HEX_STR = re.compile(r'(?:[0-9a-f]{2}){8,}\Z')
+# snakecoin이 보내는 str(datetime) 형식의 시각은 마이크로초 정수로 보냅니다.
+DATETIME_STR = re.compile(r'\d{4}-\d\d-\d\d \d\d:\d\d:\d\d(\.\d{6})?\Z')
+EPOCH = datetime(1970, 1, 1)
+
+_double = struct.Struct('>d')
+
+
+def accepts(accept: str) -> bool:
+    """
+    Accept 헤더가 바이너리 인코딩을 받겠다고 하는지 확인합니다.
+    """
+    return bool(accept) and CONTENT_TYPE in accept
+
+
+def is_wire(content_type: str) -> bool:
+    """
+    Content-Type 헤더가 바이너리 인코딩인지 확인합니다.
+    """
+    return bool(content_type) and content_type.split(';')[0].strip() == CONTENT_TYPE
+
+
+def _varint(n: int, out: bytearray):
+    while n > 0x7f:
+        out.append((n & 0x7f) | 0x80)
+        n >>= 7
+    out.append(n)
+
+
+def _encode(value, out: bytearray):
+    if value is None:
+        out.append(NONE)
+    elif value is True:
+        out.append(TRUE)
+    elif value is False:
+        out.append(FALSE)
+    elif isinstance(value, int):
+        out.append(INT)
+        # 지그재그 인코딩: 음수도 작은 varint가 되도록 합니다.
+        _varint(value * 2 if value >= 0 else -value * 2 - 1, out)
+    elif isinstance(value, float):
+        out.append(FLOAT)
+        out += _double.pack(value)
+    elif isinstance(value, str):
+        if HEX_HASH.match(value):
+            out.append(HASH)
+            out += bytes.fromhex(value)
+            return
+        if HEX_ID.match(value):
+            out.append(ID)
+            out += bytes.fromhex(value)
+            return
+        if HEX_STR.match(value):
+            out.append(HEX)
+            _varint(len(value) // 2, out)
+            out += bytes.fromhex(value)
+            return
+        if DATETIME_STR.match(value):
+            dt = datetime.fromisoformat(value)
+            # 되돌렸을 때 같은 문자열이 나오는 경우에만 (해시가 이 문자열에 의존하므로)
+            if str(dt) == value and dt >= EPOCH:
+                out.append(DATETIME)
+                _varint((dt - EPOCH) // timedelta(microseconds=1), out)
+                return
+        raw = value.encode()
+        out.append(STR)
+        _varint(len(raw), out)
+        out += raw
+    elif isinstance(value, (list, tuple)):
+        out.append(LIST)
+        _varint(len(value), out)
+        for item in value:
+            _encode(item, out)
+    elif isinstance(value, dict):
+        out.append(DICT)
+        _varint(len(value), out)
+        # 키 순서를 그대로 보존합니다 (snakecoin은 str(dict)로 해시를 계산합니다).
+        for key, item in value.items():
+            key_id = KEY_IDS.get(key)
+            if key_id is None:
+                raw = str(key).encode()
+                out.append(0)
+                _varint(len(raw), out)
+                out += raw
+            else:
+                out.append(key_id)
+            _encode(item, out)
+    else:
+        raise TypeError(f'Cannot encode value of type {type(value).__name__}')
+
+
+def encode(value) -> bytes:
+    """
+    JSON으로 표현할 수 있는 값(dict, list, str, int, float, bool, None)을 바이너리로 인코딩합니다.
+    decode(encode(value)) == value 이며, 딕셔너리 키 순서도 보존됩니다.
+    """
+    out = bytearray((VERSION,))
+    _encode(value, out)
+    return bytes(out)
+
+
+def _decode_value(data: bytes, pos: int) -> tuple:
+    """
+    pos 위치의 값 하나를 읽어 (값, 다음 위치)를 반환합니다.
+    """
+    tag = data[pos]
+    pos += 1
+
+    if tag == DICT or tag == LIST or tag == STR or tag == INT or tag == DATETIME or tag == HEX:
+        # varint (한 바이트로 끝나는 경우가 대부분입니다)
+        byte = data[pos]
+        pos += 1
+        n = byte & 0x7f
+        shift = 7
+        while byte & 0x80:
+            byte = data[pos]
+            pos += 1
+            n |= (byte & 0x7f) << shift
+            shift += 7
+
+        if tag == DICT:
+            result = {}
+            for _ in range(n):
+                key_id = data[pos]
+                if key_id:
+                    key = KEYS[key_id - 1]
+                    pos += 1
+                else:
+                    size, pos = _decode_varint(data, pos + 1)
+                    key = data[pos:pos + size].decode()
+                    pos += size
+                result[key], pos = _decode_value(data, pos)
+            return result, pos
+        if tag == STR or tag == HEX:
+            end = pos + n
+            if end > len(data):
+                raise ValueError('Truncated wire payload')
+            return (data[pos:end].decode() if tag == STR else data[pos:end].hex()), end
+        if tag == INT:
+            return (n >> 1 if not n & 1 else -((n + 1) >> 1)), pos
+        if tag == LIST:
+            result = []
+            append = result.append
+            for _ in range(n):
+                item, pos = _decode_value(data, pos)
+                append(item)
+            return result, pos
+        return str(EPOCH + timedelta(microseconds=n)), pos
+
+    if tag == HASH or tag == ID:
+        end = pos + (32 if tag == HASH else 16)
+        if end > len(data):
+            raise ValueError('Truncated wire payload')
+        return data[pos:end].hex(), end
+    if tag == FLOAT:
+        return _double.unpack_from(data, pos)[0], pos + 8
+    if tag == NONE:
+        return None, pos
+    if tag == TRUE:
+        return True, pos
+    if tag == FALSE:
+        return False, pos
+    raise ValueError(f'Unknown wire tag {tag}')
+
+
+def _decode_varint(data: bytes, pos: int) -> tuple:
+    n = 0
+    shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        n |= (byte & 0x7f) << shift
+        shift += 7
+        if not byte & 0x80:
+            return n, pos
+
+
+def decode(data: bytes):
+    """
+    encode()로 만든 바이트를 원래 값으로 되돌립니다. 형식이 잘못되었으면 ValueError를 일으킵니다.
+    """
+    if not data or data[0] not in READABLE_VERSIONS:
+        raise ValueError('Unsupported wire payload version')
+    try:
+        value, pos = _decode_value(data, 1)
+    except (IndexError, UnicodeDecodeError, struct.error) as e:
+        raise ValueError(f'Malformed wire payload: {e}')
+    except RecursionError:
+        # 리스트/딕셔너리를 아주 깊게 중첩한 페이로드 (정상적인 블록/거래는 몇 단계뿐입니다)
+        raise ValueError('Wire payload is nested too deeply')
+    if pos != len(data):
+        raise ValueError('Trailing bytes in wire payload')
+    return value
+
+
+def parse_response(response):
+    """
+    requests 응답 본문을 Content-Type에 따라 바이너리 또는 JSON으로 파싱합니다.
+    """
+    if is_wire(response.headers.get('Content-Type')):
+        return decode(response.content)
+    return response.json()
+
+
+# =============================================================================
+# 벤치마크: 동기화 응답 크기와 파싱 시간을 JSON과 비교합니다.
+# =============================================================================
+
+def _sample_chains(blocks: int, txs_per_block: int) -> dict:
+    import hashlib
+    import json
+    import random
+    from time import time
+
+    def fake_hash(*parts):
+        return hashlib.sha256(json.dumps(parts).encode()).hexdigest()
+
+    # blockchain.py의 /blocks/range 응답 형태
+    chain = []
+    previous_hash = '1'
+    now = time()
+    for i in range(1, blocks + 1):
+        transactions = [
+            {'sender': fake_hash(i, t, 's')[:32], 'recipient': fake_hash(i, t, 'r')[:32],
+             'amount': random.randint(1, 1000)}
+            for t in range(txs_per_block)
+        ]
+        block = {
+            'index': i,
+            'timestamp': now + i * 10.123,
+            'transactions': transactions,
+            'merkle_root': fake_hash(i, 'root'),
+            'proof': random.randint(1, 200000),
+            'previous_hash': previous_hash,
+        }
+        previous_hash = fake_hash(i)
+        chain.append(block)
+
+    # snakecoin.py의 /blocks 응답 형태
+    snake = []
+    start = datetime(2025, 10, 21, 21, 40, 36, 123456)
+    for i in range(blocks):
+        snake.append({
+            'index': i,
+            'timestamp': str(start + timedelta(seconds=i, microseconds=i * 7919)),
+            'data': {
+                'transactions': [{'from': f'user-{i}-{t}', 'to': f'user-{t}', 'amount': t + 1}
+                                 for t in range(txs_per_block)],
+                'nonce': random.randint(1, 200000),
+            },
+            'hash': fake_hash(i, 'snake'),
+            'previous_hash': fake_hash(i - 1, 'snake') if i else '0',
+        })
+
+    return {
+        'blocks/range': {'blocks': chain, 'length': blocks},
+        'headers': {'headers': [{k: v for k, v in b.items() if k != 'transactions'} for b in chain],
+                    'length': blocks},
+        'snakecoin /blocks': snake,
+    }
+
+
+def benchmark(blocks: int = 2000, txs_per_block: int = 20, repeat: int = 5):
+    import gzip
+    import json
+    from time import perf_counter
+
+    def best_time(fn):
+        best = float('inf')
+        for _ in range(repeat):
+            started = perf_counter()
+            fn()
+            best = min(best, perf_counter() - started)
+        return best * 1000
+
+    print(f"{blocks} blocks, {txs_per_block} transactions per block (best of {repeat})")
+    print(f"{'payload':<18} {'format':<6} {'bytes':>11} {'gzip bytes':>11} {'encode ms':>10} {'parse ms':>9}")
+    for name, payload in _sample_chains(blocks, txs_per_block).items():
+        json_body = json.dumps(payload).encode()
+        wire_body = encode(payload)
+        assert decode(wire_body) == json.loads(json_body), name
+
+        for fmt, body, dump, load in (
+            ('json', json_body, lambda: json.dumps(payload).encode(), lambda: json.loads(json_body)),
+            ('wire', wire_body, lambda: encode(payload), lambda: decode(wire_body)),
+        ):
+            print(f"{name:<18} {fmt:<6} {len(body):>11,} {len(gzip.compress(body, 6)):>11,} "
+                  f"{best_time(dump):>10.1f} {best_time(load):>9.1f}")
+
+
+if __name__ == '__main__':
+
+    from argparse import ArgumentParser
+    parser = ArgumentParser(description='Compare the binary wire encoding with JSON for sync payloads')
+    parser.add_argument('-b', '--blocks', default=2000, type=int, help='number of blocks in the sample chain')
+    parser.add_argument('-t', '--transactions', default=20, type=int, help='transactions per block')
+    parser.add_argument('-r', '--repeat', default=5, type=int, help='runs per measurement')
+    args = parser.parse_args()
+
+    benchmark(args.blocks, args.transactions, args.repeat)